@@ -0,0 +1,37 @@
+import os
+import secrets
+import base64
+import binascii
+from typing import Optional
+
+def is_authorized(auth_header: Optional[str]) -> bool:
+    """
+    Checks an Authorization header against AUTH_USERNAME / AUTH_PASSWORD.
+    Shared by the HTTP middleware and the WebSocket endpoints, which the middleware doesn't see.
+    """
+    # Skip auth if env vars are not set
+    username = os.getenv("AUTH_USERNAME")
+    password = os.getenv("AUTH_PASSWORD")
+    
+    if not username or not password:
+        return True
+
+    if not auth_header:
+        return False
+
+    try:
+        scheme, credentials = auth_header.split()
+        if scheme.lower() != 'basic':
+            return False
+            
+        decoded = base64.b64decode(credentials).decode("ascii")
+        u, p = decoded.split(":", 1)
+        
+        # Use secrets.compare_digest to prevent timing attacks
+        is_correct_username = secrets.compare_digest(u, username)
+        is_correct_password = secrets.compare_digest(p, password)
+        
+        return is_correct_username and is_correct_password
+             
+    except (ValueError, binascii.Error):
+        return False
@@ -0,0 +1,44 @@
+from datetime import date
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query
+
+from services import agenda_mirror
+
+router = APIRouter()
+
+@router.get("/api/agenda")
+def agenda(from_: Optional[str] = Query(None, alias="from"), to: Optional[str] = None,
+           start_time: Optional[str] = None, end_time: Optional[str] = None,
+           limit: int = Query(500, ge=1, le=2000)):
+    """
+    Agenda events overlapping [from, to), served from the local mirror. A date-only `to`
+    includes that day; `from` defaults to the day of start_time (or today) and `to` to the
+    end of that day. Given a draft's start_time/end_time, timed events overlapping it are
+    flagged as conflicts. Plain def so the SQLite query runs in the threadpool.
+    """
+    try:
+        draft = None
+        if start_time:
+            draft_start, _ = agenda_mirror.parse_time(start_time)
+            draft_end = agenda_mirror.parse_time(end_time, end=True)[0] if end_time else draft_start
+            draft = (draft_start, max(draft_end, draft_start))
+        from_key = agenda_mirror.parse_time(from_ or (start_time or date.today().isoformat())[:10])[0]
+        to_key = agenda_mirror.parse_time(to or from_key[:10], end=True)[0]
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if to_key < from_key:
+        raise HTTPException(status_code=400, detail="'to' is before 'from'")
+
+    events = agenda_mirror.get_mirror().range(from_key, to_key, limit)
+    for event in events:
+        # An all-day entry (a birthday, a trip) doesn't rule out a meeting that day
+        event["conflict"] = bool(draft) and not event["all_day"] and agenda_mirror.overlaps(
+            event["start_key"], event["end_key"], *draft)
+    return {
+        "from": from_key,
+        "to": to_key,
+        "events": events,
+        "conflicts": [event["id"] for event in events if event["conflict"]],
+        "watermark": agenda_mirror.get_mirror().get_watermark(),
+    }
@@ -0,0 +1,15 @@
+from fastapi import APIRouter, HTTPException
+
+from services import save_queue
+
+router = APIRouter()
+
+@router.get("/api/jobs/{job_id}")
+async def get_job(job_id: str):
+    """
+    Status of a queued save: queued, running, succeeded (with the page id/url) or failed.
+    """
+    job = await save_queue.get_queue().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
@@ -0,0 +1,116 @@
+import os
+import io
+import json
+import asyncio
+import logging
+from typing import List
+
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+
+from services import ai_service, related_ideas
+from app.auth import is_authorized
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(100 * 1024 * 1024)))
+
+CONTENT_TYPES = {
+    "webm": "audio/webm",
+    "ogg": "audio/ogg",
+    "mp4": "audio/mp4",
+    "wav": "audio/wav",
+}
+
+@router.websocket("/ws/record")
+async def record(websocket: WebSocket, mode: str = "event", format: str = "webm", use_cache: bool = True):
+    """
+    Live recording. The client starts a new MediaRecorder every few seconds so each
+    segment is a self-contained audio file, and sends:
+      - binary messages: audio chunks of the current segment
+      - {"type": "segment", "overlaps": bool}: the current segment is complete
+      - {"type": "stop", "overlaps": bool}: the button was released; the current segment is the last one
+    `overlaps` says the segment's audio starts before the previous one ended (the client
+    overlaps them so nothing is lost at the boundary); the text transcribed twice is kept once.
+    Each completed segment is transcribed in the background while recording continues (like
+    an uploaded file: normalized, cached, and retried on 429/5xx), so after "stop" only the
+    final segment and the draft are left to wait for.
+    While the draft is generated, {"event": "field", ...} messages carry partial fields
+    (see ai_service.stream_draft). The final reply is the same {transcription, draft}
+    shape as /api/process-audio, or {error} on failure, and the server closes the
+    connection afterwards.
+    Pass use_cache=false to skip the memoized draft.
+    """
+    if not is_authorized(websocket.headers.get("Authorization")):
+        await websocket.close(code=1008)
+        return
+    if mode not in ("event", "idea"):
+        await websocket.close(code=1008, reason="Invalid mode. Must be 'event' or 'idea'.")
+        return
+
+    await websocket.accept()
+
+    extension = format if format in CONTENT_TYPES else "webm"
+    content_type = CONTENT_TYPES[extension]
+    segments: List[asyncio.Task] = []
+    overlaps: List[bool] = []
+    buffer = io.BytesIO()
+    received = 0
+
+    def close_segment(overlapping: bool):
+        nonlocal buffer
+        if buffer.tell() == 0:
+            return
+        buffer.seek(0)
+        name = f"segment-{len(segments)}.{extension}"
+        segments.append(asyncio.create_task(ai_service.transcribe_audio_cached(buffer, name, content_type)))
+        overlaps.append(overlapping)
+        buffer = io.BytesIO()
+
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", 1000))
+
+            if message.get("bytes") is not None:
+                received += len(message["bytes"])
+                if received > MAX_UPLOAD_BYTES:
+                    await websocket.send_json({"error": "Upload too large"})
+                    await websocket.close(code=1009)
+                    return
+                buffer.write(message["bytes"])
+                continue
+
+            control = json.loads(message.get("text") or "{}")
+            event = control.get("type")
+            if event == "segment":
+                close_segment(bool(control.get("overlaps")))
+            elif event == "stop":
+                close_segment(bool(control.get("overlaps")))
+                break
+
+        parts = await asyncio.gather(*segments)
+        transcription = ai_service.stitch_transcripts(parts, overlaps)
+
+        if not transcription:
+            await websocket.send_json({"transcription": "", "draft": {}, "related": []})
+        else:
+            logger.debug("live transcription chars=%d segments=%d text=%.200r", len(transcription), len(segments), transcription)
+            async for update in ai_service.stream_draft(mode, transcription, use_cache):
+                if update["event"] == "field":
+                    await websocket.send_json(update)
+                else:
+                    related = await related_ideas.find_related(mode, update["draft"])
+                    await websocket.send_json({"transcription": transcription, "draft": update["draft"], "related": related})
+        await websocket.close()
+
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        logger.exception("live recording failed")
+        await websocket.send_json({"error": str(e)})
+        await websocket.close(code=1011)
+    finally:
+        for task in segments:
+            task.cancel()
@@ -0,0 +1,20 @@
+from typing import Optional
+
+from fastapi import APIRouter, Query
+
+from services import search_index
+
+router = APIRouter()
+
+@router.get("/api/search")
+def search(q: str = Query(..., min_length=1), limit: int = Query(20, ge=1, le=100),
+           offset: int = Query(0, ge=0), kind: Optional[str] = None):
+    """
+    Full-text search over saved ideas/events and exported pages, best matches first.
+    With more than SEARCH_MAX_RANKED matches the ranking is approximate: matches are ranked
+    window by window, newest first, so an older best match can come after newer ones, and
+    the response says "complete": false.
+    Plain def so the SQLite query runs in the threadpool rather than on the event loop.
+    """
+    result = search_index.get_index().search(q, limit=limit, offset=offset, kind=kind)
+    return {"query": q, "limit": limit, "offset": offset, **result}
@@ -0,0 +1,72 @@
+import os
+import json
+import logging
+from typing import Any, AsyncIterator, Dict, Optional
+
+from fastapi import APIRouter, UploadFile, File, Form, Header, HTTPException
+from fastapi.responses import StreamingResponse
+
+from services import ai_service, metrics, related_ideas
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+def _sse(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@router.post("/api/process-audio/stream")
+async def process_audio_stream(
+    audio: UploadFile = File(...),
+    mode: str = Form(...),
+    cache_control: Optional[str] = Header(None),
+):
+    """
+    Server-Sent Events version of /api/process-audio:
+      event: transcription  {"transcription": ...}
+      event: field          {"field": ..., "value": ..., "complete": bool}   (repeated)
+      event: draft          {"transcription": ..., "draft": {...}, "related": [...]}  (same shape as /api/process-audio)
+      event: error          {"detail": ...}
+    """
+    if mode not in ("event", "idea"):
+        raise HTTPException(status_code=400, detail="Invalid mode. Must be 'event' or 'idea'.")
+
+    # By now the body has been received and spooled
+    metrics.observe("upload", metrics.request_elapsed())
+
+    # Transcribe before the response starts, so a failed upload still gets a plain HTTP error
+    try:
+        filename = audio.filename or "recording.webm"
+        if not os.path.splitext(filename)[1]:
+            filename += ".webm"
+        audio.file.seek(0)
+        transcription = await ai_service.transcribe_audio_cached(
+            audio.file, filename, audio.content_type or "application/octet-stream"
+        )
+    except Exception as e:
+        logger.exception("transcription failed")
+        raise HTTPException(status_code=500, detail=str(e))
+
+    use_cache = "no-cache" not in (cache_control or "").lower()
+
+    async def events() -> AsyncIterator[str]:
+        yield _sse("transcription", {"transcription": transcription})
+        if not transcription or not transcription.strip():
+            yield _sse("draft", {"transcription": "", "draft": {}, "related": []})
+            return
+        try:
+            async for update in ai_service.stream_draft(mode, transcription, use_cache):
+                if update["event"] == "field":
+                    yield _sse("field", {k: update[k] for k in ("field", "value", "complete")})
+                else:
+                    related = await related_ideas.find_related(mode, update["draft"])
+                    yield _sse("draft", {"transcription": transcription, "draft": update["draft"], "related": related})
+        except Exception as e:
+            logger.exception("draft stream failed")
+            yield _sse("error", {"detail": str(e)})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        # Keep proxies from buffering the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,86 @@
+"""
+Refresh cost and range-query latency of the local Agenda mirror behind /api/agenda.
+
+    python -m benchmarks.bench_agenda
+
+Mirrors EVENTS synthetic events from the Notion stub into a throwaway mirror (a full refresh),
+then runs an incremental refresh, which should only fetch the pages edited since the
+watermark. Then times QUERIES one-day /api/agenda lookups with a draft to check for conflicts
+(the endpoint function called directly, without HTTP) against the millisecond budget.
+"""
+import asyncio
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+from benchmarks.bench_upload import _wait_for_port
+
+STUB_PORT = 8789
+EVENTS = 20_000
+QUERIES = 500
+NOTION_LATENCY = 0.05
+TARGET_MS = 5.0
+
+
+def main():
+    tmp = tempfile.mkdtemp(prefix="bench_agenda_")
+    os.environ.update({
+        "NOTION_TOKEN": "bench",
+        "NOTION_BASE_URL": f"http://127.0.0.1:{STUB_PORT}/notion/v1",
+        "AGENDA_DATABASE_ID": "bench",
+        "NOTION_RATE_LIMIT": "20",
+        "AGENDA_MIRROR_DB": os.path.join(tmp, "agenda_mirror.db"),
+    })
+    from app.routers.agenda import agenda
+    from services import agenda_mirror, notion_service
+
+    stub = subprocess.Popen([sys.executable, "-m", "benchmarks.stubs", "--port", str(STUB_PORT),
+                             "--notion-latency", str(NOTION_LATENCY), "--agenda-events", str(EVENTS)])
+    try:
+        _wait_for_port(STUB_PORT)
+
+        async def refresh():
+            try:
+                for full in (True, False):
+                    start = time.perf_counter()
+                    fetched = await notion_service.sync_agenda(full)
+                    kind = "full" if full else "incremental"
+                    print(f"{kind} refresh: {fetched} pages in {time.perf_counter() - start:.2f}s")
+            finally:
+                await notion_service.close_client()
+
+        asyncio.run(refresh())
+    finally:
+        stub.terminate()
+        stub.wait()
+
+    mirror = agenda_mirror.get_mirror()
+    print(f"mirror holds {len(mirror)} events")
+
+    rng = random.Random(42)
+    days = EVENTS // 8
+    latencies = []
+    conflicts = 0
+    for _ in range(QUERIES):
+        day = (date(2026, 1, 1) + timedelta(days=rng.randrange(days))).isoformat()
+        hour = rng.randrange(7, 18)
+        start = time.perf_counter()
+        result = agenda(None, None, f"{day}T{hour:02d}:30", f"{day}T{hour + 1:02d}:00", 500)
+        latencies.append((time.perf_counter() - start) * 1000)
+        conflicts += bool(result["conflicts"])
+    agenda_mirror.close_mirror()
+
+    latencies.sort()
+    p50 = statistics.median(latencies)
+    p99 = latencies[int(len(latencies) * 0.99)]
+    print(f"{QUERIES} one-day lookups: p50 {p50:.2f} ms, p99 {p99:.2f} ms (target < {TARGET_MS:g} ms), "
+          f"{conflicts} with a conflict")
+
+
+if __name__ == "__main__":
+    main()
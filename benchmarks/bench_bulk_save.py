@@ -0,0 +1,78 @@
+"""
+Throughput of the save queue draining a backlog of drafts, against a stub enforcing Notion's rate limit.
+
+    python -m benchmarks.bench_bulk_save
+
+Enqueues ITEMS drafts at once (what /api/save-entries does) and times how long the worker takes
+to write them all, with one job in flight (the old serial worker) and with SAVE_QUEUE_CONCURRENCY.
+The stub adds LATENCY to every response, so a serial worker is bound by round trips rather than
+by the rate limit.
+"""
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.bench_upload import _wait_for_port
+
+STUB_PORT = 8796
+ENFORCED_RATE = 3.0
+LATENCY = 0.5
+ITEMS = 30
+
+
+async def run(concurrency: int) -> None:
+    from services import notion_service, save_queue
+
+    with tempfile.TemporaryDirectory() as tmp:
+        queue = save_queue.SaveQueue(os.path.join(tmp, "queue.db"))
+        worker = asyncio.create_task(queue.run_worker(concurrency))
+        await asyncio.sleep(0)
+        items = [{"mode": "idea", "data": {"title": f"Idea {i}", "content": f"Backlog item {i}"}}
+                 for i in range(ITEMS)]
+        start = time.perf_counter()
+        jobs = await queue.enqueue_many(items)
+        jobs = await queue.wait([job["id"] for job in jobs], 600)
+        elapsed = time.perf_counter() - start
+        worker.cancel()
+        await asyncio.gather(worker, return_exceptions=True)
+        queue.close()
+    await notion_service.close_client()
+
+    succeeded = sum(job["status"] == save_queue.SUCCEEDED for job in jobs)
+    # The first requests are served from the burst allowance
+    ideal = (ITEMS - ENFORCED_RATE) / ENFORCED_RATE
+    print(f"concurrency {concurrency}: {succeeded}/{ITEMS} saved in {elapsed:.2f}s "
+          f"({ITEMS / elapsed:.2f} items/s, limit {ENFORCED_RATE:g} req/s, {ideal / elapsed:.0%} of ideal)")
+
+
+def main():
+    os.environ.setdefault("NOTION_TOKEN", "bench")
+    os.environ.setdefault("JOURNAL_DATABASE_ID", "bench")
+    os.environ["NOTION_BASE_URL"] = f"http://127.0.0.1:{STUB_PORT}/notion/v1"
+    os.environ["NOTION_RATE_LIMIT"] = str(ENFORCED_RATE)
+    # Keep the benchmark pages out of the real local indexes
+    os.environ["SEARCH_INDEX_DB"] = ":memory:"
+    os.environ["RELATED_IDEAS_PATH"] = os.path.join(tempfile.gettempdir(), "bench_bulk_save_related")
+    from services import save_queue
+
+    stub = subprocess.Popen([sys.executable, "-m", "benchmarks.stubs", "--port", str(STUB_PORT),
+                             "--latency", str(LATENCY), "--notion-rate", str(ENFORCED_RATE)])
+    try:
+        _wait_for_port(STUB_PORT)
+        for concurrency in (1, save_queue.SAVE_QUEUE_CONCURRENCY):
+            asyncio.run(run(concurrency))
+            # Let the stub's bucket refill between runs
+            time.sleep(2)
+        print(f"stub stats: {httpx.get(f'http://127.0.0.1:{STUB_PORT}/stats').json()}")
+    finally:
+        stub.terminate()
+        stub.wait()
+
+
+if __name__ == "__main__":
+    main()
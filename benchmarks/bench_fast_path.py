@@ -0,0 +1,87 @@
+"""
+Event drafting latency with the local fast-path parser, against a chat stub.
+
+    python -m benchmarks.bench_fast_path
+
+Drafts each utterance in UTTERANCES (simple and not-so-simple, English and Chinese) through
+ai_service.process_event_text and reports the fast-path hit rate and the mean latency of hits
+and of misses (which go to the stub LLM, CHAT_LATENCY seconds per call). Also times the local
+parser on its own over the whole corpus.
+"""
+import asyncio
+import datetime
+import os
+import subprocess
+import sys
+import time
+
+from benchmarks.bench_upload import _wait_for_port
+
+STUB_PORT = 8793
+CHAT_LATENCY = 0.8
+PARSE_ROUNDS = 200
+UTTERANCES = [
+    "dentist tomorrow at 3pm",
+    "Standup next Friday 10-11am",
+    "lunch with Bob on Jan 25 at noon",
+    "call mom tonight at 8",
+    "gym tomorrow morning at 7:30",
+    "remind me to call the bank tomorrow at 9am",
+    "team sync friday 11-1pm",
+    "dinner the day after tomorrow at 7 in the evening",
+    "明天下午三点看牙医",
+    "下周五上午10点到11点开会",
+    "今晚八点和朋友吃饭",
+    "1月25日下午两点到四点面试",
+    "dentist at 3",
+    "every monday at 9am standup",
+    "dentist tomorrow at 3pm or 4pm, whichever Dr Lee has free",
+    "Flight to Tokyo on March 3rd at 6:45am, need to leave for the airport two hours early",
+    "明天三点开会",
+    "每周一上午九点例会",
+    "下周找时间跟老王讨论一下预算的事情，最好是周三或者周四下午",
+    "sometime next week coffee with Anna",
+]
+
+
+async def run() -> None:
+    from services import ai_service
+
+    hits, misses = [], []
+    for text in UTTERANCES:
+        start = time.perf_counter()
+        draft = await ai_service.process_event_text(text)
+        elapsed = time.perf_counter() - start
+        (hits if draft.get("title") != "Stub" else misses).append(elapsed)
+    await ai_service.close_client()
+
+    print(f"fast-path hit rate: {len(hits)}/{len(UTTERANCES)} ({len(hits) / len(UTTERANCES):.0%})")
+    print(f"hits:   mean {sum(hits) / max(len(hits), 1) * 1000:8.3f} ms")
+    print(f"misses: mean {sum(misses) / max(len(misses), 1) * 1000:8.3f} ms (LLM stub at {CHAT_LATENCY:g}s)")
+
+
+def main():
+    os.environ["SUPER_MIND_API_KEY"] = "bench"
+    os.environ["SUPER_MIND_BASE_URL"] = f"http://127.0.0.1:{STUB_PORT}/v1"
+    from services import event_parser
+
+    today = datetime.date(2026, 1, 18)
+    start = time.perf_counter()
+    for _ in range(PARSE_ROUNDS):
+        for text in UTTERANCES:
+            event_parser.parse_event(text, today)
+    per_call = (time.perf_counter() - start) / (PARSE_ROUNDS * len(UTTERANCES))
+    print(f"local parser: {per_call * 1e6:.1f} µs per utterance")
+
+    stub = subprocess.Popen([sys.executable, "-m", "benchmarks.stubs", "--port", str(STUB_PORT),
+                             "--chat-latency", str(CHAT_LATENCY)])
+    try:
+        _wait_for_port(STUB_PORT)
+        asyncio.run(run())
+    finally:
+        stub.terminate()
+        stub.wait()
+
+
+if __name__ == "__main__":
+    main()
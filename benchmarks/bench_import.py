@@ -0,0 +1,74 @@
+"""
+Wall-clock time of the batch voice-memo importer against the stubs, versus its stage times.
+
+    python -m benchmarks.bench_import
+
+Writes FILES fake recordings to a temp directory and imports them with import_voice_memos
+(transcribe -> draft -> save, each with its default concurrency) against stubs with the given
+per-upstream latency. Prints the importer's summary, where each stage's busy time divided by its
+concurrency is about what that stage would take on its own: with the stages overlapping, the
+wall-clock time should be close to the slowest of them rather than their sum. Then runs the
+import again to check that the manifest makes it skip everything.
+"""
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.bench_upload import _wait_for_port
+
+STUB_PORT = 8792
+FILES = 40
+FILE_BYTES = 16 * 1024
+TRANSCRIPTION_LATENCY = 0.5
+CHAT_LATENCY = 0.8
+NOTION_LATENCY = 0.3
+
+
+def main():
+    tmp = tempfile.mkdtemp(prefix="bench_import_")
+    os.environ.update({
+        "SUPER_MIND_API_KEY": "bench",
+        "SUPER_MIND_BASE_URL": f"http://127.0.0.1:{STUB_PORT}/v1",
+        "NOTION_TOKEN": "bench",
+        "NOTION_BASE_URL": f"http://127.0.0.1:{STUB_PORT}/notion/v1",
+        "JOURNAL_DATABASE_ID": "bench",
+        # Keep the save stage latency-bound rather than rate-bound
+        "NOTION_RATE_LIMIT": "20",
+        "TRANSCRIPTION_CACHE_DB": "",
+        "SEARCH_INDEX_DB": ":memory:",
+        "RELATED_IDEAS_PATH": os.path.join(tmp, "related_ideas"),
+    })
+    import import_voice_memos
+
+    memos = os.path.join(tmp, "memos")
+    os.makedirs(memos)
+    for i in range(FILES):
+        with open(os.path.join(memos, f"memo-{i:03d}.webm"), "wb") as f:
+            f.write(os.urandom(FILE_BYTES))
+    manifest = os.path.join(tmp, "manifest.jsonl")
+
+    stub = subprocess.Popen([sys.executable, "-m", "benchmarks.stubs", "--port", str(STUB_PORT),
+                             "--transcription-latency", str(TRANSCRIPTION_LATENCY),
+                             "--chat-latency", str(CHAT_LATENCY), "--notion-latency", str(NOTION_LATENCY)])
+    try:
+        _wait_for_port(STUB_PORT)
+        start = time.perf_counter()
+        stats = asyncio.run(import_voice_memos.import_memos(memos, manifest=manifest))
+        elapsed = time.perf_counter() - start
+        stage_times = [stats.busy[stage] / stats.concurrency[stage] for stage in import_voice_memos.STAGES]
+        print(f"\nwall clock {elapsed:.1f}s | sum of stages {sum(stage_times):.1f}s | "
+              f"slowest stage {max(stage_times):.1f}s")
+
+        print("\nsecond run (resume):")
+        again = asyncio.run(import_voice_memos.import_memos(memos, manifest=manifest))
+        print(f"skipped {again.skipped}/{FILES}")
+    finally:
+        stub.terminate()
+        stub.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Tail latency of draft generation under the LLM call policy, against a chat stub with a slow tail
+and occasional garbage replies.
+
+    python -m benchmarks.bench_llm
+
+Runs REQUESTS uncached process_idea_text calls (CONCURRENCY at a time) three ways: a single
+attempt (no retries, no hedging), with retries, and with retries plus hedged requests. The
+runs share the latency history, as a long-running server would, so hedging starts at the p90.
+SLOW_RATE of the stub's replies take SLOW_LATENCY extra seconds and GARBAGE_RATE aren't JSON.
+"""
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+
+from benchmarks.bench_load import percentile
+from benchmarks.bench_upload import _wait_for_port
+
+STUB_PORT = 8797
+CHAT_LATENCY = 0.2
+SLOW_RATE = 0.05
+SLOW_LATENCY = 3.0
+GARBAGE_RATE = 0.05
+REQUESTS = 200
+CONCURRENCY = 8
+
+
+async def run(label: str, max_attempts: int, hedge: bool) -> None:
+    from services import ai_service
+
+    ai_service.LLM_MAX_ATTEMPTS = max_attempts
+    ai_service.LLM_HEDGE = hedge
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+    latencies = []
+    failures = 0
+
+    async def one(i: int):
+        nonlocal failures
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                await ai_service.process_idea_text(f"{label} idea {i}", use_cache=False)
+                latencies.append(time.perf_counter() - start)
+            except Exception:
+                failures += 1
+
+    await asyncio.gather(*[one(i) for i in range(REQUESTS)])
+    await ai_service.close_client()
+    latencies.sort()
+    print(f"{label:<16} ok {len(latencies):>4}/{REQUESTS}  "
+          + "  ".join(f"p{q} {percentile(latencies, q) * 1000:>6.0f} ms" for q in (50, 90, 99)))
+
+
+def main():
+    os.environ["SUPER_MIND_API_KEY"] = "bench"
+    os.environ["SUPER_MIND_BASE_URL"] = f"http://127.0.0.1:{STUB_PORT}/v1"
+    os.environ["LOG_LEVEL"] = "WARNING"
+
+    stub = subprocess.Popen([sys.executable, "-m", "benchmarks.stubs", "--port", str(STUB_PORT),
+                             "--chat-latency", str(CHAT_LATENCY), "--chat-slow-rate", str(SLOW_RATE),
+                             "--chat-slow-latency", str(SLOW_LATENCY), "--chat-garbage-rate", str(GARBAGE_RATE),
+                             "--seed", "0"])
+    try:
+        _wait_for_port(STUB_PORT)
+        asyncio.run(run("single attempt", 1, False))
+        asyncio.run(run("retries", 3, False))
+        asyncio.run(run("retries + hedge", 3, True))
+        print(f"stub stats: {httpx.get(f'http://127.0.0.1:{STUB_PORT}/stats').json()}")
+    finally:
+        stub.terminate()
+        stub.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+"""
+End-to-end load test of the real app (main:app) against the local upstream stubs.
+
+    python -m benchmarks.bench_load
+    python -m benchmarks.bench_load --save benchmarks/results/baseline.json
+    python -m benchmarks.bench_load --compare benchmarks/results/baseline.json
+
+Starts the stubs (transcription, chat completions and Notion, each with its own latency
+and error rate) and the app under uvicorn, then drives /api/process-audio and
+/api/save-entry with closed-loop clients at each concurrency level for --duration seconds.
+Reports throughput, error count and p50/p95/p99 latency per scenario and level, plus the
+mean of each Server-Timing stage. --save writes the results as JSON; --compare loads an
+earlier run and flags throughput drops or p95 increases beyond --tolerance, exiting with
+status 1 if any scenario regressed.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+import httpx
+
+from benchmarks.bench_upload import _wait_for_port
+
+STUB_PORT = 8798
+APP_PORT = 8799
+AUDIO_BYTES = 32 * 1024
+SCENARIOS = ("process-audio", "save-entry")
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    # Nearest-rank
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(q / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def parse_server_timing(header: str) -> Dict[str, float]:
+    stages: Dict[str, float] = {}
+    for entry in header.split(","):
+        name, _, params = entry.strip().partition(";")
+        if params.startswith("dur="):
+            stages[name] = stages.get(name, 0.0) + float(params[4:])
+    return stages
+
+
+async def one_request(client: httpx.AsyncClient, scenario: str, n: int) -> httpx.Response:
+    if scenario == "process-audio":
+        # Unique audio per request, so neither the transcription nor the draft cache can answer
+        audio = n.to_bytes(8, "big") + os.urandom(AUDIO_BYTES - 8)
+        return await client.post(
+            "/api/process-audio",
+            files={"audio": ("recording.webm", audio, "audio/webm")},
+            data={"mode": "idea" if n % 2 else "event"},
+        )
+    return await client.post(
+        "/api/save-entry",
+        json={"mode": "idea", "data": {"title": f"Load test {n}", "content": f"- item {n}\n- **bold** text"}},
+    )
+
+
+async def run_level(scenario: str, concurrency: int, duration: float) -> Dict[str, Any]:
+    latencies: List[float] = []
+    stage_totals: Dict[str, float] = {}
+    errors = 0
+    counter = 0
+    deadline = time.perf_counter() + duration
+
+    async def worker(client: httpx.AsyncClient):
+        nonlocal errors, counter
+        while time.perf_counter() < deadline:
+            counter += 1
+            start = time.perf_counter()
+            try:
+                response = await one_request(client, scenario, counter)
+                ok = response.status_code < 400
+            except httpx.HTTPError:
+                response, ok = None, False
+            latencies.append(time.perf_counter() - start)
+            if not ok:
+                errors += 1
+            elif response is not None:
+                for stage, ms in parse_server_timing(response.headers.get("server-timing", "")).items():
+                    stage_totals[stage] = stage_totals.get(stage, 0.0) + ms
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{APP_PORT}", limits=limits, timeout=120) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*[worker(client) for _ in range(concurrency)])
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    succeeded = len(latencies) - errors
+    return {
+        "scenario": scenario,
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": round(succeeded / elapsed, 2),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+        "stages_mean_ms": {stage: round(total / max(succeeded, 1), 1) for stage, total in sorted(stage_totals.items())},
+    }
+
+
+def print_results(results: List[Dict[str, Any]]) -> None:
+    print(f"{'scenario':<14} {'conc':>4} {'reqs':>6} {'errs':>5} {'rps':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}  stages (mean ms)")
+    for r in results:
+        stages = " ".join(f"{k}={v}" for k, v in r["stages_mean_ms"].items())
+        print(f"{r['scenario']:<14} {r['concurrency']:>4} {r['requests']:>6} {r['errors']:>5} {r['throughput_rps']:>8} "
+              f"{r['p50_ms']:>8} {r['p95_ms']:>8} {r['p99_ms']:>8}  {stages}")
+
+
+def compare(results: List[Dict[str, Any]], baseline_path: str, tolerance: float) -> bool:
+    """
+    Prints the change against a saved run. Returns False if anything regressed beyond tolerance.
+    """
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {(r["scenario"], r["concurrency"]): r for r in json.load(f)["results"]}
+    ok = True
+    print(f"\nCompared with {baseline_path} (tolerance {tolerance:.0%}):")
+    for r in results:
+        before = baseline.get((r["scenario"], r["concurrency"]))
+        if before is None:
+            continue
+        rps_change = r["throughput_rps"] / before["throughput_rps"] - 1 if before["throughput_rps"] else 0.0
+        p95_change = r["p95_ms"] / before["p95_ms"] - 1 if before["p95_ms"] else 0.0
+        regressed = rps_change < -tolerance or p95_change > tolerance
+        ok = ok and not regressed
+        print(f"{r['scenario']:<14} {r['concurrency']:>4}  rps {rps_change:+.1%}  p95 {p95_change:+.1%}"
+              f"{'  REGRESSION' if regressed else ''}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 32])
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per scenario and concurrency level")
+    parser.add_argument("--scenario", choices=SCENARIOS, nargs="+", default=list(SCENARIOS))
+    parser.add_argument("--transcription-latency", type=float, default=0.3)
+    parser.add_argument("--chat-latency", type=float, default=0.8)
+    parser.add_argument("--notion-latency", type=float, default=0.2)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of upstream requests answered with 503")
+    parser.add_argument("--save", help="Write the results to this JSON file")
+    parser.add_argument("--compare", help="Compare with the results in this JSON file")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Allowed throughput drop / p95 increase")
+    args = parser.parse_args()
+
+    stub_args = [
+        "--transcription-latency", str(args.transcription_latency),
+        "--chat-latency", str(args.chat_latency),
+        "--notion-latency", str(args.notion_latency),
+        "--seed", "0",
+    ]
+    for upstream in ("transcription", "chat", "notion"):
+        stub_args += [f"--{upstream}-error-rate", str(args.error_rate)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {
+            **os.environ,
+            "SUPER_MIND_API_KEY": "bench",
+            "SUPER_MIND_BASE_URL": f"http://127.0.0.1:{STUB_PORT}/v1",
+            "NOTION_TOKEN": "bench",
+            "NOTION_BASE_URL": f"http://127.0.0.1:{STUB_PORT}/notion/v1",
+            "AGENDA_DATABASE_ID": "bench",
+            "JOURNAL_DATABASE_ID": "bench",
+            "SAVE_QUEUE_DB": os.path.join(tmp, "save_queue.db"),
+            "SEARCH_INDEX_DB": os.path.join(tmp, "search_index.db"),
+            "RELATED_IDEAS_PATH": os.path.join(tmp, "related_ideas"),
+            "NOTION_INDEX_DB": os.path.join(tmp, "notion_index.db"),
+            "AGENDA_MIRROR_DB": os.path.join(tmp, "agenda_mirror.db"),
+            "LOG_LEVEL": "WARNING",
+        }
+        # Without credentials the app skips Basic auth
+        env.pop("AUTH_USERNAME", None)
+        env.pop("AUTH_PASSWORD", None)
+        stub = subprocess.Popen([sys.executable, "-m", "benchmarks.stubs", "--port", str(STUB_PORT)] + stub_args)
+        app = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--port", str(APP_PORT), "--log-level", "warning"],
+            env=env,
+        )
+        try:
+            _wait_for_port(STUB_PORT)
+            _wait_for_port(APP_PORT, timeout=30)
+            results = []
+            for scenario in args.scenario:
+                for concurrency in args.concurrency:
+                    results.append(asyncio.run(run_level(scenario, concurrency, args.duration)))
+                    print_results(results[-1:])
+        finally:
+            app.terminate()
+            stub.terminate()
+            app.wait()
+            stub.wait()
+
+    print()
+    print_results(results)
+    run = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "settings": {k: v for k, v in vars(args).items() if k not in ("save", "compare")},
+        "results": results,
+    }
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(run, f, indent=2)
+        print(f"\nSaved to {args.save}")
+    if args.compare and not compare(results, args.compare, args.tolerance):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
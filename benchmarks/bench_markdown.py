@@ -0,0 +1,104 @@
+"""
+Markdown-to-Notion-blocks compilation on long documents, and saving one through the stub.
+
+    python -m benchmarks.bench_markdown
+
+Compiles a LINES-line document mixing every supported construct (long paragraphs, deeply
+nested lists, code, quotes, inline markup, CJK text) and reports lines/s and the number of
+request batches. It then saves the same document as an idea through notion_service against
+a stub that rejects payloads over Notion's limits, so any limit violation fails the run.
+"""
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import time
+
+import httpx
+
+from benchmarks.bench_upload import _wait_for_port
+from services import markdown_blocks
+
+STUB_PORT = 8795
+LINES = 10_000
+RUNS = 5
+
+_WORDS = ["idea", "meeting", "**bold**", "*italic*", "`code`", "~~old~~", "[link](https://example.com)",
+          "会议", "记录", "snake_case", "2_000", "notes", "plan", "follow-up"]
+
+
+def make_document(lines: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    out = []
+    while len(out) < lines:
+        kind = rng.random()
+        if kind < 0.05:
+            out.append(f"{'#' * rng.randint(1, 4)} Section {len(out)}")
+        elif kind < 0.35:
+            # Nested lists, deeper than one request allows
+            for _ in range(rng.randint(1, 20)):
+                depth = rng.randint(0, 4)
+                marker = rng.choice(["-", "*", "1.", "- [ ]", "- [x]"])
+                out.append("  " * depth + f"{marker} " + " ".join(rng.choices(_WORDS, k=8)))
+        elif kind < 0.45:
+            out.append("```py")
+            out.extend(f"x_{i} = {i}" for i in range(rng.randint(1, 30)))
+            out.append("```")
+        elif kind < 0.5:
+            out.append("> " + " ".join(rng.choices(_WORDS, k=12)))
+        elif kind < 0.52:
+            out.append("---")
+        elif kind < 0.55:
+            # A paragraph over the 2000 character rich_text limit
+            out.append("x" * rng.randint(2000, 6000))
+        else:
+            out.append(" ".join(rng.choices(_WORDS, k=rng.randint(5, 40))))
+        out.append("")
+    return "\n".join(out[:lines])
+
+
+def bench_compile(document: str) -> None:
+    timings = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        blocks = markdown_blocks.markdown_to_blocks(document)
+        batches = list(markdown_blocks.batch_blocks(blocks))
+        timings.append(time.perf_counter() - start)
+    best = min(timings)
+    total = sum(markdown_blocks._count(block) for block in blocks)
+    print(f"{LINES} lines: best {best * 1000:.1f} ms ({LINES / best:,.0f} lines/s), "
+          f"{len(blocks)} top-level / {total} total blocks in {len(batches)} requests")
+
+
+async def bench_save(document: str) -> None:
+    from services import notion_service
+    start = time.perf_counter()
+    await notion_service.save_entry("idea", {"title": "Long document", "content": document})
+    elapsed = time.perf_counter() - start
+    await notion_service.close_client()
+    stats = httpx.get(f"http://127.0.0.1:{STUB_PORT}/stats").json()
+    print(f"saved through the stub in {elapsed:.2f}s, {stats['blocks_written']} top-level blocks accepted")
+
+
+def main():
+    document = make_document(LINES)
+    bench_compile(document)
+
+    os.environ.setdefault("NOTION_TOKEN", "bench")
+    os.environ.setdefault("JOURNAL_DATABASE_ID", "bench")
+    os.environ["NOTION_BASE_URL"] = f"http://127.0.0.1:{STUB_PORT}/notion/v1"
+    # Keep the benchmark page out of the real local indexes
+    os.environ["SEARCH_INDEX_DB"] = ":memory:"
+    os.environ["RELATED_IDEAS_PATH"] = os.path.join("/tmp", "bench_markdown_related")
+    stub = subprocess.Popen([sys.executable, "-m", "benchmarks.stubs", "--port", str(STUB_PORT)])
+    try:
+        _wait_for_port(STUB_PORT)
+        asyncio.run(bench_save(document))
+    finally:
+        stub.terminate()
+        stub.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Bytes uploaded and transcription latency with and without audio normalization.
+
+    python -m benchmarks.bench_normalize
+
+Builds CLIPS synthetic "hold to record" clips (48 kHz stereo 16-bit WAV: LEAD_SILENCE seconds of
+near-silence, SPEECH seconds of modulated tones over noise, TAIL_SILENCE seconds of
+near-silence) and transcribes each through ai_service.transcribe_audio_cached, once with
+AUDIO_NORMALIZE off and once on. The stub charges TRANSCRIPTION_SECONDS_PER_MB for the audio
+it receives. With ffmpeg on the PATH a webm/opus copy of the clips is measured as well.
+"""
+import asyncio
+import io
+import os
+import statistics
+import subprocess
+import sys
+import time
+import wave
+
+import httpx
+import numpy as np
+
+from benchmarks.bench_upload import _wait_for_port
+
+STUB_PORT = 8795
+RATE = 48000
+LEAD_SILENCE = 1.5
+SPEECH = 4.0
+TAIL_SILENCE = 2.5
+CLIPS = 10
+TRANSCRIPTION_LATENCY = 0.2
+TRANSCRIPTION_SECONDS_PER_MB = 1.0
+
+
+def make_clip(seed: int) -> bytes:
+    rng = np.random.default_rng(seed)
+    def noise(seconds):
+        return rng.normal(0, 0.002, int(seconds * RATE))
+    t = np.arange(int(SPEECH * RATE)) / RATE
+    # Syllable-rate envelope over a few harmonics
+    envelope = 0.5 * (1 + np.sin(2 * np.pi * 3.5 * t)) ** 2 / 4
+    voice = sum(np.sin(2 * np.pi * f * t) / (i + 1) for i, f in enumerate((180, 360, 720, 1440)))
+    speech = 0.3 * envelope * voice + noise(SPEECH)
+    mono = np.concatenate([noise(LEAD_SILENCE), speech, noise(TAIL_SILENCE)])
+    stereo = np.repeat((np.clip(mono, -1, 1) * 32767).astype("<i2")[:, None], 2, axis=1)
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as writer:
+        writer.setnchannels(2)
+        writer.setsampwidth(2)
+        writer.setframerate(RATE)
+        writer.writeframes(stereo.tobytes())
+    return buffer.getvalue()
+
+
+def to_webm(wav: bytes) -> bytes:
+    return subprocess.run(["ffmpeg", "-hide_banner", "-loglevel", "error", "-i", "pipe:0",
+                           "-c:a", "libopus", "-b:a", "64k", "-f", "webm", "pipe:1"],
+                          input=wav, capture_output=True, check=True).stdout
+
+
+async def run(label: str, clips, filename: str, content_type: str, normalize: bool) -> None:
+    from services import ai_service, audio_normalize
+
+    audio_normalize.AUDIO_NORMALIZE = normalize
+    before = httpx.get(f"http://127.0.0.1:{STUB_PORT}/stats").json()["transcription_bytes"]
+    latencies = []
+    for clip in clips:
+        start = time.perf_counter()
+        await ai_service.transcribe_audio_cached(io.BytesIO(clip), filename, content_type)
+        latencies.append(time.perf_counter() - start)
+    await ai_service.close_client()
+    sent = httpx.get(f"http://127.0.0.1:{STUB_PORT}/stats").json()["transcription_bytes"] - before
+    print(f"{label:<30} uploaded {sent / len(clips) / 1024:>8.1f} KiB/clip  "
+          f"latency p50 {statistics.median(latencies) * 1000:>6.0f} ms  max {max(latencies) * 1000:>6.0f} ms")
+
+
+def main():
+    os.environ["SUPER_MIND_API_KEY"] = "bench"
+    os.environ["SUPER_MIND_BASE_URL"] = f"http://127.0.0.1:{STUB_PORT}/v1"
+    # Memory-only transcription cache
+    os.environ["TRANSCRIPTION_CACHE_DB"] = ""
+    from services import audio_normalize
+
+    stub = subprocess.Popen([sys.executable, "-m", "benchmarks.stubs", "--port", str(STUB_PORT),
+                             "--transcription-latency", str(TRANSCRIPTION_LATENCY),
+                             "--transcription-seconds-per-mb", str(TRANSCRIPTION_SECONDS_PER_MB)])
+    try:
+        _wait_for_port(STUB_PORT)
+        print(f"ffmpeg: {'yes' if audio_normalize.ffmpeg_available() else 'no (WAV path only)'}")
+        # Fresh clips for every run, so none is answered from the transcription cache
+        clips = iter(range(4 * CLIPS))
+        def wav_clips():
+            return [make_clip(next(clips)) for _ in range(CLIPS)]
+        asyncio.run(run("wav 48 kHz stereo, as is", wav_clips(), "clip.wav", "audio/wav", False))
+        asyncio.run(run("wav 48 kHz stereo, normalized", wav_clips(), "clip.wav", "audio/wav", True))
+        if audio_normalize.ffmpeg_available():
+            asyncio.run(run("webm/opus, as is", [to_webm(c) for c in wav_clips()], "clip.webm", "audio/webm", False))
+            asyncio.run(run("webm/opus, normalized", [to_webm(c) for c in wav_clips()], "clip.webm", "audio/webm", True))
+    finally:
+        stub.terminate()
+        stub.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Throughput of the shared Notion limiter against a stub that enforces Notion's rate limit.
+
+    python -m benchmarks.bench_notion_rate
+
+Fires REQUESTS page creations with CONCURRENCY in flight through NotionClient and reports the
+achieved rate, how close it gets to the enforced limit and how many 429s were provoked.
+"""
+import asyncio
+import subprocess
+import sys
+import time
+
+import httpx
+
+from benchmarks.bench_upload import _wait_for_port
+from services.notion_client import NotionClient, TokenBucket
+
+STUB_PORT = 8792
+ENFORCED_RATE = 3.0
+REQUESTS = 60
+CONCURRENCY = 10
+
+
+async def run() -> None:
+    base_url = f"http://127.0.0.1:{STUB_PORT}/notion/v1"
+    # A fresh bucket per run, configured the way the app is
+    client = NotionClient("bench", base_url, bucket=TokenBucket(ENFORCED_RATE, ENFORCED_RATE))
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+
+    async def one():
+        async with semaphore:
+            await client.request("POST", "/pages", json={"parent": {}, "properties": {}})
+
+    start = time.perf_counter()
+    await asyncio.gather(*[one() for _ in range(REQUESTS)])
+    elapsed = time.perf_counter() - start
+    await client.aclose()
+
+    stats = httpx.get(f"http://127.0.0.1:{STUB_PORT}/stats").json()
+    # The first second is served from the burst allowance, so the ideal is
+    # REQUESTS - burst requests spread over elapsed time at the enforced rate
+    ideal = (REQUESTS - ENFORCED_RATE) / ENFORCED_RATE
+    print(f"{REQUESTS} requests in {elapsed:.2f}s ({REQUESTS / elapsed:.2f} req/s, limit {ENFORCED_RATE:g} req/s)")
+    print(f"efficiency vs. ideal {ideal:.2f}s: {ideal / elapsed:.0%}, 429 responses: {stats['notion_429']}")
+
+
+def main():
+    stub = subprocess.Popen([sys.executable, "-m", "benchmarks.stubs", "--port", str(STUB_PORT),
+                             "--notion-rate", str(ENFORCED_RATE)])
+    try:
+        _wait_for_port(STUB_PORT)
+        asyncio.run(run())
+    finally:
+        stub.terminate()
+        stub.wait()
+
+
+if __name__ == "__main__":
+    main()
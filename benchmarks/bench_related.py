@@ -0,0 +1,59 @@
+"""
+Lookup latency of the related-ideas index at 50k saved ideas.
+
+    python -m benchmarks.bench_related
+
+Adds IDEAS synthetic English/Chinese ideas to a throwaway index, reopens it (to time startup
+from the memory-mapped files) and times QUERIES single lookups against the 20 ms budget.
+"""
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from benchmarks.bench_search import _text
+from services.related_ideas import RelatedIdeas
+
+IDEAS = 50_000
+QUERIES = 200
+TARGET_MS = 20.0
+
+
+def main():
+    rng = random.Random(42)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "related")
+        index = RelatedIdeas(path)
+        start = time.perf_counter()
+        for i in range(IDEAS):
+            index.add(f"idea-{i}", _text(rng, 4), _text(rng, 30))
+        elapsed = time.perf_counter() - start
+        print(f"added {IDEAS} ideas in {elapsed:.1f}s ({elapsed / IDEAS * 1000:.2f} ms each)")
+        index.close()
+
+        start = time.perf_counter()
+        index = RelatedIdeas(path)
+        print(f"reopened in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+        latencies = []
+        for _ in range(QUERIES):
+            text = _text(rng, 30)
+            start = time.perf_counter()
+            index.lookup(text)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        index.lookup_many([_text(rng, 30) for _ in range(32)])
+        batched = (time.perf_counter() - start) * 1000 / 32
+        index.close()
+
+    latencies.sort()
+    p50 = statistics.median(latencies)
+    p95 = latencies[int(len(latencies) * 0.95)]
+    print(f"{QUERIES} lookups: p50 {p50:.2f} ms, p95 {p95:.2f} ms (target < {TARGET_MS:g} ms)")
+    print(f"batched lookups (32 at once): {batched:.2f} ms per query")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Query latency of the local full-text index at 100k entries.
+
+    python -m benchmarks.bench_search
+
+Builds a throwaway index of ENTRIES synthetic ideas mixing English and Chinese text, then
+times QUERIES searches (one- and two-term, both scripts) and reports p50/p95/p99 latency
+against the 10 ms target.
+"""
+import itertools
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from services.search_index import SearchIndex
+
+ENTRIES = 100_000
+QUERIES = 500
+TARGET_MS = 10.0
+
+# Zipf-distributed vocabularies, roughly like real notes: a few very common terms, a long tail
+WORDS = [f"w{i}" + "".join(chr(97 + (i * 7 + k) % 26) for k in range(3 + i % 5)) for i in range(5000)]
+HANZI = [chr(0x4E00 + i * 7 % 0x5000) for i in range(3000)]
+WORD_WEIGHTS = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(WORDS))))
+HANZI_WEIGHTS = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(HANZI))))
+
+
+def _text(rng: random.Random, words: int) -> str:
+    parts = []
+    for _ in range(words):
+        if rng.random() < 0.5:
+            parts.append(rng.choices(WORDS, cum_weights=WORD_WEIGHTS)[0])
+        else:
+            parts.append("".join(rng.choices(HANZI, cum_weights=HANZI_WEIGHTS, k=rng.randint(2, 4))))
+    return " ".join(parts)
+
+
+def _query(rng: random.Random) -> str:
+    # Queries are cut from generated text, so every one has matches
+    terms = _text(rng, 8).split()
+    return " ".join(rng.sample(terms, rng.randint(1, 2)))
+
+
+def main():
+    rng = random.Random(42)
+    with tempfile.TemporaryDirectory() as tmp:
+        index = SearchIndex(os.path.join(tmp, "search.db"))
+
+        start = time.perf_counter()
+        index.add_many(
+            {"id": f"idea-{i}", "kind": "idea", "title": _text(rng, 4), "content": _text(rng, 40)}
+            for i in range(ENTRIES)
+        )
+        print(f"indexed {ENTRIES} entries in {time.perf_counter() - start:.1f}s")
+
+        latencies = []
+        for _ in range(QUERIES):
+            query = _query(rng)
+            start = time.perf_counter()
+            index.search(query, limit=20)
+            latencies.append((time.perf_counter() - start) * 1000)
+        index.close()
+
+    latencies.sort()
+    p50 = statistics.median(latencies)
+    p95 = latencies[int(len(latencies) * 0.95)]
+    p99 = latencies[int(len(latencies) * 0.99)]
+    print(f"{QUERIES} queries: p50 {p50:.2f} ms, p95 {p95:.2f} ms, p99 {p99:.2f} ms (target < {TARGET_MS:g} ms)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Wall-clock transcription time of a long memo, as one request and as parallel segments.
+
+    python -m benchmarks.bench_segments
+
+Builds a MINUTES-long 16 kHz mono WAV of tone bursts separated by short pauses, then transcribes
+it through ai_service.transcribe_audio_cached with segmentation off, and with
+SEGMENT_SECONDS segments at the default TRANSCRIPTION_CONCURRENCY and with a worker per segment. The stub charges
+TRANSCRIPTION_SECONDS_PER_MB, so a request takes time in proportion to its audio, and fails
+ERROR_RATE of transcription requests with 503 (retried per segment).
+"""
+import asyncio
+import io
+import os
+import subprocess
+import sys
+import time
+import wave
+
+import httpx
+import numpy as np
+
+from benchmarks.bench_upload import _wait_for_port
+
+STUB_PORT = 8794
+RATE = 16000
+MINUTES = 10
+SEGMENT_SECONDS = 60
+TRANSCRIPTION_LATENCY = 0.2
+TRANSCRIPTION_SECONDS_PER_MB = 0.5
+ERROR_RATE = 0.1
+
+
+def make_memo(seed: int) -> bytes:
+    rng = np.random.default_rng(seed)
+    pieces = []
+    total = 0
+    while total < MINUTES * 60 * RATE:
+        seconds = rng.uniform(4, 12)
+        t = np.arange(int(seconds * RATE)) / RATE
+        envelope = (0.5 * (1 + np.sin(2 * np.pi * rng.uniform(3, 5) * t))) ** 2
+        burst = 0.3 * envelope * np.sin(2 * np.pi * rng.uniform(150, 250) * t)
+        pause = np.zeros(int(rng.uniform(0.4, 0.9) * RATE))
+        pieces += [burst, pause]
+        total += len(burst) + len(pause)
+    samples = np.concatenate(pieces) + rng.normal(0, 0.002, total)
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as writer:
+        writer.setnchannels(1)
+        writer.setsampwidth(2)
+        writer.setframerate(RATE)
+        writer.writeframes((np.clip(samples, -1, 1) * 32767).astype("<i2").tobytes())
+    return buffer.getvalue()
+
+
+async def run(label: str, memo: bytes, segment_seconds: float, concurrency: int) -> None:
+    from services import ai_service, audio_normalize
+
+    audio_normalize.AUDIO_SEGMENT_SECONDS = segment_seconds
+    ai_service.TRANSCRIPTION_CONCURRENCY = concurrency
+    segments = audio_normalize.split_segments(audio_normalize.decode_wav(io.BytesIO(memo)))
+    longest = max(end - start for start, end, _ in segments) * 2 / 1e6
+    before = httpx.get(f"http://127.0.0.1:{STUB_PORT}/stats").json()
+    start = time.perf_counter()
+    text = await ai_service.transcribe_audio_cached(io.BytesIO(memo), "memo.wav", "audio/wav")
+    elapsed = time.perf_counter() - start
+    await ai_service.close_client()
+    after = httpx.get(f"http://127.0.0.1:{STUB_PORT}/stats").json()
+    print(f"{label:<26} {len(segments):>3} segments  {elapsed:>6.2f}s  "
+          f"(longest segment ~{TRANSCRIPTION_LATENCY + longest * TRANSCRIPTION_SECONDS_PER_MB:.2f}s upstream)  "
+          f"requests {after['transcriptions'] + after['errors'] - before['transcriptions'] - before['errors']}, "
+          f"503s retried {after['errors'] - before['errors']}, {len(text)} chars")
+
+
+def main():
+    os.environ["SUPER_MIND_API_KEY"] = "bench"
+    os.environ["SUPER_MIND_BASE_URL"] = f"http://127.0.0.1:{STUB_PORT}/v1"
+    # Memory-only transcription cache
+    os.environ["TRANSCRIPTION_CACHE_DB"] = ""
+    from services import ai_service
+
+    stub = subprocess.Popen([sys.executable, "-m", "benchmarks.stubs", "--port", str(STUB_PORT),
+                             "--transcription-latency", str(TRANSCRIPTION_LATENCY),
+                             "--transcription-seconds-per-mb", str(TRANSCRIPTION_SECONDS_PER_MB),
+                             "--transcription-error-rate", str(ERROR_RATE), "--seed", "1"])
+    try:
+        _wait_for_port(STUB_PORT)
+        workers = ai_service.TRANSCRIPTION_CONCURRENCY
+        print(f"{MINUTES}-minute memo")
+        # A distinct memo per run, so none is answered from the transcription cache
+        asyncio.run(run("single request", make_memo(0), MINUTES * 60 * 2, workers))
+        asyncio.run(run(f"{SEGMENT_SECONDS}s segments, {workers} workers", make_memo(1), SEGMENT_SECONDS, workers))
+        asyncio.run(run(f"{SEGMENT_SECONDS}s segments, 16 workers", make_memo(2), SEGMENT_SECONDS, 16))
+    finally:
+        stub.terminate()
+        stub.wait()
+
+
+if __name__ == "__main__":
+    main()
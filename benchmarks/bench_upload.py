@@ -0,0 +1,126 @@
+"""
+Compares the old temp-file upload path with the streaming one for 1 MB and 50 MB clips.
+
+    python -m benchmarks.bench_upload
+
+"legacy" copies the spooled upload to a NamedTemporaryFile and posts it with `requests`
+(which builds the whole multipart body in memory). "streaming" hands the spooled upload
+to ai_service.transcribe_audio, which streams it in chunks. Each case runs in its own
+process so the peak RSS numbers don't contaminate each other.
+"""
+import argparse
+import asyncio
+import os
+import resource
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+STUB_PORT = 8791
+SIZES_MB = [1, 50]
+ITERATIONS = 5
+SPOOL_MAX_BYTES = 1024 * 1024
+
+
+def _make_upload(size: int) -> tempfile.SpooledTemporaryFile:
+    # Mirrors what Starlette hands to the endpoint: a SpooledTemporaryFile that
+    # spills to disk past the spool threshold.
+    upload = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)
+    chunk = os.urandom(1024 * 1024)
+    remaining = size
+    while remaining > 0:
+        upload.write(chunk[:remaining])
+        remaining -= len(chunk)
+    upload.seek(0)
+    return upload
+
+
+def _legacy(upload, base_url: str) -> None:
+    import requests
+
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".webm") as temp_audio:
+        shutil.copyfileobj(upload, temp_audio)
+        temp_path = temp_audio.name
+    try:
+        with open(temp_path, "rb") as f:
+            files = {"audio_file": (os.path.basename(temp_path), f)}
+            response = requests.post(f"{base_url}/audio/transcriptions", files=files)
+        response.raise_for_status()
+    finally:
+        os.remove(temp_path)
+
+
+async def _streaming(upload) -> None:
+    from services import ai_service
+
+    await ai_service.transcribe_audio(upload, "recording.webm")
+
+
+def run_case(mode: str, size_mb: int) -> None:
+    base_url = f"http://127.0.0.1:{STUB_PORT}/v1"
+    os.environ.setdefault("SUPER_MIND_API_KEY", "bench")
+    os.environ["SUPER_MIND_BASE_URL"] = base_url
+
+    # Import both paths up front so module loading doesn't count towards the RSS delta
+    import requests  # noqa: F401
+    from services import ai_service  # noqa: F401
+
+    latencies = []
+    baseline_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    loop = asyncio.new_event_loop()
+    for _ in range(ITERATIONS):
+        upload = _make_upload(size_mb * 1024 * 1024)
+        start = time.perf_counter()
+        if mode == "legacy":
+            _legacy(upload, base_url)
+        else:
+            loop.run_until_complete(_streaming(upload))
+        latencies.append(time.perf_counter() - start)
+        upload.close()
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    latencies.sort()
+    median_ms = latencies[len(latencies) // 2] * 1000
+    # ru_maxrss is in KiB on Linux
+    print(f"{mode:<10} {size_mb:>4} MB  median {median_ms:8.1f} ms  "
+          f"peak RSS +{(peak_rss - baseline_rss) / 1024:7.1f} MiB")
+
+
+def _wait_for_port(port: int, timeout: float = 10.0) -> None:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        with socket.socket() as s:
+            if s.connect_ex(("127.0.0.1", port)) == 0:
+                return
+        time.sleep(0.1)
+    raise RuntimeError(f"Stub server did not start on port {port}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--case", nargs=2, metavar=("MODE", "SIZE_MB"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.case:
+        run_case(args.case[0], int(args.case[1]))
+        return
+
+    stub = subprocess.Popen([sys.executable, "-m", "benchmarks.stubs", "--port", str(STUB_PORT)])
+    try:
+        _wait_for_port(STUB_PORT)
+        for size_mb in SIZES_MB:
+            for mode in ("legacy", "streaming"):
+                subprocess.run(
+                    [sys.executable, "-m", "benchmarks.bench_upload", "--case", mode, str(size_mb)],
+                    check=True,
+                )
+    finally:
+        stub.terminate()
+        stub.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,357 @@
+"""
+Local stand-ins for the upstream APIs, used by the benchmarks.
+
+Run standalone with:
+    python -m benchmarks.stubs --port 8790 --latency 0.2
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+import zlib
+from datetime import date, timedelta
+from typing import Dict, Optional
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from starlette.requests import ClientDisconnect
+
+
+class _RateLimit:
+    """
+    Server-side token bucket, answering 429 + Retry-After like Notion does.
+    """
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.tokens = rate
+        self.updated = time.monotonic()
+
+    def retry_after(self) -> Optional[float]:
+        now = time.monotonic()
+        self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return None
+        return (1 - self.tokens) / self.rate
+
+
+def _page(i: int, edited: Optional[str] = None) -> dict:
+    return {
+        "object": "page",
+        "id": f"page-{i:06d}",
+        "last_edited_time": edited or f"2026-01-{1 + i % 28:02d}T00:00:00.000Z",
+        "properties": {"title": {"id": "title", "title": [{"plain_text": f"Page {i}"}]}},
+    }
+
+
+def _agenda_page(i: int) -> dict:
+    # Eight one-hour events a day from 2026-01-01, every tenth of them all-day instead
+    day = (date(2026, 1, 1) + timedelta(days=i // 8)).isoformat()
+    when = {"start": day} if i % 10 == 9 else {
+        "start": f"{day}T{8 + i % 8:02d}:00:00.000+08:00", "end": f"{day}T{9 + i % 8:02d}:00:00.000+08:00"}
+    return {
+        "object": "page",
+        "id": f"event-{i:06d}",
+        "last_edited_time": f"2026-01-{1 + i % 28:02d}T{i % 24:02d}:00:00.000Z",
+        "properties": {
+            "Name": {"id": "title", "type": "title", "title": [{"plain_text": f"Event {i}"}]},
+            "Date": {"id": "date", "type": "date", "date": when},
+        },
+    }
+
+
+def _block(block_id: str, has_children: bool) -> dict:
+    return {
+        "object": "block",
+        "id": block_id,
+        "type": "paragraph",
+        "has_children": has_children,
+        "paragraph": {"rich_text": [{"type": "text", "plain_text": f"Block {block_id}",
+                                     "text": {"content": f"Block {block_id}"}}]},
+    }
+
+
+def _validation_error(children: list, depth: int = 0) -> Optional[str]:
+    # The limits Notion enforces on block payloads
+    if len(children) > 100:
+        return f"children should have at most 100 items, got {len(children)}"
+    for block in children:
+        value = block.get(block.get("type"), {})
+        rich_text = value.get("rich_text", [])
+        if len(rich_text) > 100:
+            return "rich_text should have at most 100 items"
+        if any(len(item["text"]["content"]) > 2000 for item in rich_text):
+            return "text.content.length should be <= 2000"
+        nested = value.get("children", [])
+        if nested and depth >= 2:
+            return "children nested too deeply"
+        error = _validation_error(nested, depth + 1)
+        if error:
+            return error
+    return None
+
+
+def _upstream(path: str) -> Optional[str]:
+    if path.startswith("/v1/audio/"):
+        return "transcription"
+    if path.startswith("/v1/chat/"):
+        return "chat"
+    if path.startswith("/notion/"):
+        return "notion"
+    return None
+
+
+def create_app(latency: float = 0.0, notion_rate: Optional[float] = None,
+               workspace_pages: int = 20, blocks_per_page: int = 10,
+               latencies: Optional[Dict[str, float]] = None, error_rates: Optional[Dict[str, float]] = None,
+               seed: Optional[int] = None, chat_slow_rate: float = 0.0, chat_slow_latency: float = 5.0,
+               chat_garbage_rate: float = 0.0, transcription_seconds_per_mb: float = 0.0,
+               agenda_events: int = 0, fail_first: Optional[Dict[str, int]] = None,
+               retry_after: Optional[float] = None, chat_slow_first: int = 0,
+               chat_garbage_first: int = 0, page_reply_delay: float = 0.0) -> FastAPI:
+    """
+    `latency` is added to every upstream response; `latencies` overrides it per upstream
+    ("transcription", "chat", "notion"). `error_rates` makes that fraction of an upstream's
+    requests fail with 503, and `fail_first` fails that many of an upstream's first requests
+    (for deterministic tests); with `retry_after` set, those injected failures are 429s with
+    that Retry-After instead; its "append" entry fails only block appends. `page_reply_delay`
+    makes POST /pages answer that much later, after the page exists (a write that commits
+    but times out on the client). For the LLM tail: `chat_slow_rate` of chat completions take an
+    extra `chat_slow_latency` seconds, and `chat_garbage_rate` of them answer with content
+    that isn't JSON; `chat_slow_first` and `chat_garbage_first` do the same to that many of
+    the first completions. `transcription_seconds_per_mb` adds time in proportion to the audio size,
+    like a slow uplink and an upstream whose work grows with the clip. Database queries return
+    `agenda_events` synthetic events, whatever the database id.
+    """
+    stub = FastAPI(title="Upstream stubs")
+    stub.state.stats = {"notion_ok": 0, "notion_429": 0, "blocks_written": 0, "errors": 0,
+                        "chat": 0, "chat_slow": 0, "chat_garbage": 0, "transcriptions": 0,
+                        "transcription_bytes": 0, "database_queries": 0, "pages_created": 0}
+    # Pages created through POST /notion/v1/pages: id -> archived
+    stub.state.pages = {}
+    # Page number -> last_edited_time, for pages touched through PATCH /notion/v1/pages/{id}
+    stub.state.edited = {}
+    # Page numbers archived through PATCH (still listed, flagged) or deleted outright (not listed)
+    stub.state.archived = set()
+    stub.state.deleted = set()
+    limit = _RateLimit(notion_rate) if notion_rate else None
+    agenda = [_agenda_page(i) for i in range(agenda_events)]
+    latencies = latencies or {}
+    error_rates = error_rates or {}
+    fail_first = dict(fail_first or {})
+    rng = random.Random(seed)
+
+    @stub.middleware("http")
+    async def upstream_behaviour(request: Request, call_next):
+        upstream = _upstream(request.url.path)
+        if upstream is None:
+            return await call_next(request)
+        await asyncio.sleep(latencies.get(upstream, latency))
+        failing = fail_first.get(upstream, 0) > 0
+        if failing:
+            fail_first[upstream] -= 1
+        if failing or rng.random() < error_rates.get(upstream, 0.0):
+            stub.state.stats["errors"] += 1
+            if retry_after is not None:
+                return JSONResponse({"object": "error", "status": 429, "code": "rate_limited"},
+                                    status_code=429, headers={"Retry-After": f"{retry_after:g}"})
+            return JSONResponse({"object": "error", "status": 503, "code": "service_unavailable"}, status_code=503)
+        return await call_next(request)
+
+    @stub.middleware("http")
+    async def notion_rate_limit(request: Request, call_next):
+        if limit is not None and request.url.path.startswith("/notion/"):
+            retry_after = limit.retry_after()
+            if retry_after is not None:
+                stub.state.stats["notion_429"] += 1
+                return JSONResponse(
+                    {"object": "error", "status": 429, "code": "rate_limited"},
+                    status_code=429,
+                    headers={"Retry-After": f"{retry_after:.2f}"},
+                )
+            stub.state.stats["notion_ok"] += 1
+        return await call_next(request)
+
+    @stub.get("/stats")
+    async def stats():
+        return stub.state.stats
+
+    @stub.post("/v1/audio/transcriptions")
+    async def transcriptions(request: Request):
+        # Drain the body without buffering it, like a real upstream would
+        received = 0
+        checksum = 0
+        async for chunk in request.stream():
+            received += len(chunk)
+            checksum = zlib.crc32(chunk, checksum)
+        stub.state.stats["transcriptions"] += 1
+        stub.state.stats["transcription_bytes"] += received
+        await asyncio.sleep(received / 1e6 * transcription_seconds_per_mb)
+        # Distinct audio gets a distinct transcript, so it doesn't hit the draft cache
+        return {"text": f"stub transcription of {received} bytes ({checksum:08x})"}
+
+    @stub.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        try:
+            body = await request.json()
+        except ClientDisconnect:
+            # A hedged request that lost the race
+            return Response(status_code=499)
+        stub.state.stats["chat"] += 1
+        number = stub.state.stats["chat"]
+        content = json.dumps({"title": "Stub", "content": "- stub", "tags": ["stub"]})
+        if number <= chat_slow_first or rng.random() < chat_slow_rate:
+            stub.state.stats["chat_slow"] += 1
+            await asyncio.sleep(chat_slow_latency)
+        if number <= chat_garbage_first or rng.random() < chat_garbage_rate:
+            stub.state.stats["chat_garbage"] += 1
+            content = 'Sure! {"title": "Stub", "content": - stub'
+        if not body.get("stream"):
+            return {"choices": [{"message": {"role": "assistant", "content": content}}]}
+
+        async def tokens():
+            for i in range(0, len(content), 4):
+                chunk = {"choices": [{"delta": {"content": content[i:i + 4]}}]}
+                yield f"data: {json.dumps(chunk)}\n\n"
+            yield "data: [DONE]\n\n"
+        return StreamingResponse(tokens(), media_type="text/event-stream")
+
+    def write_blocks(children: list):
+        error = _validation_error(children)
+        if error:
+            return JSONResponse({"object": "error", "status": 400, "code": "validation_error", "message": error},
+                                status_code=400)
+        stub.state.stats["blocks_written"] += len(children)
+        return None
+
+    @stub.post("/notion/v1/pages")
+    async def pages(request: Request):
+        body = await request.json()
+        error = write_blocks(body.get("children", []))
+        if error:
+            return error
+        stub.state.stats["pages_created"] += 1
+        page_id = f"new-{stub.state.stats['pages_created']:06d}"
+        stub.state.pages[page_id] = False
+        await asyncio.sleep(page_reply_delay)
+        return {"object": "page", "id": page_id}
+
+    @stub.patch("/notion/v1/blocks/{block_id}/children")
+    async def append_children(block_id: str, request: Request):
+        body = await request.json()
+        if fail_first.get("append", 0) > 0:
+            fail_first["append"] -= 1
+            stub.state.stats["errors"] += 1
+            return JSONResponse({"object": "error", "status": 503, "code": "service_unavailable"}, status_code=503)
+        error = write_blocks(body.get("children", []))
+        return error or {"object": "list", "results": body.get("children", []), "has_more": False}
+
+    @stub.patch("/notion/v1/pages/{page_id}")
+    async def update_page(page_id: str, request: Request):
+        body = await request.json()
+        edited = time.strftime("%Y-%m-%dT%H:%M:00.000Z", time.gmtime())
+        if page_id in stub.state.pages:
+            stub.state.pages[page_id] = bool(body.get("archived"))
+            return {"object": "page", "id": page_id, "last_edited_time": edited, "archived": stub.state.pages[page_id]}
+        number = int(page_id.split("-", 1)[1])
+        stub.state.edited[number] = edited
+        if body.get("archived"):
+            stub.state.archived.add(number)
+        return {"object": "page", "id": page_id, "last_edited_time": edited, "archived": bool(body.get("archived"))}
+
+    @stub.post("/notion/v1/search")
+    async def search(request: Request):
+        # A synthetic workspace: pages with paginated blocks, the first of which has children
+        body = await request.json()
+        start = int(body.get("start_cursor") or 0)
+        size = min(int(body.get("page_size") or 100), 100)
+        pages = [_page(i, stub.state.edited.get(i)) for i in range(workspace_pages) if i not in stub.state.deleted]
+        for page in pages:
+            page["archived"] = int(page["id"].split("-", 1)[1]) in stub.state.archived
+        if body.get("sort"):
+            reverse = body["sort"].get("direction") == "descending"
+            pages.sort(key=lambda page: page["last_edited_time"], reverse=reverse)
+        end = min(start + size, len(pages))
+        return {
+            "object": "list",
+            "results": pages[start:end],
+            "has_more": end < len(pages),
+            "next_cursor": str(end) if end < len(pages) else None,
+        }
+
+    @stub.post("/notion/v1/databases/{database_id}/query")
+    async def query_database(database_id: str, request: Request):
+        # Supports the last_edited_time on_or_after filter and sorting by last_edited_time
+        body = await request.json()
+        stub.state.stats["database_queries"] += 1
+        pages = list(agenda)
+        since = (body.get("filter") or {}).get("last_edited_time", {}).get("on_or_after")
+        if since:
+            pages = [page for page in pages if page["last_edited_time"] >= since]
+        for sort in body.get("sorts") or []:
+            pages.sort(key=lambda page: page["last_edited_time"], reverse=sort.get("direction") == "descending")
+        start = int(body.get("start_cursor") or 0)
+        end = min(start + min(int(body.get("page_size") or 100), 100), len(pages))
+        return {
+            "object": "list",
+            "results": pages[start:end],
+            "has_more": end < len(pages),
+            "next_cursor": str(end) if end < len(pages) else None,
+        }
+
+    @stub.get("/notion/v1/blocks/{block_id}/children")
+    async def block_children(block_id: str, start_cursor: Optional[str] = None, page_size: int = 100):
+        is_page = block_id.startswith("page-")
+        count = blocks_per_page if is_page else 2
+        start = int(start_cursor or 0)
+        end = min(start + page_size, count)
+        return {
+            "object": "list",
+            "results": [_block(f"block-{block_id.split('-', 1)[1]}-{i}", is_page and i == 0)
+                        for i in range(start, end)],
+            "has_more": end < count,
+            "next_cursor": str(end) if end < count else None,
+        }
+
+    return stub
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8790)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every response")
+    for upstream in ("transcription", "chat", "notion"):
+        parser.add_argument(f"--{upstream}-latency", type=float, default=None,
+                            help=f"Overrides --latency for the {upstream} stub")
+        parser.add_argument(f"--{upstream}-error-rate", type=float, default=0.0,
+                            help=f"Fraction of {upstream} requests answered with 503")
+    parser.add_argument("--chat-slow-rate", type=float, default=0.0,
+                        help="Fraction of chat completions delayed by --chat-slow-latency")
+    parser.add_argument("--chat-slow-latency", type=float, default=5.0)
+    parser.add_argument("--chat-garbage-rate", type=float, default=0.0,
+                        help="Fraction of chat completions whose content isn't JSON")
+    parser.add_argument("--transcription-seconds-per-mb", type=float, default=0.0,
+                        help="Extra transcription latency per MB of audio")
+    parser.add_argument("--seed", type=int, default=None, help="Seed for the injected errors")
+    parser.add_argument("--notion-rate", type=float, default=None,
+                        help="Enforce this many Notion requests/sec, answering 429 + Retry-After beyond it")
+    parser.add_argument("--workspace-pages", type=int, default=20, help="Pages returned by the Notion search stub")
+    parser.add_argument("--blocks-per-page", type=int, default=10)
+    parser.add_argument("--agenda-events", type=int, default=0, help="Events returned by the database query stub")
+    args = parser.parse_args()
+    upstreams = ("transcription", "chat", "notion")
+    latencies = {name: getattr(args, f"{name}_latency") for name in upstreams
+                 if getattr(args, f"{name}_latency") is not None}
+    error_rates = {name: getattr(args, f"{name}_error_rate") for name in upstreams}
+    stub = create_app(args.latency, args.notion_rate, args.workspace_pages, args.blocks_per_page,
+                      latencies, error_rates, args.seed, args.chat_slow_rate, args.chat_slow_latency,
+                      args.chat_garbage_rate, args.transcription_seconds_per_mb, args.agenda_events)
+    uvicorn.run(stub, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
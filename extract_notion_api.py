@@ -1,22 +1,57 @@
 import requests
 import json
-import time
 import os
+import time
+import asyncio
+import argparse
+
+from dotenv import load_dotenv
+
+from services.notion_client import NotionClient, NotionAPIError
+from services.export_io import ExportWriter, iter_export, recover
+from services.page_index import PageIndex, NOTION_INDEX_DB
+from services.search_index import SearchIndex, SEARCH_INDEX_DB, block_text
+from services.related_ideas import RelatedIdeas, RELATED_IDEAS_PATH
+
+load_dotenv()
 
 # ================= 配置区域 =================
-HEADERS = {
-    "Authorization": f"Bearer {NOTION_TOKEN}",
-    "Content-Type": "application/json",
-    "Notion-Version": "2022-06-28"  # 使用稳定的 API 版本
-}
+NOTION_TOKEN = os.getenv("NOTION_TOKEN") or os.getenv("NOTION_API_KEY")
+NOTION_BASE_URL = os.getenv("NOTION_BASE_URL", "https://api.notion.com/v1")
+# JSON Lines，每行一个页面；以 .gz / .zst 结尾时自动压缩
+OUTPUT_FILENAME = "notion_data.jsonl"
+# 同时抓取的页面数；实际请求速率仍由共享限速器控制
+DEFAULT_CONCURRENCY = 8
 # ===========================================
 
-def get_all_authorized_pages():
+# 所有请求都经过共享的令牌桶限速器，429 / 5xx 自动按 Retry-After 或抖动退避重试，
+# 不再需要手动 sleep
+
+class ExportStats:
+    """
+    统计导出进度，按固定间隔打印页面/秒和 Block/秒
+    """
+    def __init__(self, total_pages):
+        self.total_pages = total_pages
+        self.pages = 0
+        self.blocks = 0
+        self.skipped = 0
+        self.started = time.perf_counter()
+
+    def rates(self):
+        elapsed = max(time.perf_counter() - self.started, 1e-9)
+        return self.pages / elapsed, self.blocks / elapsed
+
+    def report(self):
+        pages_per_sec, blocks_per_sec = self.rates()
+        done = self.pages + self.skipped
+        print(f"进度 {done}/{self.total_pages} 页 | {pages_per_sec:.2f} 页/秒 | {blocks_per_sec:.1f} Block/秒")
+
+async def get_all_authorized_pages(client):
     """
     使用 Search API 获取所有授权的页面（元数据）
     """
-    url = "https://api.notion.com/v1/search"
-    payload = {"filter": {"value": "page", "property": "object"}}
+    payload = {"filter": {"value": "page", "property": "object"}, "page_size": 100}
     results = []
     has_more = True
     next_cursor = None
@@ -28,12 +63,12 @@ def get_all_authorized_pages():
         if next_cursor:
             body["start_cursor"] = next_cursor
             
-        response = requests.post(url, json=body, headers=HEADERS)
-        if response.status_code != 200:
-            print(f"搜索失败: {response.text}")
+        try:
+            data = await client.request("POST", "/search", idempotent=True, json=body)
+        except NotionAPIError as e:
+            print(f"搜索失败: {e}")
             break
             
-        data = response.json()
         results.extend(data["results"])
         has_more = data["has_more"]
         next_cursor = data["next_cursor"]
@@ -41,85 +76,301 @@ def get_all_authorized_pages():
     print(f"找到 {len(results)} 个页面。")
     return results
 
-def get_page_blocks(block_id):
+async def get_page_blocks(client, block_id, stats=None, raise_errors=False):
     """
-    获取某个页面或 Block 下的所有子 Block（即页面内容）
+    获取某个页面或 Block 下的所有子 Block（即页面内容），
+    并递归抓取带 has_children 的嵌套 Block，结果放在 block["children"] 中。
+    raise_errors=True 时出错直接抛出，而不是返回不完整的内容
     """
-    url = f"https://api.notion.com/v1/blocks/{block_id}/children"
     results = []
     has_more = True
     next_cursor = None
     
     while has_more:
-        params = {}
+        params = {"page_size": 100}
         if next_cursor:
             params["start_cursor"] = next_cursor
             
-        response = requests.get(url, headers=HEADERS, params=params)
-        
-        # 处理速率限制或错误
-        if response.status_code == 429:
-            print("触发速率限制，暂停 5 秒...")
-            time.sleep(5)
-            continue
-        elif response.status_code != 200:
-            print(f"获取内容失败 (ID: {block_id}): {response.text}")
+        # 速率限制和临时错误由客户端统一处理，这里只剩无法恢复的错误
+        try:
+            data = await client.request("GET", f"/blocks/{block_id}/children", params=params)
+        except NotionAPIError as e:
+            if raise_errors:
+                raise
+            print(f"获取内容失败 (ID: {block_id}): {e}")
             break
             
-        data = response.json()
         results.extend(data["results"])
         has_more = data["has_more"]
         next_cursor = data["next_cursor"]
+
+    if stats is not None:
+        stats.blocks += len(results)
+
+    # 子页面和子数据库会作为独立页面被搜索到，不在这里展开
+    nested = [
+        block for block in results
+        if block.get("has_children") and block.get("type") not in ("child_page", "child_database")
+    ]
+    children = await asyncio.gather(*[get_page_blocks(client, block["id"], stats, raise_errors) for block in nested])
+    for block, block_children in zip(nested, children):
+        block["children"] = block_children
     
     return results
 
-def main():
-    # 1. 获取所有页面
-    pages = get_all_authorized_pages()
-    
-    full_data = []
+def get_page_title(page):
+    # 尝试获取标题（Notion 的标题存储结构比较深）
+    title = "Untitled"
+    try:
+        props = page.get("properties", {})
+        # 这里的 title 键名取决于你的数据库结构，普通页面通常叫 "title"
+        for prop_name, prop_val in props.items():
+            if prop_val["id"] == "title":
+                title_obj = prop_val.get("title", [])
+                if title_obj:
+                    title = title_obj[0].get("plain_text", "Untitled")
+    except Exception:
+        pass
+    return title
 
-    # 2. 遍历每个页面，获取详细内容
-    print("开始下载页面内容（这可能需要一些时间）...")
-    
-    for i, page in enumerate(pages):
-        page_id = page["id"]
-        
-        # 尝试获取标题（Notion 的标题存储结构比较深）
-        title = "Untitled"
-        try:
-            props = page.get("properties", {})
-            # 这里的 title 键名取决于你的数据库结构，普通页面通常叫 "title"
-            for prop_name, prop_val in props.items():
-                if prop_val["id"] == "title":
-                    title_obj = prop_val.get("title", [])
-                    if title_obj:
-                        title = title_obj[0].get("plain_text", "Untitled")
-        except Exception:
-            pass
-
-        print(f"[{i+1}/{len(pages)}] 正在抓取: {title}")
-        
-        # 获取该页面下的所有 Blocks
-        blocks = get_page_blocks(page_id)
-        
-        # 组装数据结构
-        page_data = {
-            "meta": page,       # 页面的元数据（创建时间、URL、属性等）
-            "content": blocks   # 页面的实际内容块
-        }
-        full_data.append(page_data)
-        
-        # 稍微暂停一下，避免触发 API 速率限制
-        time.sleep(0.3)
+def load_checkpoint(output_filename):
+    """
+    输出文件本身就是断点：每行是一个已完成页面的 {"meta", "content"}，返回已完成的页面 ID 集合
+    """
+    if not os.path.exists(output_filename):
+        return set()
+    # 中断时可能留下半行，先去掉，避免后续追加的内容接在半行后面
+    recover(output_filename)
+    return {record["meta"]["id"] for record in iter_export(output_filename)}
 
-    # 3. 保存为 JSON 文件
-    output_filename = "notion_data.json"
-    with open(output_filename, "w", encoding="utf-8") as f:
-        json.dump(full_data, f, ensure_ascii=False, indent=2)
-        
+async def export_pages(concurrency=DEFAULT_CONCURRENCY, output_filename=OUTPUT_FILENAME, resume=True):
+    if not NOTION_TOKEN:
+        raise ValueError("NOTION_API_KEY is not set")
+
+    client = NotionClient(NOTION_TOKEN, NOTION_BASE_URL)
+
+    try:
+        # 1. 获取所有页面
+        pages = await get_all_authorized_pages(client)
+
+        done = load_checkpoint(output_filename) if resume else set()
+        stats = ExportStats(len(pages))
+        stats.skipped = sum(1 for page in pages if page["id"] in done)
+        if stats.skipped:
+            print(f"从断点继续：跳过 {stats.skipped} 个已完成的页面")
+
+        # 2. 并发抓取每个页面的内容，每完成一页就写一行，内存占用与工作区大小无关
+        print("开始下载页面内容（这可能需要一些时间）...")
+        semaphore = asyncio.Semaphore(concurrency)
+
+        with ExportWriter(output_filename, append=resume) as writer:
+            async def export_page(page):
+                async with semaphore:
+                    blocks = await get_page_blocks(client, page["id"], stats)
+                # 组装数据结构
+                page_data = {
+                    "meta": page,       # 页面的元数据（创建时间、URL、属性等）
+                    "content": blocks   # 页面的实际内容块（含嵌套子 Block）
+                }
+                writer.write(page_data)
+                stats.pages += 1
+                print(f"[{stats.pages + stats.skipped}/{stats.total_pages}] 已抓取: {get_page_title(page)}")
+
+            async def report_progress():
+                while True:
+                    await asyncio.sleep(5)
+                    stats.report()
+
+            reporter = asyncio.create_task(report_progress())
+            try:
+                await asyncio.gather(*[export_page(page) for page in pages if page["id"] not in done])
+            finally:
+                reporter.cancel()
+    finally:
+        await client.aclose()
+
+    stats.report()
     print(f"\n成功！所有数据已保存到 {output_filename}")
 
+async def get_changed_pages(client, index, full=False):
+    """
+    按 last_edited_time 从新到旧搜索，遇到早于上次同步水位线的页面就停止翻页，
+    只返回新增或修改过的页面。
+    full=True 时列出全部页面，额外返回搜索结果里看到的所有页面 id（用来找出已删除的页面）；
+    已归档或在回收站里的页面放进 removed，不再抓取
+    """
+    watermark = None if full else index.get_watermark()
+    payload = {
+        "filter": {"value": "page", "property": "object"},
+        "sort": {"direction": "descending", "timestamp": "last_edited_time"},
+        "page_size": 100,
+    }
+    changed = []
+    seen = set()
+    removed = []
+    has_more = True
+    next_cursor = None
+
+    while has_more:
+        body = payload.copy()
+        if next_cursor:
+            body["start_cursor"] = next_cursor
+        data = await client.request("POST", "/search", idempotent=True, json=body)
+
+        for page in data["results"]:
+            if page.get("archived") or page.get("in_trash"):
+                removed.append(page["id"])
+                continue
+            seen.add(page["id"])
+            edited = page["last_edited_time"]
+            if watermark and edited < watermark:
+                # 后面的页面都更旧，上次同步时已经是最新的
+                has_more = False
+                break
+            # last_edited_time 只精确到分钟，和水位线同一分钟的页面要重新抓取再比较哈希
+            if index.last_edited_time(page["id"]) != edited or edited == watermark:
+                changed.append(page)
+        else:
+            has_more = data["has_more"]
+            next_cursor = data["next_cursor"]
+
+    return changed, seen, removed
+
+async def sync_pages(concurrency=DEFAULT_CONCURRENCY, index_path=NOTION_INDEX_DB, output_filename=None,
+                     full=False):
+    """
+    增量同步：只重新抓取修改过的页面，结果保存在本地 SQLite 索引中，
+    可选地把整个索引导出为 JSON Lines。
+    每隔 NOTION_FULL_SYNC_INTERVAL（或 full=True）做一次全量检查，删除 Notion 里已不存在的页面
+    """
+    if not NOTION_TOKEN:
+        raise ValueError("NOTION_API_KEY is not set")
+
+    client = NotionClient(NOTION_TOKEN, NOTION_BASE_URL)
+    index = PageIndex(index_path)
+    try:
+        full = full or index.full_sync_due()
+        pages, seen, archived = await get_changed_pages(client, index, full)
+        print(f"索引中有 {len(index)} 个页面，需要检查 {len(pages)} 个页面" + ("（全量检查）" if full else ""))
+
+        stats = ExportStats(len(pages))
+        semaphore = asyncio.Semaphore(concurrency)
+        updated = 0
+        failed = []
+
+        async def sync_page(page):
+            nonlocal updated
+            try:
+                async with semaphore:
+                    blocks = await get_page_blocks(client, page["id"], stats, raise_errors=True)
+            except NotionAPIError as e:
+                print(f"同步失败: {get_page_title(page)} ({e})")
+                failed.append(page)
+                return
+            if index.upsert(page, blocks):
+                updated += 1
+                print(f"已更新: {get_page_title(page)}")
+            stats.pages += 1
+
+        await asyncio.gather(*[sync_page(page) for page in pages])
+    finally:
+        await client.aclose()
+
+    try:
+        # 增量同步只能看到归档的页面；全量检查时搜索结果里没有的页面也已被删除
+        removed = index.remove(archived)
+        if full:
+            removed += index.retain(seen)
+            index.set_state("full_sync_at", str(time.time()))
+        if removed:
+            search_index = SearchIndex(SEARCH_INDEX_DB)
+            try:
+                search_index.remove(removed)
+            finally:
+                search_index.close()
+            print(f"已删除 {len(removed)} 个在 Notion 中归档或删除的页面")
+
+        # 失败的页面下次还要重新检查，水位线不能越过它们
+        if failed:
+            index.set_watermark(min(page["last_edited_time"] for page in failed))
+        elif pages:
+            index.set_watermark(max(page["last_edited_time"] for page in pages))
+        stats.report()
+        print(f"同步完成：更新 {updated} 个页面，{len(pages) - updated - len(failed)} 个内容未变，失败 {len(failed)} 个")
+
+        if output_filename:
+            with ExportWriter(output_filename) as writer:
+                for record in index.iter_records():
+                    writer.write(record)
+            print(f"已导出 {writer.count} 个页面到 {output_filename}")
+    finally:
+        index.close()
+
+def _page_kind(page):
+    # Agenda / Journal 数据库里的页面分别对应 event / idea，其余都是普通页面
+    parent = page.get("parent", {}).get("database_id", "").replace("-", "")
+    for kind, env in (("event", "AGENDA_DATABASE_ID"), ("idea", "JOURNAL_DATABASE_ID")):
+        if parent and parent == os.getenv(env, "").replace("-", ""):
+            return kind
+    return "page"
+
+def build_search_index(input_filename, index_path=SEARCH_INDEX_DB, related_path=RELATED_IDEAS_PATH):
+    """
+    把导出文件（JSON Lines）逐行写入本地全文索引，供 /api/search 使用；
+    Journal 里的想法同时加入相似想法索引，供审阅弹窗显示
+    """
+    index = SearchIndex(index_path)
+    related = RelatedIdeas(related_path)
+
+    def docs():
+        for record in iter_export(input_filename):
+            doc = {
+                "id": record["meta"]["id"],
+                "kind": _page_kind(record["meta"]),
+                "title": get_page_title(record["meta"]),
+                "content": block_text(record["content"]),
+                "url": record["meta"].get("url"),
+            }
+            if doc["kind"] == "idea":
+                related.add(doc["id"], doc["title"], doc["content"], doc["url"])
+            yield doc
+
+    count = index.add_many(docs())
+    print(f"已索引 {count} 个页面，索引共 {len(index)} 条，保存在 {index_path}；其中想法 {len(related)} 条")
+    index.close()
+    related.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="导出 Notion 工作区")
+    subcommands = parser.add_subparsers(dest="command")
+
+    export = subcommands.add_parser("export", help="导出所有授权页面及其内容")
+    export.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="同时抓取的页面数")
+    export.add_argument("--output", default=OUTPUT_FILENAME, help="输出文件（.jsonl，可加 .gz / .zst 压缩）")
+    export.add_argument("--no-resume", action="store_true", help="忽略断点，从头开始")
+
+    sync = subcommands.add_parser("sync", help="增量同步到本地索引，只抓取修改过的页面")
+    sync.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="同时抓取的页面数")
+    sync.add_argument("--index", default=NOTION_INDEX_DB, help="本地 SQLite 索引文件")
+    sync.add_argument("--output", help="同步后把索引导出为 JSON Lines（可加 .gz / .zst 压缩）")
+    sync.add_argument("--full", action="store_true", help="列出全部页面，删除 Notion 里已删除的页面")
+
+    search = subcommands.add_parser("search-index", help="由导出文件建立本地全文索引")
+    search.add_argument("--input", default=OUTPUT_FILENAME, help="导出文件（JSON Lines）")
+    search.add_argument("--index", default=SEARCH_INDEX_DB, help="全文索引文件")
+
+    subcommands.add_parser("openapi-spec", help="下载 Notion OpenAPI 规范")
+
+    args = parser.parse_args()
+    if args.command == "export":
+        asyncio.run(export_pages(args.concurrency, args.output, resume=not args.no_resume))
+    elif args.command == "sync":
+        asyncio.run(sync_pages(args.concurrency, args.index, args.output, args.full))
+    elif args.command == "search-index":
+        build_search_index(args.input, args.index)
+    else:
+        fetch_notion_openapi_spec()
+
 def fetch_notion_openapi_spec():
     url = "https://api.apis.guru/v2/specs/notion.com/1.0.0/openapi.json"
     
@@ -152,4 +403,4 @@ def fetch_notion_openapi_spec():
         print(f"❌ 发生未知错误: {e}")
 
 if __name__ == "__main__":
-    fetch_notion_openapi_spec()
\ No newline at end of file
+    main()
\ No newline at end of file
@@ -0,0 +1,234 @@
+import os
+import time
+import asyncio
+import argparse
+import mimetypes
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from services import ai_service, notion_service, search_index, related_ideas
+from services.export_io import ExportWriter, iter_export, recover
+
+# ================= 配置区域 =================
+# 断点清单：JSON Lines，每个文件每完成一个阶段追加一行
+MANIFEST_FILENAME = "voice_memo_import.jsonl"
+AUDIO_EXTENSIONS = {".m4a", ".mp3", ".wav", ".webm", ".ogg", ".oga", ".opus", ".mp4", ".aac", ".flac", ".amr"}
+# 每个阶段各自的并发上限；Notion 还受共享限速器约束
+DEFAULT_TRANSCRIBE_CONCURRENCY = 4
+DEFAULT_DRAFT_CONCURRENCY = 4
+DEFAULT_SAVE_CONCURRENCY = 2
+# ===========================================
+
+# 三个阶段（转写 → 起草 → 保存到 Notion）同时运行，之间用有界队列连接：
+# 下游处理不过来时上游的 put 会阻塞（背压），内存里积压的文件数有上限。
+# 流水线跑满后，总耗时取决于最慢的阶段，而不是三个阶段之和。
+STAGES = ("transcribe", "draft", "save")
+
+
+class ImportStats:
+    """
+    统计各阶段完成数和累计耗时，按固定间隔打印进度和吞吐量
+    """
+    def __init__(self, total, concurrency):
+        self.total = total
+        self.concurrency = concurrency
+        self.done = {stage: 0 for stage in STAGES}
+        self.busy = {stage: 0.0 for stage in STAGES}
+        self.failed = 0
+        self.empty = 0
+        self.skipped = 0
+        self.started = time.perf_counter()
+
+    def report(self):
+        elapsed = max(time.perf_counter() - self.started, 1e-9)
+        finished = self.done["save"] + self.failed + self.empty
+        print(f"进度 {finished + self.skipped}/{self.total} | 转写 {self.done['transcribe']} | "
+              f"起草 {self.done['draft']} | 保存 {self.done['save']} | 失败 {self.failed} | "
+              f"{self.done['save'] / elapsed * 60:.1f} 个/分钟")
+
+    def summary(self):
+        elapsed = time.perf_counter() - self.started
+        print(f"\n用时 {elapsed:.1f} 秒，导入 {self.done['save']} 个，空录音 {self.empty} 个，"
+              f"失败 {self.failed} 个，跳过 {self.skipped} 个已完成的文件")
+        # 每个阶段的累计耗时除以并发数，约等于这个阶段单独跑完需要的时间
+        for stage in STAGES:
+            print(f"  {stage:<10} 累计 {self.busy[stage]:.1f} 秒 / 并发 {self.concurrency[stage]} "
+                  f"≈ {self.busy[stage] / self.concurrency[stage]:.1f} 秒")
+
+
+def find_audio_files(directory):
+    """
+    递归列出目录下的音频文件（相对路径，按路径排序）
+    """
+    found = []
+    for root, _, files in os.walk(directory):
+        for name in files:
+            if os.path.splitext(name)[1].lower() in AUDIO_EXTENSIONS:
+                found.append(os.path.relpath(os.path.join(root, name), directory))
+    return sorted(found)
+
+
+def load_manifest(manifest):
+    """
+    合并清单里每个文件的各行记录，返回 {相对路径: 最新状态}。
+    状态里带着已完成阶段的结果（transcription / draft），断点续传时从下一个阶段开始
+    """
+    if not os.path.exists(manifest):
+        return {}
+    # 中断时可能留下半行，先去掉，避免后续追加的内容接在半行后面
+    recover(manifest)
+    state = {}
+    for record in iter_export(manifest):
+        entry = state.get(record["file"])
+        if entry is None or entry.get("size") != record.get("size"):
+            # 文件变了（大小不同）就从头开始
+            entry = state[record["file"]] = {}
+        entry.update(record)
+    return state
+
+
+async def import_memos(directory, mode="idea", manifest=MANIFEST_FILENAME,
+                       transcribe_concurrency=DEFAULT_TRANSCRIBE_CONCURRENCY,
+                       draft_concurrency=DEFAULT_DRAFT_CONCURRENCY,
+                       save_concurrency=DEFAULT_SAVE_CONCURRENCY, resume=True):
+    if mode not in ("event", "idea"):
+        raise ValueError("Invalid mode. Must be 'event' or 'idea'.")
+
+    files = find_audio_files(directory)
+    state = load_manifest(manifest) if resume else {}
+    concurrency = {"transcribe": transcribe_concurrency, "draft": draft_concurrency, "save": save_concurrency}
+    stats = ImportStats(len(files), concurrency)
+    # 队列长度等于下游并发数：每个阶段最多有一批在处理、一批在排队
+    queues = {stage: asyncio.Queue(maxsize=concurrency[stage]) for stage in STAGES}
+
+    with ExportWriter(manifest, append=resume) as writer:
+        def record(item, stage, **fields):
+            item.update(fields, stage=stage)
+            writer.write({"file": item["file"], "size": item["size"], "stage": stage, **fields})
+
+        async def transcribe(item):
+            path = os.path.join(directory, item["file"])
+            content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+            with open(path, "rb") as f:
+                transcription = await ai_service.transcribe_audio_cached(f, os.path.basename(path), content_type)
+            if not transcription.strip():
+                record(item, "empty")
+                stats.empty += 1
+                print(f"[空录音] {item['file']}")
+                return None
+            record(item, "transcribed", transcription=transcription)
+            return item
+
+        async def draft(item):
+            record(item, "drafted", draft=await ai_service.process_text(mode, item["transcription"]))
+            return item
+
+        async def save(item):
+            page = await notion_service.save_entry(mode, item["draft"])
+            record(item, "saved", page_id=page.get("id"), url=page.get("url"))
+            print(f"[{stats.done['save'] + 1}] 已导入: {item['file']} → {item['draft'].get('title', '')}")
+            return item
+
+        handlers = {"transcribe": transcribe, "draft": draft, "save": save}
+
+        async def run_stage(stage, next_stage):
+            async def worker():
+                while True:
+                    item = await queues[stage].get()
+                    if item is None:
+                        return
+                    started = time.perf_counter()
+                    try:
+                        result = await handlers[stage](item)
+                    except Exception as e:
+                        # 失败的文件记入清单，下次运行时从这个阶段重试
+                        record(item, "failed", error=f"{stage}: {e}")
+                        stats.failed += 1
+                        print(f"[失败] {item['file']} ({stage}): {e}")
+                        result = None
+                    else:
+                        stats.done[stage] += 1
+                    finally:
+                        stats.busy[stage] += time.perf_counter() - started
+                    if result is not None and next_stage:
+                        # 下游的队列满了就在这里等待
+                        await queues[next_stage].put(result)
+
+            await asyncio.gather(*[worker() for _ in range(concurrency[stage])])
+            if next_stage:
+                for _ in range(concurrency[next_stage]):
+                    await queues[next_stage].put(None)
+
+        async def feed():
+            pending = []
+            for name in files:
+                size = os.path.getsize(os.path.join(directory, name))
+                entry = state.get(name, {})
+                if entry.get("size") != size:
+                    entry = {}
+                if entry.get("stage") in ("saved", "empty"):
+                    stats.skipped += 1
+                    continue
+                item = {"file": name, "size": size,
+                        "transcription": entry.get("transcription"), "draft": entry.get("draft")}
+                # 已完成的阶段不再重复
+                start = "save" if item["draft"] else "draft" if item["transcription"] else "transcribe"
+                pending.append((start, item))
+            if stats.skipped:
+                print(f"从断点继续：跳过 {stats.skipped} 个已完成的文件")
+            # 后面阶段的文件先放进去；它们必须在上游阶段结束（发出结束标记）之前入队
+            for stage in reversed(STAGES):
+                for start, item in pending:
+                    if start == stage:
+                        await queues[stage].put(item)
+            for _ in range(concurrency["transcribe"]):
+                await queues["transcribe"].put(None)
+
+        async def report_progress():
+            while True:
+                await asyncio.sleep(5)
+                stats.report()
+
+        print(f"找到 {len(files)} 个音频文件，开始导入（模式: {mode}）...")
+        reporter = asyncio.create_task(report_progress())
+        try:
+            await asyncio.gather(
+                feed(),
+                run_stage("transcribe", "draft"),
+                run_stage("draft", "save"),
+                run_stage("save", None),
+            )
+        finally:
+            reporter.cancel()
+            await ai_service.close_client()
+            await notion_service.close_client()
+            search_index.close_index()
+            related_ideas.close_index()
+
+    stats.report()
+    stats.summary()
+    print(f"清单已保存到 {manifest}")
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="批量导入语音备忘录：转写 → 起草 → 保存到 Notion")
+    parser.add_argument("directory", help="音频文件所在目录（递归查找）")
+    parser.add_argument("--mode", choices=("idea", "event"), default="idea", help="保存为想法还是日程")
+    parser.add_argument("--manifest", default=MANIFEST_FILENAME, help="断点清单文件（JSON Lines）")
+    parser.add_argument("--transcribe-concurrency", type=int, default=DEFAULT_TRANSCRIBE_CONCURRENCY,
+                        help="同时转写的文件数")
+    parser.add_argument("--draft-concurrency", type=int, default=DEFAULT_DRAFT_CONCURRENCY, help="同时起草的文件数")
+    parser.add_argument("--save-concurrency", type=int, default=DEFAULT_SAVE_CONCURRENCY,
+                        help="同时保存到 Notion 的文件数")
+    parser.add_argument("--no-resume", action="store_true", help="忽略断点，从头开始")
+    args = parser.parse_args()
+
+    asyncio.run(import_memos(args.directory, args.mode, args.manifest, args.transcribe_concurrency,
+                             args.draft_concurrency, args.save_concurrency, resume=not args.no_resume))
+
+
+if __name__ == "__main__":
+    main()
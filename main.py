@@ -1,66 +1,159 @@
 import os
-import shutil
-import tempfile
-import secrets
-import base64
-import binascii
-from typing import Optional, Dict, Any
+import re
+import time
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import Optional, Dict, Any, List
 from dotenv import load_dotenv
 from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.requests import Request
-from starlette.responses import Response
+from starlette.responses import Response, PlainTextResponse
+from starlette.formparsers import MultiPartParser
 
 load_dotenv()
 
-from fastapi import FastAPI, UploadFile, File, Form, HTTPException
+# LOG_LEVEL=DEBUG adds per-request details (transcripts, model output) to the logs
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+logging.basicConfig(level=LOG_LEVEL, format="%(asctime)s %(levelname)s %(name)s %(message)s")
+logger = logging.getLogger(__name__)
+
+from fastapi import FastAPI, UploadFile, File, Form, Header, HTTPException
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 
-from services import ai_service, notion_service
+from services import agenda_mirror, ai_service, idempotency, metrics, notion_service, related_ideas, save_queue, search_index
+from app.auth import is_authorized
+from app.routers import agenda, jobs, record_ws, search, stream
+
+# Uploads stay in memory up to this size and spill to a temp file beyond it
+UPLOAD_SPOOL_MAX_BYTES = int(os.getenv("UPLOAD_SPOOL_MAX_BYTES", str(1024 * 1024)))
+# Hard cap on the request body for audio uploads
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(100 * 1024 * 1024)))
 
-app = FastAPI(title="AI Logger")
+MultiPartParser.spool_max_size = UPLOAD_SPOOL_MAX_BYTES
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One long-lived, pooled HTTP client per upstream for the whole process
+    await ai_service.open_client()
+    await notion_service.open_client()
+    await save_queue.start_worker()
+    # Keeps the local Agenda mirror behind /api/agenda up to date
+    await agenda_mirror.start_refresher(notion_service.sync_agenda)
+    try:
+        yield
+    finally:
+        await agenda_mirror.stop_refresher()
+        await save_queue.stop_worker()
+        await ai_service.close_client()
+        await notion_service.close_client()
+        search_index.close_index()
+        related_ideas.close_index()
+        agenda_mirror.close_mirror()
+
+app = FastAPI(title="AI Logger", lifespan=lifespan)
 
 class BasicAuthMiddleware(BaseHTTPMiddleware):
     async def dispatch(self, request: Request, call_next):
-        # Skip auth if env vars are not set
-        username = os.getenv("AUTH_USERNAME")
-        password = os.getenv("AUTH_PASSWORD")
-        
-        if not username or not password:
-            return await call_next(request)
-
-        # Helper to send 401
-        def unauthorized():
+        if not is_authorized(request.headers.get("Authorization")):
             return Response(
                 headers={"WWW-Authenticate": "Basic"},
                 status_code=401,
                 content="Unauthorized"
             )
 
-        auth_header = request.headers.get("Authorization")
-        if not auth_header:
-             return unauthorized()
+        return await call_next(request)
+
+class UploadTooLarge(Exception):
+    pass
+
+class UploadLimitMiddleware:
+    """
+    Rejects request bodies larger than MAX_UPLOAD_BYTES with 413.
+    Checks Content-Length up front and also counts the bytes actually received,
+    so chunked uploads without a Content-Length are capped as well.
+    """
+    def __init__(self, app, max_bytes: int):
+        self.app = app
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST":
+            return await self.app(scope, receive, send)
+
+        too_large = PlainTextResponse("Upload too large", status_code=413)
+        for name, value in scope["headers"]:
+            if name == b"content-length" and value.isdigit() and int(value) > self.max_bytes:
+                return await too_large(scope, receive, send)
+
+        received = 0
+        exceeded = False
+        response_started = False
+
+        async def limited_receive():
+            nonlocal received, exceeded
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    exceeded = True
+                    raise UploadTooLarge()
+            return message
+
+        async def guarded_send(message):
+            # Once the limit is hit, whatever error response the app produces
+            # (e.g. FastAPI's generic 400 for a failed form parse) is replaced by a 413.
+            nonlocal response_started
+            if exceeded and not response_started:
+                return
+            response_started = response_started or message["type"] == "http.response.start"
+            await send(message)
 
         try:
-            scheme, credentials = auth_header.split()
-            if scheme.lower() != 'basic':
-                return unauthorized()
-                
-            decoded = base64.b64decode(credentials).decode("ascii")
-            u, p = decoded.split(":", 1)
-            
-            # Use secrets.compare_digest to prevent timing attacks
-            is_correct_username = secrets.compare_digest(u, username)
-            is_correct_password = secrets.compare_digest(p, password)
-            
-            if not (is_correct_username and is_correct_password):
-                 return unauthorized()
-                 
-        except (ValueError, binascii.Error):
-            return unauthorized()
+            await self.app(scope, limited_receive, guarded_send)
+        except UploadTooLarge:
+            if response_started:
+                raise
+        if exceeded and not response_started:
+            await too_large(scope, receive, send)
 
-        return await call_next(request)
+class ServerTimingMiddleware:
+    """
+    Collects the pipeline stages timed while serving a request (see services/metrics.py)
+    into a Server-Timing header, and records the request duration. Streamed responses
+    only carry the stages finished before the headers were sent.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        token = metrics.start_request()
+        start = time.perf_counter()
+        status = 500
+
+        async def timed_send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", metrics.server_timing().encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, timed_send)
+        finally:
+            # The matched route template keeps the label set small (no job ids etc.)
+            route = getattr(scope.get("route"), "path", None) or "other"
+            metrics.request_duration.observe(time.perf_counter() - start, scope["method"], route, str(status))
+            metrics.end_request(token)
+
+app.add_middleware(UploadLimitMiddleware, max_bytes=MAX_UPLOAD_BYTES)
 
 app.add_middleware(BasicAuthMiddleware)
 
@@ -72,86 +165,201 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+app.add_middleware(ServerTimingMiddleware)
+
+_CLIENT_ID = re.compile(r"^[A-Za-z0-9_-]{8,64}$")
+
+def _check_client_id(value: Optional[str], name: str) -> None:
+    if value is not None and not _CLIENT_ID.match(value):
+        raise HTTPException(status_code=400, detail=f"Invalid {name}")
+
+def _check_idempotency_key(key: Optional[str]) -> None:
+    if not idempotency.valid_key(key):
+        raise HTTPException(status_code=400, detail="Invalid Idempotency-Key")
+
 # API Routes
 @app.post("/api/process-audio")
 async def process_audio(
-    audio: UploadFile = File(...),
-    mode: str = Form(...)
+    audio: List[UploadFile] = File(...),
+    mode: str = Form(...),
+    overlaps: Optional[str] = Form(None),
+    cache_control: Optional[str] = Header(None),
+    idempotency_key: Optional[str] = Header(None),
 ):
+    """
+    Transcribes the recording and drafts an entry from it. Several `audio` parts are
+    treated as consecutive segments of one recording (as sent over /ws/record); `overlaps`
+    is a comma-separated 0/1 flag per part, 1 where the part's audio overlaps the previous one.
+    With an Idempotency-Key, repeating the request returns the first response (waiting
+    for it if the first request is still running).
+    """
+    if mode not in ("event", "idea"):
+        raise HTTPException(status_code=400, detail="Invalid mode. Must be 'event' or 'idea'.")
+    _check_idempotency_key(idempotency_key)
+    flags = (overlaps or "").split(",") if overlaps else []
+    if flags and (len(flags) != len(audio) or any(flag not in ("0", "1") for flag in flags)):
+        raise HTTPException(status_code=400, detail="overlaps needs a 0/1 flag per audio part")
+    overlapping = [flag == "1" for flag in flags] or [False] * len(audio)
+
+    # "Cache-Control: no-cache" forces a fresh draft instead of a memoized one
+    use_cache = "no-cache" not in (cache_control or "").lower()
+    # By now the body has been received and spooled
+    metrics.observe("upload", metrics.request_elapsed())
+    # Hashing the audio here would cost as much as the transcription cache already does,
+    # so a repeat is recognised by its mode and part names/sizes
+    fingerprint = idempotency.fingerprint(mode, [(part.filename, part.size) for part in audio], overlapping)
+
     try:
-        # Determine suffix from original filename or default to .webm
-        suffix = os.path.splitext(audio.filename)[1] if audio.filename else ".webm"
-        if not suffix:
-            suffix = ".webm"
-
-        # Save temp file
-        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as temp_audio:
-            shutil.copyfileobj(audio.file, temp_audio)
-            temp_path = temp_audio.name
-            
-        # DEBUG: Save a copy to debug_uploads to verify audio content
-        # debug_dir = "debug_uploads"
-        # os.makedirs(debug_dir, exist_ok=True)
-        # import time
-        # timestamp = int(time.time())
-        # debug_path = os.path.join(debug_dir, f"upload_{timestamp}{suffix}")
-        # shutil.copy(temp_path, debug_path)
-        # print(f"DEBUG: Saved audio to {debug_path}")
-
-        try:  
-            # Transcribe
-            transcription = ai_service.transcribe_audio(temp_path)
-            
-            if not transcription or not transcription.strip():
-                 return {
-                    "transcription": "",
-                    "draft": {}
-                }
-
-            print(f"DEBUG: Transcription: {transcription[:200]}... (Total length: {len(transcription)})")
-            
-            # Process based on mode
-            if mode == "event":
-                draft = ai_service.process_event_text(transcription)
-            elif mode == "idea":
-                draft = ai_service.process_idea_text(transcription)
-            else:
-                raise HTTPException(status_code=400, detail="Invalid mode. Must be 'event' or 'idea'.")
-                
-            return {
-                "transcription": transcription,
-                "draft": draft
-            }
-            
-        finally:
-            # Cleanup temp file
-            if os.path.exists(temp_path):
-                os.remove(temp_path)
-                
+        return await idempotency.run(
+            "process-audio", idempotency_key, fingerprint, lambda: _process_audio(audio, mode, use_cache, overlapping)
+        )
+
+    except idempotency.KeyReused as e:
+        raise HTTPException(status_code=422, detail=str(e))
     except Exception as e:
-        import traceback
-        traceback.print_exc()
+        logger.exception("process-audio failed")
         raise HTTPException(status_code=500, detail=str(e))
 
+async def _transcribe_upload(audio: UploadFile) -> str:
+    filename = audio.filename or "recording.webm"
+    if not os.path.splitext(filename)[1]:
+        filename += ".webm"
+
+    # The upload is already held in a SpooledTemporaryFile (in memory up to
+    # UPLOAD_SPOOL_MAX_BYTES, on disk beyond that); stream it to the API from there.
+    audio.file.seek(0)
+    return await ai_service.transcribe_audio_cached(
+        audio.file, filename, audio.content_type or "application/octet-stream"
+    )
+
+async def _process_audio(audio: List[UploadFile], mode: str, use_cache: bool,
+                         overlaps: List[bool]) -> Dict[str, Any]:
+    parts = await asyncio.gather(*[_transcribe_upload(segment) for segment in audio])
+    transcription = ai_service.stitch_transcripts(parts, overlaps)
+
+    if not transcription:
+        return {
+            "transcription": "",
+            "draft": {},
+            "related": []
+        }
+
+    logger.debug("transcription chars=%d segments=%d text=%.200r", len(transcription), len(audio), transcription)
+
+    # Process based on mode
+    if mode == "event":
+        draft = await ai_service.process_event_text(transcription, use_cache)
+    else:
+        draft = await ai_service.process_idea_text(transcription, use_cache)
+
+    return {
+        "transcription": transcription,
+        "draft": draft,
+        # Similar saved ideas, so duplicates are visible before saving
+        "related": await related_ideas.find_related(mode, draft)
+    }
+
 class SaveRequest(BaseModel):
     mode: str
     data: Dict[str, Any]
+    # Client-generated, so replaying the same save returns the existing job
+    job_id: Optional[str] = None
+
+@app.post("/api/save-entry", status_code=202)
+async def save_entry(request: SaveRequest, idempotency_key: Optional[str] = Header(None)):
+    """
+    Queues the entry for the background Notion writer and returns right away.
+    Poll /api/jobs/{job_id} for the outcome. A repeated Idempotency-Key gets the
+    first response back instead of queueing a second save.
+    """
+    if request.mode not in ("event", "idea"):
+        raise HTTPException(status_code=400, detail="Invalid mode")
+    _check_client_id(request.job_id, "job_id")
+    _check_idempotency_key(idempotency_key)
+
+    async def enqueue() -> Dict[str, Any]:
+        job = await save_queue.get_queue().enqueue(request.mode, request.data, request.job_id)
+        return {"status": "queued", "job_id": job["id"], "job": job}
 
-@app.post("/api/save-entry")
-async def save_entry(request: SaveRequest):
     try:
-        if request.mode == "event":
-            result = notion_service.create_event(request.data)
-        elif request.mode == "idea":
-            result = notion_service.create_journal(request.data)
+        fingerprint = idempotency.fingerprint(request.mode, request.data, request.job_id)
+        return await idempotency.run("save-entry", idempotency_key, fingerprint, enqueue)
+
+    except idempotency.KeyReused as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+# Items accepted per /api/save-entries call, and how long it waits for them to be written
+MAX_BULK_SAVE_ITEMS = int(os.getenv("MAX_BULK_SAVE_ITEMS", "200"))
+BULK_SAVE_WAIT = float(os.getenv("BULK_SAVE_WAIT", "60"))
+
+class BulkSaveRequest(BaseModel):
+    items: List[SaveRequest]
+    wait: Optional[float] = None
+
+@app.post("/api/save-entries")
+async def save_entries(request: BulkSaveRequest):
+    """
+    Saves a batch of reviewed drafts in one round trip. Items go through the save queue
+    (written concurrently under the Notion rate limit), and the response waits up to
+    `wait` seconds (default BULK_SAVE_WAIT) for them, reporting each item's outcome in order.
+    Items still queued or running when the wait ends keep going; poll /api/jobs/{job_id}.
+    """
+    if len(request.items) > MAX_BULK_SAVE_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BULK_SAVE_ITEMS} items per request")
+
+    # Invalid items are reported without holding up the rest
+    results: List[Dict[str, Any]] = []
+    valid = []
+    for i, item in enumerate(request.items):
+        if item.mode not in ("event", "idea"):
+            results.append({"index": i, "status": "rejected", "error": "Invalid mode"})
+        elif item.job_id is not None and not _CLIENT_ID.match(item.job_id):
+            results.append({"index": i, "status": "rejected", "error": "Invalid job_id"})
         else:
-            raise HTTPException(status_code=400, detail="Invalid mode")
-            
-        return {"status": "success", "result": result}
-        
+            results.append({})
+            valid.append(i)
+    try:
+        queue = save_queue.get_queue()
+        jobs = await queue.enqueue_many([
+            {"mode": request.items[i].mode, "data": request.items[i].data, "job_id": request.items[i].job_id}
+            for i in valid
+        ])
+        wait = BULK_SAVE_WAIT if request.wait is None else min(max(request.wait, 0), BULK_SAVE_WAIT)
+        jobs = await queue.wait([job["id"] for job in jobs], wait)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+    for i, job in zip(valid, jobs):
+        results[i] = {"index": i, "status": job["status"], "job_id": job["id"],
+                      "result": job["result"], "error": job["last_error"]}
+    counts: Dict[str, int] = {}
+    for result in results:
+        counts[result["status"]] = counts.get(result["status"], 0) + 1
+    return {"results": results, "counts": counts}
+
+@app.get("/metrics")
+async def get_metrics():
+    """
+    Stage and request latency histograms in the Prometheus text format.
+    """
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/api/cache/stats")
+async def cache_stats():
+    return {
+        "transcription": ai_service.transcription_cache.stats(),
+        "draft": ai_service.draft_cache.stats(),
+        "idempotency": idempotency.store.stats(),
+    }
+
+app.include_router(agenda.router)
+app.include_router(jobs.router)
+app.include_router(record_ws.router)
+app.include_router(search.router)
+app.include_router(stream.router)
+
 # Mount static files (Frontend)
 app.mount("/", StaticFiles(directory="static", html=True), name="static")
 
@@ -0,0 +1,254 @@
+import os
+import re
+import time
+import asyncio
+import logging
+import sqlite3
+import threading
+from datetime import date, timedelta
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Local, date-indexed copy of the Agenda database, so the day's events (and conflicts with
+# a draft) can be looked up without going through the rate-limited Notion API. It's kept
+# current by a background refresh (pages edited since the last one) and by every event
+# this app creates. Pages deleted in Notion are only dropped by the periodic full refresh.
+AGENDA_MIRROR_DB = os.getenv("AGENDA_MIRROR_DB", "agenda_mirror.db")
+# Seconds between incremental refreshes; 0 disables the background refresh
+AGENDA_REFRESH_INTERVAL = float(os.getenv("AGENDA_REFRESH_INTERVAL", "300"))
+AGENDA_FULL_REFRESH_INTERVAL = float(os.getenv("AGENDA_FULL_REFRESH_INTERVAL", str(24 * 3600)))
+
+# Times are compared as wall-clock keys ("YYYY-MM-DDTHH:MM:SS", UTC offset dropped), which
+# sort as strings. Intervals are half-open; an all-day event runs from 00:00 on its first
+# day to 00:00 after its last, and an event without an end is a single instant.
+_DATE_TIME = re.compile(r"^(\d{4}-\d{2}-\d{2})(?:[T ](\d{2}):(\d{2})(?::(\d{2}))?)?")
+
+
+def parse_time(value: str, end: bool = False) -> Tuple[str, bool]:
+    """
+    (key, all_day) for an ISO date or date-time. A date-only `end` is inclusive, so its
+    key is the start of the following day.
+    """
+    found = _DATE_TIME.match((value or "").strip())
+    if not found:
+        raise ValueError(f"Invalid date: {value!r}")
+    day, hour, minute, second = found.groups()
+    # Rejects impossible dates like 2026-02-30
+    parsed = date.fromisoformat(day)
+    if hour is None:
+        if end:
+            parsed += timedelta(days=1)
+        return f"{parsed.isoformat()}T00:00:00", True
+    if int(hour) > 23 or int(minute) > 59 or int(second or 0) > 59:
+        raise ValueError(f"Invalid time: {value!r}")
+    return f"{day}T{hour}:{minute}:{second or '00'}", False
+
+
+def overlaps(start: str, end: str, other_start: str, other_end: str) -> bool:
+    """
+    Whether two half-open intervals of keys overlap. An instant (end == start) overlaps
+    an interval it falls in, or an instant or interval starting at the same time.
+    """
+    return start == other_start or start <= other_start < end or other_start <= start < other_end
+
+
+def _page_title(properties: Dict[str, Any]) -> str:
+    for prop in properties.values():
+        if prop.get("type") == "title" or "title" in prop:
+            return "".join(
+                part.get("plain_text") or part.get("text", {}).get("content", "") for part in prop.get("title") or []
+            )
+    return ""
+
+
+def _page_date(properties: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    # The "Date" property create_event writes, or else the first date property
+    candidates = [properties.get("Date")] + list(properties.values())
+    for prop in candidates:
+        if prop and (prop.get("type") == "date" or "date" in prop) and prop.get("date"):
+            return prop["date"]
+    return None
+
+
+class AgendaMirror:
+    def __init__(self, path: str = AGENDA_MIRROR_DB):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        # `days` is how many calendar days an event spans, so a range query only has to
+        # look back as far as the longest event instead of scanning everything before it
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS events ("
+            " id TEXT PRIMARY KEY,"
+            " title TEXT NOT NULL,"
+            " start TEXT NOT NULL,"
+            " end TEXT,"
+            " start_key TEXT NOT NULL,"
+            " end_key TEXT NOT NULL,"
+            " days INTEGER NOT NULL,"
+            " all_day INTEGER NOT NULL,"
+            " url TEXT,"
+            " last_edited_time TEXT)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS events_start ON events (start_key)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS events_days ON events (days)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS sync_state (key TEXT PRIMARY KEY, value TEXT)")
+        self._conn.commit()
+
+    def upsert_event(self, event_id: str, title: str, start: str, end: Optional[str] = None,
+                     url: Optional[str] = None, last_edited_time: Optional[str] = None) -> None:
+        """
+        Stores an event from its Notion date start/end (ISO date or date-time).
+        """
+        with self._lock:
+            self._upsert(event_id, title, start, end, url, last_edited_time)
+            self._conn.commit()
+
+    def upsert_pages(self, pages: Iterable[Dict[str, Any]]) -> int:
+        """
+        Stores Agenda pages as returned by a database query. Archived pages, and pages
+        without a date, are removed. Returns the number of events stored.
+        """
+        stored = 0
+        with self._lock:
+            for page in pages:
+                date_value = _page_date(page.get("properties") or {})
+                if page.get("archived") or page.get("in_trash") or not date_value or not date_value.get("start"):
+                    self._conn.execute("DELETE FROM events WHERE id = ?", (page["id"],))
+                    continue
+                try:
+                    self._upsert(page["id"], _page_title(page.get("properties") or {}), date_value["start"],
+                                 date_value.get("end"), page.get("url"), page.get("last_edited_time"))
+                    stored += 1
+                except ValueError as e:
+                    logger.warning("skipping agenda page %s: %s", page["id"], e)
+            self._conn.commit()
+        return stored
+
+    def _upsert(self, event_id: str, title: str, start: str, end: Optional[str],
+                url: Optional[str], last_edited_time: Optional[str]) -> None:
+        start_key, all_day = parse_time(start)
+        if end:
+            end_key = parse_time(end, end=True)[0]
+        else:
+            end_key = parse_time(start, end=True)[0] if all_day else start_key
+        end_key = max(end_key, start_key)
+        days = (date.fromisoformat(end_key[:10]) - date.fromisoformat(start_key[:10])).days
+        self._conn.execute(
+            "INSERT OR REPLACE INTO events"
+            " (id, title, start, end, start_key, end_key, days, all_day, url, last_edited_time)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (event_id, title, start, end, start_key, end_key, days, int(all_day), url, last_edited_time),
+        )
+
+    def retain(self, ids: Iterable[str]) -> int:
+        """
+        Removes every event not in ids (after a full refresh). Returns how many were removed.
+        """
+        with self._lock:
+            self._conn.execute("CREATE TEMP TABLE IF NOT EXISTS seen (id TEXT PRIMARY KEY)")
+            self._conn.execute("DELETE FROM seen")
+            self._conn.executemany("INSERT OR IGNORE INTO seen (id) VALUES (?)", ((i,) for i in ids))
+            removed = self._conn.execute("DELETE FROM events WHERE id NOT IN (SELECT id FROM seen)").rowcount
+            self._conn.execute("DELETE FROM seen")
+            self._conn.commit()
+            return removed
+
+    def range(self, from_key: str, to_key: str, limit: int = 500) -> List[Dict[str, Any]]:
+        """
+        Events overlapping [from_key, to_key), by start time.
+        """
+        with self._lock:
+            longest = self._conn.execute("SELECT MAX(days) FROM events").fetchone()[0] or 0
+            # Nothing starting before this can reach from_key
+            lower = (date.fromisoformat(from_key[:10]) - timedelta(days=longest)).isoformat()
+            rows = self._conn.execute(
+                "SELECT * FROM events WHERE start_key >= ? AND start_key < ?"
+                " AND (end_key > ? OR start_key >= ?) ORDER BY start_key LIMIT ?",
+                (lower, to_key, from_key, from_key, limit),
+            ).fetchall()
+        return [
+            {"id": row["id"], "title": row["title"], "start": row["start"], "end": row["end"],
+             "start_key": row["start_key"], "end_key": row["end_key"], "all_day": bool(row["all_day"]),
+             "url": row["url"]}
+            for row in rows
+        ]
+
+    def get_state(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM sync_state WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_state(self, key: str, value: str) -> None:
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO sync_state (key, value) VALUES (?, ?)", (key, value))
+            self._conn.commit()
+
+    def get_watermark(self) -> Optional[str]:
+        """
+        Newest last_edited_time covered by the last complete refresh.
+        """
+        return self.get_state("watermark")
+
+    def set_watermark(self, value: str) -> None:
+        self.set_state("watermark", value)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM events").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+_mirror: Optional[AgendaMirror] = None
+_refresher: Optional[asyncio.Task] = None
+
+def get_mirror() -> AgendaMirror:
+    global _mirror
+    if _mirror is None:
+        _mirror = AgendaMirror(AGENDA_MIRROR_DB)
+    return _mirror
+
+def close_mirror() -> None:
+    global _mirror
+    if _mirror is not None:
+        _mirror.close()
+        _mirror = None
+
+def full_refresh_due() -> bool:
+    last = get_mirror().get_state("full_refresh_at")
+    return last is None or time.time() - float(last) >= AGENDA_FULL_REFRESH_INTERVAL
+
+async def _refresh_loop(sync: Callable[[bool], Awaitable[Any]]) -> None:
+    while True:
+        try:
+            await sync(full_refresh_due())
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # The mirror just stays as it was until the next attempt
+            logger.warning("agenda refresh failed: %s", e)
+        await asyncio.sleep(AGENDA_REFRESH_INTERVAL)
+
+async def start_refresher(sync: Callable[[bool], Awaitable[Any]]) -> None:
+    """
+    Runs sync(full) now and then every AGENDA_REFRESH_INTERVAL seconds, with full=True
+    once every AGENDA_FULL_REFRESH_INTERVAL.
+    """
+    global _refresher
+    if _refresher is None and AGENDA_REFRESH_INTERVAL > 0:
+        _refresher = asyncio.create_task(_refresh_loop(sync))
+
+async def stop_refresher() -> None:
+    global _refresher
+    if _refresher is not None:
+        _refresher.cancel()
+        try:
+            await _refresher
+        except asyncio.CancelledError:
+            pass
+        _refresher = None
@@ -1,11 +1,68 @@
 import os
-import requests
+import copy
 import json
-from typing import Optional, Dict, Any
+import time
+import random
+import asyncio
+import hashlib
+import logging
+import datetime
+import unicodedata
+import secrets
+import httpx
+from collections import deque
+from typing import Optional, Dict, Any, AsyncIterator, BinaryIO, List, Tuple, Union
+
+from services import audio_normalize, event_parser, http_client, metrics
+from services.cache import Cache, SQLiteCache
+from services.json_stream import PartialJSONParser
+
+logger = logging.getLogger(__name__)
 
 # Load environment variables (assuming they are loaded in main.py or automatically by python-dotenv)
 API_KEY = os.getenv("SUPER_MIND_API_KEY")
-BASE_URL = "https://space.ai-builders.com/backend/v1"
+BASE_URL = os.getenv("SUPER_MIND_BASE_URL", "https://space.ai-builders.com/backend/v1")
+# Transcription and LLM calls can legitimately take a while, so the read timeout is generous.
+TIMEOUT = float(os.getenv("SUPER_MIND_TIMEOUT", "120"))
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+# Transcriptions are cached by a hash of the audio bytes, so retrying the same clip
+# (e.g. after the draft step failed) doesn't pay for transcription twice.
+TRANSCRIPTION_CACHE_SIZE = int(os.getenv("TRANSCRIPTION_CACHE_SIZE", "256"))
+TRANSCRIPTION_CACHE_TTL = float(os.getenv("TRANSCRIPTION_CACHE_TTL", str(7 * 24 * 3600)))
+# Optional on-disk tier, e.g. "transcriptions.db"
+TRANSCRIPTION_CACHE_DB = os.getenv("TRANSCRIPTION_CACHE_DB")
+TRANSCRIPTION_CACHE_MAX_BYTES = int(os.getenv("TRANSCRIPTION_CACHE_MAX_BYTES", str(50 * 1024 * 1024)))
+
+# Segments of a long recording are transcribed this many at a time, and a segment that
+# fails (429/5xx, network error) is retried on its own up to TRANSCRIPTION_MAX_ATTEMPTS times.
+TRANSCRIPTION_CONCURRENCY = int(os.getenv("TRANSCRIPTION_CONCURRENCY", "8"))
+TRANSCRIPTION_MAX_ATTEMPTS = int(os.getenv("TRANSCRIPTION_MAX_ATTEMPTS", "3"))
+# Overlapping segment transcripts are deduplicated on a shared run of this many characters
+_MIN_OVERLAP_CHARS = 2
+_MAX_OVERLAP_CHARS = 80
+_TRAILING_PUNCTUATION = " .,!?;:…。，！？；："
+
+# Drafts are memoized by (mode, normalized transcript, TODAY_DATE), so re-recording the same
+# sentence or a client retry doesn't run another chat completion.
+DRAFT_CACHE_SIZE = int(os.getenv("DRAFT_CACHE_SIZE", "512"))
+DRAFT_CACHE_TTL = float(os.getenv("DRAFT_CACHE_TTL", str(24 * 3600)))
+
+# Short event utterances whose date and time the local parser fully understands ("dentist
+# tomorrow at 3pm") are drafted without the LLM. Hits and misses are the "fast_path" stage
+# in /metrics, with outcome="hit" or "miss".
+EVENT_FAST_PATH = os.getenv("EVENT_FAST_PATH", "1").lower() in ("1", "true", "yes")
+
+# LLM call policy: every attempt is bounded by LLM_ATTEMPT_TIMEOUT, and timeouts, 429/5xx,
+# network errors and replies that aren't valid JSON are retried up to LLM_MAX_ATTEMPTS times.
+# With LLM_HEDGE on, an attempt still running after the observed p90 latency (LLM_HEDGE_DELAY
+# until enough calls have been seen) gets a second request in parallel; the first valid reply wins.
+LLM_ATTEMPT_TIMEOUT = float(os.getenv("LLM_ATTEMPT_TIMEOUT", "60"))
+LLM_MAX_ATTEMPTS = int(os.getenv("LLM_MAX_ATTEMPTS", "3"))
+LLM_HEDGE = os.getenv("LLM_HEDGE", "").lower() in ("1", "true", "yes")
+LLM_HEDGE_DELAY = float(os.getenv("LLM_HEDGE_DELAY", "10"))
+LLM_HEDGE_QUANTILE = 0.9
+_HEDGE_MIN_SAMPLES = 20
 
 if not API_KEY:
     raise ValueError("SUPER_MIND_API_KEY is not set in environment variables")
@@ -14,29 +71,272 @@ HEADERS = {
     "Authorization": f"Bearer {API_KEY}"
 }
 
-def transcribe_audio(file_path: str) -> str:
+_client: Optional[httpx.AsyncClient] = None
+
+transcription_cache = Cache(
+    TRANSCRIPTION_CACHE_SIZE,
+    ttl=TRANSCRIPTION_CACHE_TTL,
+    disk=SQLiteCache(TRANSCRIPTION_CACHE_DB, TRANSCRIPTION_CACHE_TTL, TRANSCRIPTION_CACHE_MAX_BYTES)
+    if TRANSCRIPTION_CACHE_DB else None,
+)
+
+draft_cache = Cache(DRAFT_CACHE_SIZE, ttl=DRAFT_CACHE_TTL)
+
+# Durations of recent successful LLM attempts, for the hedging threshold
+_llm_latencies: deque = deque(maxlen=200)
+
+class RetryableAIError(Exception):
     """
-    Transcribes audio file using AI-builders API.
+    A failed LLM attempt that may well succeed if repeated (timeout, 429/5xx, malformed reply).
     """
-    url = f"{BASE_URL}/audio/transcriptions"
-    
-    with open(file_path, "rb") as f:
-        files = {"audio_file": (os.path.basename(file_path), f)}
-        # Optional: Add language hint if needed, e.g. "zh" for Chinese
-        # data = {"language": "zh"} 
-        response = requests.post(url, headers=HEADERS, files=files)
-    
-    if response.status_code != 200:
-        raise Exception(f"Transcription failed: {response.text}")
-    
+
+def _get_client() -> httpx.AsyncClient:
+    # Created lazily so scripts can use the service without the FastAPI lifespan.
+    global _client
+    if _client is None:
+        _client = http_client.create_client(BASE_URL, HEADERS, TIMEOUT)
+    return _client
+
+async def open_client() -> None:
+    _get_client()
+
+async def close_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+async def transcribe_audio(
+    audio: Union[str, BinaryIO],
+    filename: Optional[str] = None,
+    content_type: str = "application/octet-stream",
+) -> str:
+    """
+    Transcribes audio using AI-builders API.
+    `audio` is either a file path or an open binary file (e.g. UploadFile.file), which is
+    streamed to the API in chunks without being copied to another file first.
+    """
+    if isinstance(audio, str):
+        with open(audio, "rb") as f:
+            return await transcribe_audio(f, filename or os.path.basename(audio), content_type)
+
+    # Optional: Add language hint if needed, e.g. "zh" for Chinese
+    # data = {"language": "zh"} 
+    headers, body = _multipart_stream("audio_file", filename or "audio.webm", content_type, audio)
+    with metrics.timer("transcription"):
+        try:
+            response = await _get_client().post("/audio/transcriptions", headers=headers, content=body)
+        except httpx.TransportError as e:
+            raise RetryableAIError(f"Transcription failed: {e!r}") from e
+
+        if response.status_code == 429 or response.status_code >= 500:
+            raise RetryableAIError(f"Transcription failed ({response.status_code}): {response.text[:200]}")
+        if response.status_code != 200:
+            raise Exception(f"Transcription failed: {response.text}")
+
     return response.json().get("text", "")
 
-def process_event_text(text: str) -> Dict[str, Any]:
+async def transcribe_audio_cached(
+    audio: BinaryIO,
+    filename: str,
+    content_type: str = "application/octet-stream",
+) -> str:
+    """
+    Same as transcribe_audio, but consults transcription_cache first (keyed by the original
+    bytes). On a miss the clip is normalized, and a long one is transcribed as segments in
+    parallel and stitched back together. Concurrent requests for the same audio share one
+    upstream call.
+    """
+    # Hashing a long recording takes a while, so it's kept off the event loop
+    key = await asyncio.to_thread(audio_digest, audio)
+
+    async def transcribe() -> str:
+        segments = [(audio, filename, content_type, False)]
+        if audio_normalize.AUDIO_NORMALIZE:
+            segments = await audio_normalize.normalize(audio, filename, content_type)
+        semaphore = asyncio.Semaphore(TRANSCRIPTION_CONCURRENCY)
+
+        async def transcribe_one(segment: audio_normalize.Segment) -> str:
+            async with semaphore:
+                return await _transcribe_segment(*segment[:3])
+
+        parts = await asyncio.gather(*[transcribe_one(segment) for segment in segments])
+        return stitch_transcripts(parts, [overlaps for _, _, _, overlaps in segments])
+
+    return await transcription_cache.get_or_compute(key, transcribe)
+
+async def _transcribe_segment(audio: BinaryIO, filename: str, content_type: str) -> str:
+    start = audio.tell()
+    for attempt in range(1, TRANSCRIPTION_MAX_ATTEMPTS + 1):
+        try:
+            return await transcribe_audio(audio, filename, content_type)
+        except RetryableAIError as e:
+            if attempt == TRANSCRIPTION_MAX_ATTEMPTS:
+                raise
+            delay = _backoff(attempt)
+            logger.info("transcribing %s failed (attempt %d/%d), retrying in %.2fs: %s",
+                        filename, attempt, TRANSCRIPTION_MAX_ATTEMPTS, delay, e)
+            await asyncio.sleep(delay)
+            audio.seek(start)
+
+def stitch_transcripts(parts: List[str], overlaps: List[bool]) -> str:
+    """
+    Joins segment transcripts in order. Where a segment's audio overlaps the previous one, the
+    longest text that ends the previous transcript and starts this one is kept only once.
+    """
+    text = ""
+    for part, overlapping in zip(parts, overlaps):
+        part = part.strip()
+        if overlapping and text and part:
+            # The cut can fall mid-sentence, so ignore the punctuation the previous segment ended with
+            trimmed = text.rstrip(_TRAILING_PUNCTUATION)
+            length = _overlap_length(trimmed, part)
+            if length:
+                text, part = trimmed, part[length:].lstrip(_TRAILING_PUNCTUATION)
+        if part:
+            text = f"{text} {part}" if text else part
+    return text
+
+def _overlap_length(previous: str, current: str) -> int:
+    longest = min(len(previous), len(current), _MAX_OVERLAP_CHARS)
+    for length in range(longest, _MIN_OVERLAP_CHARS - 1, -1):
+        if previous[-length:].lower() == current[:length].lower():
+            return length
+    return 0
+
+def _backoff(attempt: int) -> float:
+    return min(2.0, 0.25 * 2 ** (attempt - 1)) * random.uniform(0.5, 1.0)
+
+def audio_digest(audio: BinaryIO) -> str:
+    """
+    SHA-256 of the file's remaining bytes; the read position is restored afterwards.
+    """
+    start = audio.tell()
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: audio.read(UPLOAD_CHUNK_SIZE), b""):
+        digest.update(chunk)
+    audio.seek(start)
+    return digest.hexdigest()
+
+def _multipart_stream(
+    field: str, filename: str, content_type: str, audio: BinaryIO
+) -> Tuple[Dict[str, str], AsyncIterator[bytes]]:
+    """
+    Builds a single-file multipart/form-data body that reads `audio` lazily in UPLOAD_CHUNK_SIZE
+    chunks from its current position. Content-Length is computed up front so the upstream
+    doesn't have to deal with chunked transfer encoding.
+    """
+    boundary = secrets.token_hex(16)
+    safe_name = filename.replace('"', "%22").replace("\r", "").replace("\n", "")
+    head = (
+        f"--{boundary}\r\n"
+        f'Content-Disposition: form-data; name="{field}"; filename="{safe_name}"\r\n'
+        f"Content-Type: {content_type}\r\n\r\n"
+    ).encode()
+    tail = f"\r\n--{boundary}--\r\n".encode()
+
+    start = audio.tell()
+    size = audio.seek(0, os.SEEK_END) - start
+    audio.seek(start)
+
+    async def body() -> AsyncIterator[bytes]:
+        yield head
+        while True:
+            chunk = audio.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+        yield tail
+
+    headers = {
+        "Content-Type": f"multipart/form-data; boundary={boundary}",
+        "Content-Length": str(len(head) + size + len(tail)),
+    }
+    return headers, body()
+
+async def process_text(mode: str, text: str, use_cache: bool = True) -> Dict[str, Any]:
+    """
+    Drafts an entry for the given mode ("event" or "idea") from transcribed text.
+    """
+    if mode == "event":
+        return await process_event_text(text, use_cache)
+    if mode == "idea":
+        return await process_idea_text(text, use_cache)
+    raise ValueError("Invalid mode. Must be 'event' or 'idea'.")
+
+async def process_event_text(text: str, use_cache: bool = True) -> Dict[str, Any]:
     """
     Extracts event details (title, start_time, end_time) from text.
     Returns a JSON object.
     """
-    prompt = f"""
+    # use_cache=False asks for a fresh draft, so the LLM gets a look even at simple phrases
+    draft = _fast_event_draft(text) if use_cache else None
+    if draft is not None:
+        return draft
+    key, prompt = _draft_request("event", text)
+    return await _memoized_completion(key, prompt, use_cache)
+
+def _fast_event_draft(text: str) -> Optional[Dict[str, Any]]:
+    if not EVENT_FAST_PATH:
+        return None
+    start = time.perf_counter()
+    draft = event_parser.parse_event(normalize_transcript(text), datetime.date.fromisoformat(_today()))
+    metrics.observe("fast_path", time.perf_counter() - start, "hit" if draft is not None else "miss")
+    return draft
+
+async def process_idea_text(text: str, use_cache: bool = True) -> Dict[str, Any]:
+    """
+    Summarizes an idea and structures it.
+    Returns a JSON object.
+    """
+    key, prompt = _draft_request("idea", text)
+    return await _memoized_completion(key, prompt, use_cache)
+
+async def stream_draft(mode: str, text: str, use_cache: bool = True) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Streaming variant of process_text. Yields
+      {"event": "field", "field": ..., "value": ..., "complete": bool}
+    as draft fields are parsed from the upstream token stream (string fields are reported
+    while still incomplete), then a final {"event": "draft", "draft": {...}}.
+    A memoized or locally parsed draft is returned straight away as the final event.
+    """
+    if mode == "event" and use_cache:
+        draft = _fast_event_draft(text)
+        if draft is not None:
+            yield {"event": "draft", "draft": draft}
+            return
+
+    key, prompt = _draft_request(mode, text)
+    if use_cache:
+        cached = draft_cache.lookup(key)
+        if cached is not None:
+            yield {"event": "draft", "draft": copy.deepcopy(cached)}
+            return
+
+    parser = PartialJSONParser()
+    parts = []
+    async for delta in _stream_chat_completion(prompt):
+        parts.append(delta)
+        for field, value, complete in parser.feed(delta):
+            yield {"event": "field", "field": field, "value": value, "complete": complete}
+
+    try:
+        draft = _parse_content("".join(parts))
+    except Exception as e:
+        # The streamed reply wasn't a usable draft; the fields sent so far are superseded
+        logger.info("streamed draft unusable, retrying without streaming: %s", e)
+        draft = await _get_chat_completion(prompt)
+    draft_cache.set(key, draft)
+    yield {"event": "draft", "draft": copy.deepcopy(draft)}
+
+def _draft_request(mode: str, text: str) -> Tuple[str, str]:
+    """
+    Returns (draft cache key, prompt) for the given mode and transcript.
+    """
+    text = normalize_transcript(text)
+    today = _today()
+    if mode == "event":
+        prompt = f"""
     Analyze the following text and extract event details.
     Text: "{text}"
     
@@ -46,19 +346,12 @@ def process_event_text(text: str) -> Dict[str, Any]:
     - end_time: The end time in ISO 8601 format, or null if not specified.
     - description: Any additional details found in the text.
     
-    If the text contains relative dates (e.g., "tomorrow", "next Friday"), calculate the date assuming today is {os.getenv("TODAY_DATE", "2026-01-18")}.
+    If the text contains relative dates (e.g., "tomorrow", "next Friday"), calculate the date assuming today is {today}.
     If the majority of the text is in Chinese, the content and title should be in Chinese.
     Return ONLY the JSON object, no markdown formatting.
     """
-    
-    return _get_chat_completion(prompt)
-
-def process_idea_text(text: str) -> Dict[str, Any]:
-    """
-    Summarizes an idea and structures it.
-    Returns a JSON object.
-    """
-    prompt = f"""
+    elif mode == "idea":
+        prompt = f"""
     Analyze the following text which is a raw idea or thought.
     Text: "{text}"
     
@@ -70,13 +363,35 @@ def process_idea_text(text: str) -> Dict[str, Any]:
     
     Return ONLY the JSON object, no markdown formatting.
     """
-    
-    return _get_chat_completion(prompt)
+    else:
+        raise ValueError("Invalid mode. Must be 'event' or 'idea'.")
 
-def _get_chat_completion(prompt: str) -> Dict[str, Any]:
-    url = f"{BASE_URL}/chat/completions"
-    
-    payload = {
+    # The key covers the normalized prompt inputs: mode, transcript and reference date
+    key = hashlib.sha256(json.dumps((mode, text, today), ensure_ascii=False).encode()).hexdigest()
+    return key, prompt
+
+def _today() -> str:
+    return os.getenv("TODAY_DATE", "2026-01-18")
+
+def normalize_transcript(text: str) -> str:
+    # Unicode-normalize and collapse whitespace so trivially different transcripts share a draft
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+async def _memoized_completion(key: str, prompt: str, use_cache: bool) -> Dict[str, Any]:
+    """
+    Runs the chat completion through draft_cache. Identical concurrent requests share one upstream call.
+    With use_cache=False the cache is bypassed, but the fresh draft still replaces the cached one.
+    """
+    if use_cache:
+        draft = await draft_cache.get_or_compute(key, lambda: _get_chat_completion(prompt))
+    else:
+        draft = await _get_chat_completion(prompt)
+        draft_cache.set(key, draft)
+    # Callers may edit the draft; keep the cached copy pristine
+    return copy.deepcopy(draft)
+
+def _chat_payload(prompt: str) -> Dict[str, Any]:
+    return {
         "model": "supermind-agent-v1",
         "messages": [
             {"role": "system", "content": "You are a helpful assistant that processes text into structured JSON data. You must always return valid JSON."},
@@ -86,20 +401,165 @@ def _get_chat_completion(prompt: str) -> Dict[str, Any]:
         # Remove response_format for gemini-3-flash-preview as it might be causing empty responses if strict mode fails
         # "response_format": {"type": "json_object"} 
     }
-    
-    response = requests.post(url, headers={"Authorization": f"Bearer {API_KEY}", "Content-Type": "application/json"}, json=payload)
-    
-    if response.status_code != 200:
-        # Fallback to standard request if json_object format is not supported by the proxy or model specifically
-        del payload["response_format"]
-        response = requests.post(url, headers={"Authorization": f"Bearer {API_KEY}", "Content-Type": "application/json"}, json=payload)
-        
+
+async def _get_chat_completion(prompt: str) -> Dict[str, Any]:
+    """
+    Chat completion parsed into a draft, under the LLM call policy above.
+    """
+    payload = _chat_payload(prompt)
+    for attempt in range(1, LLM_MAX_ATTEMPTS + 1):
+        try:
+            return await _hedged_attempt(payload)
+        except RetryableAIError as e:
+            if attempt == LLM_MAX_ATTEMPTS:
+                raise
+            delay = _backoff(attempt)
+            logger.info("llm attempt %d/%d failed, retrying in %.2fs: %s", attempt, LLM_MAX_ATTEMPTS, delay, e)
+            await asyncio.sleep(delay)
+
+def _hedge_delay() -> float:
+    if len(_llm_latencies) < _HEDGE_MIN_SAMPLES:
+        return LLM_HEDGE_DELAY
+    ordered = sorted(_llm_latencies)
+    return ordered[int(LLM_HEDGE_QUANTILE * (len(ordered) - 1))]
+
+async def _hedged_attempt(payload: Dict[str, Any]) -> Dict[str, Any]:
+    if not LLM_HEDGE:
+        return await _completion_attempt(payload)
+
+    first = asyncio.ensure_future(_completion_attempt(payload))
+    pending = {first}
+    error: Optional[BaseException] = None
+    try:
+        done, pending = await asyncio.wait(pending, timeout=_hedge_delay())
+        if done:
+            return first.result()
+
+        logger.debug("llm attempt slower than %.2fs, sending a hedged request", _hedge_delay())
+        pending.add(asyncio.ensure_future(_completion_attempt(payload)))
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        # The loser (or every attempt, if we were cancelled) is abandoned
+        for task in pending:
+            task.cancel()
+
+async def _completion_attempt(payload: Dict[str, Any]) -> Dict[str, Any]:
+    start = time.perf_counter()
+    outcome = "error"
+    try:
+        response = await asyncio.wait_for(
+            _get_client().post("/chat/completions", json=payload), LLM_ATTEMPT_TIMEOUT
+        )
+        if response.status_code == 429 or response.status_code >= 500:
+            raise RetryableAIError(f"AI processing failed ({response.status_code}): {response.text[:200]}")
         if response.status_code != 200:
             raise Exception(f"AI processing failed: {response.text}")
 
-    result = response.json()
-    print(f"DEBUG: AI Response: {json.dumps(result, indent=2)}")
-    
+        try:
+            result = response.json()
+            logger.debug("chat completion usage=%s", result.get("usage"))
+            draft = _parse_content(_message_content(result))
+        except Exception as e:
+            raise RetryableAIError(str(e)) from e
+
+        outcome = "ok"
+        _llm_latencies.append(time.perf_counter() - start)
+        return draft
+    except asyncio.TimeoutError:
+        outcome = "timeout"
+        raise RetryableAIError(f"AI processing timed out after {LLM_ATTEMPT_TIMEOUT:g}s")
+    except httpx.TransportError as e:
+        raise RetryableAIError(f"AI processing failed: {e!r}") from e
+    except asyncio.CancelledError:
+        outcome = "cancelled"
+        raise
+    finally:
+        metrics.observe("llm", time.perf_counter() - start, outcome)
+
+async def _stream_chat_completion(prompt: str) -> AsyncIterator[str]:
+    """
+    Yields content deltas from a streamed (stream=true) chat completion. Until the first
+    delta the LLM call policy applies (per-attempt timeout, retries); once text has been
+    yielded a failure is raised as is.
+    """
+    payload = _chat_payload(prompt)
+    payload["stream"] = True
+
+    # Times the whole stream, as the non-streamed call does
+    with metrics.timer("llm"):
+        for attempt in range(1, LLM_MAX_ATTEMPTS + 1):
+            try:
+                async for delta in _stream_attempt(payload):
+                    yield delta
+                return
+            except RetryableAIError as e:
+                if attempt == LLM_MAX_ATTEMPTS:
+                    raise
+                delay = _backoff(attempt)
+                logger.info("llm stream attempt %d/%d failed, retrying in %.2fs: %s", attempt, LLM_MAX_ATTEMPTS, delay, e)
+                await asyncio.sleep(delay)
+
+async def _stream_attempt(payload: Dict[str, Any]) -> AsyncIterator[str]:
+    """
+    One streamed completion. Everything up to the first delta must finish within
+    LLM_ATTEMPT_TIMEOUT, and failures before it raise RetryableAIError.
+    """
+    deadline = time.monotonic() + LLM_ATTEMPT_TIMEOUT
+    started = False
+
+    async def before_first_delta(awaitable):
+        # Bounded by what is left of the attempt until text arrives, unbounded after that
+        if started:
+            return await awaitable
+        try:
+            return await asyncio.wait_for(awaitable, max(0.0, deadline - time.monotonic()))
+        except asyncio.TimeoutError:
+            raise RetryableAIError(f"AI processing timed out after {LLM_ATTEMPT_TIMEOUT:g}s")
+        except httpx.TransportError as e:
+            raise RetryableAIError(f"AI processing failed: {e!r}") from e
+
+    client = _get_client()
+    request = client.build_request("POST", "/chat/completions", json=payload)
+    response = await before_first_delta(client.send(request, stream=True))
+    try:
+        if response.status_code != 200:
+            await before_first_delta(response.aread())
+            if response.status_code == 429 or response.status_code >= 500:
+                raise RetryableAIError(f"AI processing failed ({response.status_code}): {response.text[:200]}")
+            raise Exception(f"AI processing failed: {response.text}")
+
+        if "text/event-stream" not in response.headers.get("content-type", ""):
+            # The proxy ignored stream=true and answered with a regular completion
+            await before_first_delta(response.aread())
+            yield _message_content(response.json())
+            return
+
+        lines = response.aiter_lines()
+        while True:
+            try:
+                line = await before_first_delta(lines.__anext__())
+            except StopAsyncIteration:
+                break
+            if not line.startswith("data:"):
+                continue
+            data = line[5:].strip()
+            if data == "[DONE]":
+                break
+            choices = json.loads(data).get("choices") or []
+            delta = (choices[0].get("delta") or {}).get("content") if choices else None
+            if delta:
+                started = True
+                yield delta
+    finally:
+        await response.aclose()
+
+def _message_content(result: Dict[str, Any]) -> str:
     if not result.get("choices") or not result["choices"][0].get("message"):
         raise Exception(f"Invalid AI response structure: {result}")
 
@@ -107,8 +567,15 @@ def _get_chat_completion(prompt: str) -> Dict[str, Any]:
     
     if not content:
         raise Exception(f"AI returned empty content. Full response: {result}")
-    
-    print(f"DEBUG: Raw content: {content!r}")
+
+    return content
+
+def _parse_content(content: str) -> Dict[str, Any]:
+    with metrics.timer("parse"):
+        return _clean_and_parse(content)
+
+def _clean_and_parse(content: str) -> Dict[str, Any]:
+    logger.debug("model output chars=%d content=%r", len(content), content)
 
     # Clean up potential markdown code blocks
     clean_content = content.strip()
@@ -121,9 +588,15 @@ def _get_chat_completion(prompt: str) -> Dict[str, Any]:
         clean_content = clean_content[:-3]
         
     clean_content = clean_content.strip()
+    if not clean_content.startswith("{") and "{" in clean_content and "}" in clean_content:
+        # Prose around the object, e.g. "Here is the JSON: {...}"
+        clean_content = clean_content[clean_content.index("{"):clean_content.rindex("}") + 1]
     
     try:
-        return json.loads(clean_content)
+        result = json.loads(clean_content)
     except json.JSONDecodeError:
-        print(f"ERROR: Failed to parse JSON. Content was: {clean_content!r}")
+        logger.warning("model output is not valid JSON: %.500r", clean_content)
         raise Exception(f"Failed to parse JSON response: {content}")
+    if not isinstance(result, dict):
+        raise Exception(f"Expected a JSON object, got: {content}")
+    return result
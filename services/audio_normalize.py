@@ -0,0 +1,238 @@
+import io
+import os
+import wave
+import shutil
+import asyncio
+import logging
+import tempfile
+from typing import BinaryIO, List, Optional, Tuple
+
+import numpy as np
+
+from services import metrics
+
+logger = logging.getLogger(__name__)
+
+# Clips are decoded, trimmed of leading and trailing silence and re-encoded as 16 kHz mono
+# before they're sent for transcription. WAV is decoded in-process; other formats (webm/opus,
+# ogg, mp4) need ffmpeg and are sent unchanged without it. With ffmpeg the result is Opus in
+# Ogg, otherwise 16-bit WAV. The normalized clip is only used if it's smaller than the original.
+# Clips longer than AUDIO_SEGMENT_SECONDS are split, preferably at a pause, into segments that
+# are transcribed in parallel.
+AUDIO_NORMALIZE = os.getenv("AUDIO_NORMALIZE", "1").lower() in ("1", "true", "yes")
+FFMPEG_PATH = os.getenv("FFMPEG_PATH", "ffmpeg")
+# A 20 ms frame is silence if it's quieter than this (dBFS) or 40 dB below the loudest frame
+AUDIO_SILENCE_DB = float(os.getenv("AUDIO_SILENCE_DB", "-45"))
+AUDIO_OPUS_BITRATE = os.getenv("AUDIO_OPUS_BITRATE", "24k")
+AUDIO_SEGMENT_SECONDS = float(os.getenv("AUDIO_SEGMENT_SECONDS", "60"))
+
+SAMPLE_RATE = 16000
+_FRAME = SAMPLE_RATE // 50
+_DYNAMIC_RANGE_DB = 40.0
+# Kept on both sides of the speech, so word onsets and tails aren't clipped
+_PADDING = SAMPLE_RATE // 4
+# Cuts are made in the last third of a segment's allowed length, at the quietest 200 ms.
+# Without a pause there, consecutive segments share _OVERLAP so no word is lost at the cut.
+_CUT_SMOOTHING = 10
+_OVERLAP = SAMPLE_RATE
+
+# (file, filename, content type, overlaps the previous segment)
+Segment = Tuple[BinaryIO, str, str, bool]
+
+def ffmpeg_available() -> bool:
+    return shutil.which(FFMPEG_PATH) is not None
+
+async def normalize(audio: BinaryIO, filename: str, content_type: str) -> List[Segment]:
+    """
+    Returns the segments to transcribe, in order: the trimmed 16 kHz mono clip, split if it's
+    long, or just the original (read position unchanged) if it can't be decoded or a single
+    normalized segment wouldn't be smaller. Returns [] if the clip is silent throughout.
+    """
+    start = audio.tell()
+    size = audio.seek(0, os.SEEK_END) - start
+    audio.seek(start)
+    original = [(audio, filename, content_type, False)]
+    with metrics.timer("normalize"):
+        try:
+            encoded = await _normalize(audio, filename)
+        except Exception as e:
+            logger.info("audio normalization skipped for %s: %s", filename, e)
+            encoded = None
+        finally:
+            audio.seek(start)
+
+    if encoded is None:
+        return original
+    if not encoded:
+        logger.debug("%s is silent, skipping transcription", filename)
+        return []
+    if len(encoded) == 1 and len(encoded[0][0]) >= size:
+        return original
+    logger.debug("normalized %s: %d -> %d bytes in %d segments",
+                 filename, size, sum(len(data) for data, _, _, _ in encoded), len(encoded))
+    stem = os.path.splitext(filename)[0]
+    return [
+        (io.BytesIO(data), f"{stem}-{i}{suffix}" if len(encoded) > 1 else stem + suffix, normalized_type, overlaps)
+        for i, (data, suffix, normalized_type, overlaps) in enumerate(encoded)
+    ]
+
+async def _normalize(audio: BinaryIO, filename: str) -> Optional[List[Tuple[bytes, str, str, bool]]]:
+    header = audio.read(12)
+    audio.seek(-len(header), os.SEEK_CUR)
+    use_ffmpeg = ffmpeg_available()
+    if header[:4] == b"RIFF" and header[8:12] == b"WAVE":
+        samples = await asyncio.to_thread(decode_wav, audio)
+    elif use_ffmpeg:
+        samples = await _ffmpeg_decode(audio, filename)
+    else:
+        return None
+
+    samples = await asyncio.to_thread(trim_silence, samples)
+    if samples.size == 0:
+        return []
+    bounds = await asyncio.to_thread(split_segments, samples)
+
+    async def encode(begin: int, end: int, overlaps: bool) -> Tuple[bytes, str, str, bool]:
+        pcm = (np.clip(samples[begin:end], -1.0, 1.0) * 32767).astype("<i2").tobytes()
+        if use_ffmpeg:
+            return await _ffmpeg_encode(pcm), ".ogg", "audio/ogg", overlaps
+        return _wav_bytes(pcm), ".wav", "audio/wav", overlaps
+
+    return list(await asyncio.gather(*[encode(*bound) for bound in bounds]))
+
+def decode_wav(audio: BinaryIO) -> np.ndarray:
+    """
+    Decodes PCM WAV (8, 16, 24 or 32-bit, any channel count and rate) to float32 mono at SAMPLE_RATE.
+    """
+    # Closing the reader doesn't close a file object it was given
+    with wave.open(audio, "rb") as reader:
+        channels, width, rate = reader.getnchannels(), reader.getsampwidth(), reader.getframerate()
+        raw = reader.readframes(reader.getnframes())
+
+    if width == 1:
+        samples = (np.frombuffer(raw, np.uint8).astype(np.float32) - 128) / 128
+    elif width == 3:
+        octets = np.frombuffer(raw, np.uint8).reshape(-1, 3).astype(np.int32)
+        values = octets[:, 0] | (octets[:, 1] << 8) | (octets[:, 2] << 16)
+        samples = (np.where(values >= 1 << 23, values - (1 << 24), values) / float(1 << 23)).astype(np.float32)
+    elif width in (2, 4):
+        samples = np.frombuffer(raw, f"<i{width}").astype(np.float32) / float(1 << (8 * width - 1))
+    else:
+        raise ValueError(f"Unsupported WAV sample width: {width}")
+
+    frames = len(samples) // channels
+    samples = samples[:frames * channels].reshape(frames, channels).mean(axis=1)
+    return _resample(samples, rate)
+
+def _resample(samples: np.ndarray, rate: int) -> np.ndarray:
+    if rate == SAMPLE_RATE:
+        return samples.astype(np.float32)
+    if rate % SAMPLE_RATE == 0:
+        # 32/48 kHz: averaging each group doubles as the anti-aliasing filter
+        factor = rate // SAMPLE_RATE
+        usable = len(samples) // factor * factor
+        return samples[:usable].reshape(-1, factor).mean(axis=1).astype(np.float32)
+    positions = np.arange(0, len(samples), rate / SAMPLE_RATE)
+    return np.interp(positions, np.arange(len(samples)), samples).astype(np.float32)
+
+def trim_silence(samples: np.ndarray) -> np.ndarray:
+    """
+    Drops leading and trailing silence (by 20 ms frame RMS), keeping _PADDING around the speech.
+    Returns an empty array if no frame is loud enough.
+    """
+    levels = _frame_levels(samples)
+    if levels.size == 0:
+        return samples
+    voiced = np.flatnonzero(levels > _silence_threshold(levels))
+    if voiced.size == 0:
+        return samples[:0]
+    start = max(0, int(voiced[0]) * _FRAME - _PADDING)
+    end = min(len(samples), (int(voiced[-1]) + 1) * _FRAME + _PADDING)
+    return samples[start:end]
+
+def split_segments(samples: np.ndarray) -> List[Tuple[int, int, bool]]:
+    """
+    (start, end, overlaps previous) sample bounds of segments at most AUDIO_SEGMENT_SECONDS long.
+    """
+    limit = int(AUDIO_SEGMENT_SECONDS * SAMPLE_RATE) // _FRAME * _FRAME
+    # Each cut has to move forward by more than the overlap
+    if limit <= 3 * _OVERLAP or len(samples) <= limit:
+        return [(0, len(samples), False)]
+
+    levels = _frame_levels(samples)
+    threshold = _silence_threshold(levels)
+    bounds = []
+    start, overlaps = 0, False
+    while len(samples) - start > limit:
+        low = (start + limit * 2 // 3) // _FRAME
+        window = levels[low:(start + limit) // _FRAME]
+        width = min(_CUT_SMOOTHING, len(window))
+        smoothed = np.convolve(window, np.ones(width) / width, mode="valid")
+        cut_frame = low + int(np.argmin(smoothed)) + width // 2
+        cut = cut_frame * _FRAME
+        bounds.append((start, cut, overlaps))
+        overlaps = bool(levels[cut_frame] > threshold)
+        start = cut - _OVERLAP if overlaps else cut
+    bounds.append((start, len(samples), overlaps))
+    return bounds
+
+def _frame_levels(samples: np.ndarray) -> np.ndarray:
+    # RMS level of each 20 ms frame in dBFS
+    frames = len(samples) // _FRAME
+    blocks = samples[:frames * _FRAME].reshape(frames, _FRAME).astype(np.float64)
+    rms = np.sqrt(np.mean(np.square(blocks), axis=1))
+    return 20 * np.log10(np.maximum(rms, 1e-10))
+
+def _silence_threshold(levels: np.ndarray) -> float:
+    return max(AUDIO_SILENCE_DB, float(levels.max()) - _DYNAMIC_RANGE_DB)
+
+def _wav_bytes(pcm: bytes) -> bytes:
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as writer:
+        writer.setnchannels(1)
+        writer.setsampwidth(2)
+        writer.setframerate(SAMPLE_RATE)
+        writer.writeframes(pcm)
+    return buffer.getvalue()
+
+async def _ffmpeg_decode(audio: BinaryIO, filename: str) -> np.ndarray:
+    args = ["-f", "s16le", "-ac", "1", "-ar", str(SAMPLE_RATE), "pipe:1"]
+    header = audio.read(12)
+    audio.seek(-len(header), os.SEEK_CUR)
+    if not _needs_seeking(header, filename):
+        # webm and ogg stream front to back, so ffmpeg can read them straight from a pipe
+        data = await asyncio.to_thread(audio.read)
+        pcm = await _run_ffmpeg(["-i", "pipe:0", *args], data)
+    else:
+        # mp4 keeps its index (the moov box) at the end, so ffmpeg needs a real file to seek in
+        with tempfile.NamedTemporaryFile(suffix=os.path.splitext(filename)[1] or ".mp4") as tmp:
+            await asyncio.to_thread(shutil.copyfileobj, audio, tmp)
+            tmp.flush()
+            pcm = await _run_ffmpeg(["-i", tmp.name, *args])
+    return np.frombuffer(pcm, "<i2").astype(np.float32) / 32768
+
+def _needs_seeking(header: bytes, filename: str) -> bool:
+    # ISO base media files (mp4, m4a, mov, 3gp) start with an "ftyp" box
+    return header[4:8] == b"ftyp" or os.path.splitext(filename)[1].lower() in (".mp4", ".m4a", ".mov", ".3gp")
+
+async def _ffmpeg_encode(pcm: bytes) -> bytes:
+    return await _run_ffmpeg([
+        "-f", "s16le", "-ac", "1", "-ar", str(SAMPLE_RATE), "-i", "pipe:0",
+        "-c:a", "libopus", "-b:a", AUDIO_OPUS_BITRATE, "-application", "voip", "-f", "ogg", "pipe:1",
+    ], pcm)
+
+async def _run_ffmpeg(args, stdin: Optional[bytes] = None) -> bytes:
+    process = await asyncio.create_subprocess_exec(
+        FFMPEG_PATH, "-hide_banner", "-loglevel", "error", *args,
+        stdin=asyncio.subprocess.PIPE if stdin is not None else asyncio.subprocess.DEVNULL,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    try:
+        stdout, stderr = await process.communicate(stdin)
+    except asyncio.CancelledError:
+        process.kill()
+        raise
+    if process.returncode != 0:
+        raise Exception(f"ffmpeg failed: {stderr.decode('utf-8', 'replace').strip()[-300:]}")
+    return stdout
@@ -0,0 +1,422 @@
+import re
+import datetime as dt
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Deterministic parser for short event utterances such as "dentist tomorrow at 3pm",
+# "next Friday 10-11am standup" or "明天下午三点看牙医". It only answers when the text is one
+# date, one time (or time range) and a short title. Anything it doesn't fully account for
+# (recurrence, durations, vague or ambiguous times, extra details) gives None, and the LLM
+# drafts the event instead.
+#
+# Conventions: a bare weekday is its next occurrence (today included); "next <weekday>" /
+# "下周X" is that day in the following Monday-based week, "this <weekday>" / "这周X" in the
+# current one. An hour without am/pm or a part of the day (e.g. "at 3", "三点") is ambiguous.
+
+MAX_TITLE_WORDS = 6
+MAX_TITLE_CHARS = 12
+
+# An hour with its meridiem: "am", "pm", "evening" (pm, but 12 and the small hours are
+# ambiguous), "noon" (12 or early afternoon), "24" (already a 24-hour clock) or None
+Atom = Tuple[int, int, Optional[str]]
+
+_CJK = re.compile(r"[㐀-鿿]")
+
+# --- English ---------------------------------------------------------------------------------
+
+_WEEKDAYS = {
+    "monday": 0, "mon": 0, "tuesday": 1, "tue": 1, "tues": 1, "wednesday": 2, "wed": 2,
+    "thursday": 3, "thu": 3, "thur": 3, "thurs": 3, "friday": 4, "fri": 4,
+    "saturday": 5, "sat": 5, "sunday": 6, "sun": 6,
+}
+_MONTHS = {
+    "january": 1, "jan": 1, "february": 2, "feb": 2, "march": 3, "mar": 3, "april": 4, "apr": 4,
+    "may": 5, "june": 6, "jun": 6, "july": 7, "jul": 7, "august": 8, "aug": 8,
+    "september": 9, "sep": 9, "sept": 9, "october": 10, "oct": 10, "november": 11, "nov": 11,
+    "december": 12, "dec": 12,
+}
+# Also everyday words and names ("Sun Li", "lunch with May"): only dates next to a day or time
+_EN_AMBIGUOUS = {"sun", "sat", "wed", "mar", "may"}
+_WEEKDAY_RE = "|".join(sorted(_WEEKDAYS, key=len, reverse=True))
+_MONTH_RE = "|".join(sorted(_MONTHS, key=len, reverse=True))
+
+_EN_DATE = re.compile(
+    rf"\b(?:on\s+)?(?:"
+    rf"(?P<after>(?:the\s+)?day\s+after\s+tomorrow)"
+    rf"|(?P<relative>today|tonight|tomorrow)"
+    rf"|(?:(?P<qualifier>this|next)\s+)?(?P<weekday>{_WEEKDAY_RE})"
+    rf"|(?P<month>{_MONTH_RE})\.?\s+(?P<day>\d{{1,2}})(?:st|nd|rd|th)?(?:,?\s+(?P<year>\d{{4}}))?"
+    rf"|(?P<day2>\d{{1,2}})(?:st|nd|rd|th)?\s+(?:of\s+)?(?P<month2>{_MONTH_RE})(?:,?\s+(?P<year2>\d{{4}}))?"
+    rf"|(?P<iso>\d{{4}}-\d{{2}}-\d{{2}})"
+    rf")\b",
+    re.IGNORECASE,
+)
+_EN_ATOM = r"(noon|midnight|\d{1,2}(?::[0-5]\d)?(?:\s*[ap]m|\s*o'clock)?)"
+_EN_RANGE = re.compile(
+    rf"(?:\bfrom\s+)?\b{_EN_ATOM}\s*(?:-|–|—|\bto\b|\btill\b|\buntil\b)\s*{_EN_ATOM}(?![\w:])"
+    rf"|\bbetween\s+{_EN_ATOM}\s+and\s+{_EN_ATOM}(?![\w:])",
+    re.IGNORECASE,
+)
+_EN_TIME = re.compile(rf"(?:\bat\s+)?\b{_EN_ATOM}(?![\w:])", re.IGNORECASE)
+_EN_TIME_AFTER = re.compile(r"^[\s,]*(?:at\s+)?(?:noon\b|midnight\b|\d)", re.IGNORECASE)
+_EN_TIME_BEFORE = re.compile(r"(?:\d|\d\s*[ap]m|\bnoon|\bmidnight|o'clock)[\s,]*$", re.IGNORECASE)
+_EN_PERIOD = re.compile(r"\b(?:this\s+|in\s+the\s+|at\s+)?(morning|afternoon|evening|night)\b", re.IGNORECASE)
+_EN_PERIODS = {"morning": "am", "afternoon": "pm", "evening": "evening", "night": "evening"}
+_EN_MERIDIEM = re.compile(r"(\d)\s*([ap])\.\s?m\.?", re.IGNORECASE)
+
+_EN_FILLERS = {"at", "on", "from", "in", "the", "for", "and", "-", ",", "@"}
+_EN_LEAD = re.compile(
+    r"^(?:(?:please\s+)?remind\s+me\s+(?:to|about)|remember\s+to|i\s+have\s+(?:an?\s+)?|i\s+need\s+to"
+    r"|i'm\s+going\s+to|i\s+am\s+going\s+to|going\s+to|need\s+to|add\s+(?:an?\s+)?)\s+",
+    re.IGNORECASE,
+)
+# Left over in a title, these mean there's timing information the parser didn't take in
+# (the ambiguous words only in lower case, so names still make it through)
+_EN_TEMPORAL = {
+    "am", "pm", "morning", "afternoon", "evening", "night", "tonight", "today", "tomorrow",
+    "yesterday", "day", "days", "week", "weeks", "weekend", "month", "months", "year", "years",
+    "hour", "hours", "hr", "hrs", "minute", "minutes", "min", "mins", "every", "daily", "weekly",
+    "monthly", "until", "till", "before", "after", "by", "next", "last", "this", "noon", "midnight",
+    "o'clock", "or", "maybe", "around", "about", "ish", "sometime", "later", "early", "late",
+    "between", "from", "to", "through",
+} | set(_WEEKDAYS) | set(_MONTHS)
+
+# --- Chinese ---------------------------------------------------------------------------------
+
+_CN_DIGITS = {"零": 0, "〇": 0, "一": 1, "二": 2, "两": 2, "三": 3, "四": 4, "五": 5, "六": 6, "七": 7, "八": 8, "九": 9}
+_CN_NUM = r"[0-9零〇一二两三四五六七八九十]{1,3}"
+_CN_WEEKDAYS = {"一": 0, "二": 1, "三": 2, "四": 3, "五": 4, "六": 5, "日": 6, "天": 6,
+                "1": 0, "2": 1, "3": 2, "4": 3, "5": 4, "6": 5, "7": 6}
+_CN_PERIODS = {
+    "凌晨": "am", "清晨": "am", "早上": "am", "早晨": "am", "上午": "am", "中午": "noon",
+    "下午": "pm", "傍晚": "evening", "晚上": "evening", "夜里": "evening", "夜晚": "evening",
+}
+_CN_PERIOD_RE = "|".join(_CN_PERIODS)
+
+_CN_DATE = re.compile(
+    rf"(?P<relative>大后天|后天|明天|明日|今天|今日|明早|明晚|今早|今晚)"
+    rf"|(?P<qualifier>这|本|下个?)?(?:周|星期|礼拜)(?P<weekday>[一二三四五六日天1-7])"
+    rf"|(?P<month>{_CN_NUM})月(?P<day>{_CN_NUM})[日号]"
+)
+_CN_RELATIVE = {
+    "今天": (0, None), "今日": (0, None), "今早": (0, "am"), "今晚": (0, "evening"),
+    "明天": (1, None), "明日": (1, None), "明早": (1, "am"), "明晚": (1, "evening"),
+    "后天": (2, None), "大后天": (3, None),
+}
+_CN_ATOM = rf"((?:{_CN_PERIOD_RE})?(?:{_CN_NUM}[点點时]钟?(?:半|一刻|三刻|整|{_CN_NUM}分?)?|\d{{1,2}}:[0-5]\d))"
+_CN_RANGE = re.compile(rf"{_CN_ATOM}\s*(?:到|至|-|~|～|—)\s*{_CN_ATOM}")
+_CN_TIME = re.compile(_CN_ATOM)
+_CN_ATOM_PARTS = re.compile(
+    rf"^(?P<period>{_CN_PERIOD_RE})?(?:(?P<hour>{_CN_NUM})[点點时]钟?(?P<rest>.*)|(?P<clock>\d{{1,2}}:[0-5]\d))$"
+)
+
+_CN_FILLERS = " ，,。、的在有"
+_CN_LEAD = re.compile(r"^(?:提醒我|记得|我要|我得|我有个|我有一个|有个|有一个|要)")
+_CN_TEMPORAL = re.compile(r"[0-9点點分号月周年每天早晚午或吗]|星期|礼拜|之前|以前|之后|以后|左右|还是")
+
+
+def parse_event(text: str, today: dt.date) -> Optional[Dict[str, Any]]:
+    """
+    Returns a {title, start_time, end_time, description} draft for a simple event utterance,
+    with times as ISO 8601 local time (YYYY-MM-DDTHH:MM:SS) like the LLM prompt asks for, or
+    None if the text isn't simple enough to be sure.
+    """
+    text = text.strip().rstrip(".。!！")
+    if not text or "?" in text or "？" in text:
+        return None
+    if _CJK.search(text):
+        return _parse_chinese(text, today)
+    return _parse_english(_EN_MERIDIEM.sub(r"\1\2m", text), today)
+
+
+def _parse_english(text: str, today: dt.date) -> Optional[Dict[str, Any]]:
+    pieces = [text]
+    dates = _take(pieces, _EN_DATE, _is_english_date)
+    if len(dates) > 1:
+        return None
+    period = None
+    date = today
+    if dates:
+        resolved = _english_date(dates[0], today)
+        if resolved is None:
+            return None
+        date, period = resolved
+
+    ranges = _take(pieces, _EN_RANGE)
+    singles = _take(pieces, _EN_TIME) if not ranges else []
+    if len(ranges) + len(singles) != 1:
+        return None
+    periods = _take(pieces, _EN_PERIOD)
+    if len(periods) > 1 or (periods and period):
+        return None
+    if periods:
+        period = _EN_PERIODS[periods[0].group(1).lower()]
+
+    if ranges:
+        match = ranges[0]
+        first, second = (match.group(1), match.group(2)) if match.group(1) else (match.group(3), match.group(4))
+        times = _resolve_range(_english_atom(first), _english_atom(second), period)
+    else:
+        atom = _english_atom(singles[0].group(1))
+        # "tomorrow 5" isn't a time; "at 5 in the afternoon" is
+        if atom is not None and atom[2] is None and not period and not singles[0].group(0).lower().startswith("at"):
+            return None
+        start = _resolve(atom, period)
+        times = (start, None) if start else None
+    if times is None:
+        return None
+
+    title = _english_title(pieces)
+    if title is None:
+        return None
+    return _draft(title, date, *times)
+
+
+def _is_english_date(match: re.Match) -> bool:
+    """
+    Whether a bare "Sun", "Sat" or "Wed" is a date: it needs a qualifier, "on" or a time
+    right beside it, and a name after "with" never is one. Month names come with a day anyway.
+    """
+    weekday = (match.group("weekday") or "").lower()
+    if weekday not in _EN_AMBIGUOUS or match.group("qualifier") or match.group(0).lower().startswith("on"):
+        return True
+    before, after = match.string[:match.start()], match.string[match.end():]
+    if re.search(r"\bwith\s+$", before, re.IGNORECASE):
+        return False
+    return bool(_EN_TIME_AFTER.match(after) or _EN_TIME_BEFORE.search(before))
+
+
+def _english_date(match: re.Match, today: dt.date) -> Optional[Tuple[dt.date, Optional[str]]]:
+    if match.group("after"):
+        return today + dt.timedelta(days=2), None
+    relative = (match.group("relative") or "").lower()
+    if relative:
+        offset = {"today": 0, "tonight": 0, "tomorrow": 1}[relative]
+        return today + dt.timedelta(days=offset), "evening" if relative == "tonight" else None
+    if match.group("weekday"):
+        date = _weekday_date(today, _WEEKDAYS[match.group("weekday").lower()], (match.group("qualifier") or "").lower())
+        return (date, None) if date else None
+    if match.group("iso"):
+        try:
+            return dt.date.fromisoformat(match.group("iso")), None
+        except ValueError:
+            return None
+    month = match.group("month") or match.group("month2")
+    day = match.group("day") or match.group("day2")
+    year = match.group("year") or match.group("year2")
+    date = _date(int(year) if year else today.year, _MONTHS[month.lower()], int(day))
+    return (date, None) if date else None
+
+
+def _english_atom(text: str) -> Optional[Atom]:
+    text = text.lower().replace("o'clock", "").strip()
+    if text == "noon":
+        return 12, 0, "24"
+    if text == "midnight":
+        return 0, 0, "24"
+    meridiem = None
+    if text.endswith(("am", "pm")):
+        meridiem, text = text[-2:], text[:-2].strip()
+    hour_text, _, minute_text = text.partition(":")
+    hour, minute = int(hour_text), int(minute_text or 0)
+    if meridiem is None and (hour == 0 or hour >= 13 or (minute_text and hour_text.startswith("0"))):
+        meridiem = "24"
+    return hour, minute, meridiem
+
+
+def _english_title(pieces: List[str]) -> Optional[str]:
+    words = []
+    for piece in pieces:
+        piece_words = piece.replace(",", " , ").split()
+        while piece_words and piece_words[0].lower() in _EN_FILLERS:
+            piece_words.pop(0)
+        while piece_words and piece_words[-1].lower() in _EN_FILLERS:
+            piece_words.pop()
+        words += piece_words
+    title = _EN_LEAD.sub("", " ".join(words).replace(" , ", ", ")).strip(" ,:-")
+    title_words = title.split()
+    if not title_words or len(title_words) > MAX_TITLE_WORDS:
+        return None
+    if any(char.isdigit() for char in title):
+        return None
+    for word in title_words:
+        word = word.strip(",.")
+        if word.lower() in _EN_TEMPORAL and (word.lower() not in _EN_AMBIGUOUS or word.islower()):
+            return None
+    return title[0].upper() + title[1:]
+
+
+def _parse_chinese(text: str, today: dt.date) -> Optional[Dict[str, Any]]:
+    pieces = [text]
+    dates = _take(pieces, _CN_DATE)
+    if len(dates) > 1:
+        return None
+    date, period = today, None
+    if dates:
+        match = dates[0]
+        if match.group("relative"):
+            offset, period = _CN_RELATIVE[match.group("relative")]
+            date = today + dt.timedelta(days=offset)
+        elif match.group("weekday"):
+            qualifier = {"这": "this", "本": "this", "下": "next", "下个": "next"}.get(match.group("qualifier") or "", "")
+            date = _weekday_date(today, _CN_WEEKDAYS[match.group("weekday")], qualifier)
+        else:
+            month, day = _cn_int(match.group("month")), _cn_int(match.group("day"))
+            date = _date(today.year, month, day) if month and day else None
+        if date is None:
+            return None
+
+    ranges = _take(pieces, _CN_RANGE)
+    singles = _take(pieces, _CN_TIME) if not ranges else []
+    if len(ranges) + len(singles) != 1:
+        return None
+    if ranges:
+        first, first_period = _chinese_atom(ranges[0].group(1))
+        second, second_period = _chinese_atom(ranges[0].group(2))
+        if first is None or second is None:
+            return None
+        first = (first[0], first[1], first[2] or first_period)
+        second = (second[0], second[1], second[2] or second_period)
+        times = _resolve_range(first, second, period)
+    else:
+        atom, atom_period = _chinese_atom(singles[0].group(1))
+        if atom is None or (atom_period and period and atom_period != period):
+            return None
+        start = _resolve(atom, atom_period or period)
+        times = (start, None) if start else None
+    if times is None:
+        return None
+
+    title = _CN_LEAD.sub("", "".join(piece.strip(_CN_FILLERS) for piece in pieces)).strip(_CN_FILLERS)
+    if not title or len(title) > MAX_TITLE_CHARS or _CN_TEMPORAL.search(title):
+        return None
+    return _draft(title, date, *times)
+
+
+def _chinese_atom(text: str) -> Tuple[Optional[Atom], Optional[str]]:
+    """
+    (hour, minute, "24" or None) and the part of the day written with it.
+    """
+    parts = _CN_ATOM_PARTS.match(text)
+    if parts is None:
+        return None, None
+    period = _CN_PERIODS.get(parts.group("period") or "")
+    if parts.group("clock"):
+        hour_text, minute_text = parts.group("clock").split(":")
+        hour, minute = int(hour_text), int(minute_text)
+    else:
+        hour = _cn_int(parts.group("hour"))
+        rest = parts.group("rest").rstrip("分")
+        minute = {"": 0, "整": 0, "半": 30, "一刻": 15, "三刻": 45}.get(rest)
+        if minute is None:
+            minute = _cn_int(rest)
+        if hour is None or minute is None or minute > 59:
+            return None, None
+    clock = "24" if hour == 0 or hour >= 13 else None
+    return (hour, minute, clock), period
+
+
+def _cn_int(text: str) -> Optional[int]:
+    if text.isdigit():
+        return int(text)
+    if "十" in text:
+        tens, _, ones = text.partition("十")
+        tens_value = _CN_DIGITS.get(tens) if tens else 1
+        ones_value = _CN_DIGITS.get(ones) if ones else 0
+        if tens_value is None or ones_value is None:
+            return None
+        return tens_value * 10 + ones_value
+    return _CN_DIGITS.get(text) if len(text) == 1 else None
+
+
+def _take(pieces: List[str], pattern: re.Pattern,
+          accept: Optional[Callable[[re.Match], bool]] = None) -> List[re.Match]:
+    """
+    Finds pattern in the pieces of text not yet accounted for, splitting them around each match
+    (that accept() allows, if given).
+    """
+    matches = []
+    remaining = []
+    for piece in pieces:
+        last = 0
+        for match in pattern.finditer(piece):
+            if accept is not None and not accept(match):
+                continue
+            matches.append(match)
+            remaining.append(piece[last:match.start()])
+            last = match.end()
+        remaining.append(piece[last:])
+    pieces[:] = [piece for piece in remaining if piece.strip()]
+    return matches
+
+
+def _weekday_date(today: dt.date, weekday: int, qualifier: str) -> Optional[dt.date]:
+    monday = today - dt.timedelta(days=today.weekday())
+    if qualifier == "next":
+        return monday + dt.timedelta(days=7 + weekday)
+    if qualifier == "this":
+        date = monday + dt.timedelta(days=weekday)
+        return date if date >= today else None
+    return today + dt.timedelta(days=(weekday - today.weekday()) % 7)
+
+
+def _date(year: int, month: int, day: int) -> Optional[dt.date]:
+    try:
+        return dt.date(year, month, day)
+    except ValueError:
+        return None
+
+
+def _resolve(atom: Optional[Atom], period: Optional[str]) -> Optional[Tuple[int, int]]:
+    """
+    24-hour (hour, minute) for an atom, using the period of the day if it has no meridiem.
+    """
+    if atom is None:
+        return None
+    hour, minute, meridiem = atom
+    if meridiem == "24":
+        return (hour, minute) if hour < 24 and minute < 60 else None
+    meridiem = meridiem or period
+    if meridiem is None or not 1 <= hour <= 12:
+        return None
+    if meridiem == "am":
+        return hour % 12, minute
+    if meridiem == "pm":
+        return hour % 12 + 12, minute
+    if meridiem == "noon":
+        return (hour if hour >= 11 else hour + 12, minute) if hour >= 11 or hour <= 3 else None
+    # Evening: 12 and the small hours could be either side of midnight
+    return (hour + 12, minute) if 5 <= hour <= 11 else None
+
+
+def _resolve_range(first: Optional[Atom], second: Optional[Atom],
+                   period: Optional[str]) -> Optional[Tuple[Tuple[int, int], Tuple[int, int]]]:
+    """
+    Resolves "10-11am" style ranges: a side without a meridiem takes the other side's, and
+    flips across noon when that's the only way the range goes forwards ("11-1pm").
+    """
+    if first is None or second is None:
+        return None
+    if first[2] is None and second[2] not in (None, "24"):
+        start, end = _resolve((first[0], first[1], second[2]), period), _resolve(second, period)
+        if start and end and start >= end and second[2] == "pm":
+            start = _resolve((first[0], first[1], "am"), period)
+    elif second[2] is None and first[2] not in (None, "24"):
+        start, end = _resolve(first, period), _resolve((second[0], second[1], first[2]), period)
+        if start and end and end <= start and first[2] == "am":
+            end = _resolve((second[0], second[1], "pm"), period)
+    else:
+        start, end = _resolve(first, period), _resolve(second, period)
+    if start is None or end is None or end <= start:
+        return None
+    return start, end
+
+
+def _draft(title: str, date: dt.date, start: Tuple[int, int], end: Optional[Tuple[int, int]]) -> Dict[str, Any]:
+    def stamp(time: Tuple[int, int]) -> str:
+        return dt.datetime.combine(date, dt.time(*time)).isoformat()
+    return {
+        "title": title,
+        "start_time": stamp(start),
+        "end_time": stamp(end) if end else None,
+        "description": "",
+    }
@@ -0,0 +1,127 @@
+import io
+import os
+import gzip
+import json
+from typing import Any, Dict, IO, Iterator
+
+# Exports are JSON Lines: one compact JSON object per line, written as soon as it is ready.
+# Compression follows the file suffix: ".gz" for gzip, ".zst" for zstd (needs `zstandard`).
+# Both formats allow appending a new stream to an existing file, which is how resumed
+# exports continue writing to the same output.
+
+
+def _compression(path: str) -> str:
+    if path.endswith(".gz"):
+        return "gzip"
+    if path.endswith(".zst"):
+        return "zstd"
+    return ""
+
+
+def _zstd():
+    try:
+        import zstandard
+    except ImportError:
+        raise Exception("zstd output needs the `zstandard` package: pip install zstandard")
+    return zstandard
+
+
+def open_export(path: str, mode: str = "r") -> IO[str]:
+    """
+    Opens an export file as text, compressed according to its suffix.
+    mode is "r", "w" or "a".
+    """
+    compression = _compression(path)
+    if compression == "gzip":
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    if compression == "zstd":
+        zstandard = _zstd()
+        if mode == "r":
+            raw = zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), read_across_frames=True)
+        else:
+            raw = zstandard.ZstdCompressor().stream_writer(open(path, mode + "b"))
+        return io.TextIOWrapper(raw, encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+class ExportWriter:
+    """
+    Writes one record per line and flushes it, so a crash loses at most the record being written.
+    """
+    def __init__(self, path: str, append: bool = False):
+        self.path = path
+        self.count = 0
+        self._file = open_export(path, "a" if append else "w")
+
+    def write(self, record: Dict[str, Any]) -> None:
+        self._file.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n")
+        self._file.flush()
+        self.count += 1
+
+    def close(self) -> None:
+        self._file.close()
+
+    def __enter__(self) -> "ExportWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def iter_export(path: str) -> Iterator[Dict[str, Any]]:
+    """
+    Lazily yields the records of an export, one at a time.
+    A record cut off by an interrupted write ends the iteration instead of raising.
+    """
+    with open_export(path, "r") as f:
+        try:
+            for line in f:
+                if not line.endswith("\n"):
+                    return
+                yield json.loads(line)
+        except EOFError:
+            # Truncated gzip stream
+            return
+        except Exception as e:
+            if _compression(path) == "zstd" and type(e).__name__ == "ZstdError":
+                return
+            raise
+
+
+# Read size when looking backwards for the end of the last complete record
+_TAIL_CHUNK = 64 * 1024
+
+
+def recover(path: str) -> None:
+    """
+    Drops a partially written last record so new records can be appended safely.
+    An uncompressed export is only read from the end, back to its last newline.
+    """
+    if not os.path.exists(path):
+        return
+    if not _compression(path):
+        with open(path, "rb+") as f:
+            end = f.seek(0, os.SEEK_END)
+            position = end
+            while position > 0:
+                start = max(0, position - _TAIL_CHUNK)
+                f.seek(start)
+                chunk = f.read(position - start)
+                newline = chunk.rfind(b"\n")
+                if newline != -1:
+                    cut = start + newline + 1
+                    break
+                position = start
+            else:
+                # Not even one complete record
+                cut = 0
+            if cut != end:
+                f.truncate(cut)
+        return
+
+    # A compressed stream can't be truncated in place, so copy what is readable
+    tmp_path = path + ".tmp" + os.path.splitext(path)[1]
+    with ExportWriter(tmp_path) as writer:
+        for record in iter_export(path):
+            writer.write(record)
+    os.replace(tmp_path, path)
@@ -0,0 +1,37 @@
+import os
+import httpx
+from typing import Dict
+
+# Shared settings for the long-lived upstream clients. Each upstream (AI-builders, Notion)
+# gets its own AsyncClient so their connection pools and timeouts don't interfere.
+MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "20"))
+MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "10"))
+KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "60"))
+CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "10"))
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def create_client(base_url: str, headers: Dict[str, str], timeout: float) -> httpx.AsyncClient:
+    """
+    Creates a pooled AsyncClient for one upstream.
+    HTTP/2 is negotiated when the `h2` package is installed, otherwise HTTP/1.1 keep-alive is used.
+    """
+    limits = httpx.Limits(
+        max_connections=MAX_CONNECTIONS,
+        max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=KEEPALIVE_EXPIRY,
+    )
+    return httpx.AsyncClient(
+        base_url=base_url,
+        headers=headers,
+        limits=limits,
+        timeout=httpx.Timeout(timeout, connect=CONNECT_TIMEOUT),
+        http2=_http2_available(),
+    )
@@ -0,0 +1,47 @@
+import os
+import json
+import hashlib
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from services.cache import Cache
+
+# Responses by Idempotency-Key, so a double tap or a client retry gets the first response
+# back instead of paying for the upstream calls (and creating the Notion page) again.
+# A repeat that arrives while the first request is still running waits for it.
+IDEMPOTENCY_CACHE_SIZE = int(os.getenv("IDEMPOTENCY_CACHE_SIZE", "1024"))
+IDEMPOTENCY_TTL = float(os.getenv("IDEMPOTENCY_TTL", str(24 * 3600)))
+MAX_KEY_LENGTH = 255
+
+class KeyReused(Exception):
+    """
+    The key was already used for a request with a different body.
+    """
+
+store = Cache(IDEMPOTENCY_CACHE_SIZE, ttl=IDEMPOTENCY_TTL)
+
+def fingerprint(*parts: Any) -> str:
+    """
+    Digest of what a request asked for, to tell a genuine repeat from a reused key.
+    """
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8")).hexdigest()
+
+def valid_key(key: Optional[str]) -> bool:
+    return key is None or (0 < len(key) <= MAX_KEY_LENGTH and key.isprintable())
+
+async def run(scope: str, key: Optional[str], request_fingerprint: str,
+              compute: Callable[[], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+    """
+    Runs compute() once per (scope, key) and returns its response to every repeat within
+    IDEMPOTENCY_TTL. Without a key this is just compute(). Failures aren't stored, so a
+    retry after an error runs again. Raises KeyReused if the fingerprints differ.
+    """
+    if key is None:
+        return await compute()
+
+    async def stored() -> Dict[str, Any]:
+        return {"fingerprint": request_fingerprint, "response": await compute()}
+
+    entry = await store.get_or_compute(f"{scope}:{key}", stored)
+    if entry["fingerprint"] != request_fingerprint:
+        raise KeyReused(f"Idempotency-Key {key!r} was already used for a different request")
+    return entry["response"]
@@ -0,0 +1,158 @@
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+_ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+def _join(chars: List[str]) -> str:
+    # \uXXXX escapes decode to UTF-16 surrogates one at a time; recombine the pairs
+    text = "".join(chars)
+    if any("\ud800" <= c <= "\udfff" for c in text):
+        text = text.encode("utf-16", "surrogatepass").decode("utf-16", "replace")
+    return text
+
+class PartialJSONParser:
+    """
+    Incremental, tolerant parser for a top-level JSON object arriving as a token stream.
+
+    Each character is consumed once. Anything before the first "{" (e.g. a ```json fence)
+    is skipped. String values are reported while they are still being written, nested
+    values (lists, objects) and scalars once they are complete.
+
+        parser = PartialJSONParser()
+        for delta in stream:
+            for key, value, complete in parser.feed(delta):
+                ...
+    """
+    def __init__(self):
+        self.result: Dict[str, Any] = {}
+        self.done = False
+        self._state = "before_object"
+        self._key: List[str] = []
+        self._value: List[str] = []
+        self._escape: Optional[str] = None  # pending escape sequence, without the backslash
+        self._depth = 0
+        self._nested_in_string = False
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any, bool]]:
+        """
+        Consumes the next piece of text and returns (key, value, complete) updates,
+        at most one per key per call, in the order they changed.
+        """
+        updates: Dict[str, Tuple[Any, bool]] = {}
+        for ch in chunk:
+            if self.done:
+                break
+            finished = self._step(ch)
+            if finished is not None:
+                updates[finished[0]] = (finished[1], True)
+        if self._state == "string_value" and self._value:
+            # The high half of a surrogate pair waits for its other half
+            partial = self._value[:-1] if "\ud800" <= self._value[-1] <= "\udbff" else self._value
+            if partial:
+                updates.setdefault("".join(self._key), (_join(partial), False))
+        return [(key, value, complete) for key, (value, complete) in updates.items()]
+
+    def _step(self, ch: str) -> Optional[Tuple[str, Any]]:
+        state = self._state
+        if state == "before_object":
+            if ch == "{":
+                self._state = "expect_key"
+        elif state == "expect_key":
+            if ch == '"':
+                self._key = []
+                self._state = "key"
+            elif ch == "}":
+                self.done = True
+        elif state == "key":
+            if self._escape is not None:
+                self._key.append(self._decode_escape(ch) or "")
+            elif ch == "\\":
+                self._escape = ""
+            elif ch == '"':
+                self._state = "expect_colon"
+            else:
+                self._key.append(ch)
+        elif state == "expect_colon":
+            if ch == ":":
+                self._state = "expect_value"
+        elif state == "expect_value":
+            if ch.isspace():
+                return None
+            self._value = []
+            if ch == '"':
+                self._state = "string_value"
+            elif ch in "[{":
+                self._value.append(ch)
+                self._depth = 1
+                self._nested_in_string = False
+                self._state = "nested_value"
+            else:
+                self._value.append(ch)
+                self._state = "scalar_value"
+        elif state == "string_value":
+            if self._escape is not None:
+                decoded = self._decode_escape(ch)
+                if decoded is not None:
+                    self._value.append(decoded)
+            elif ch == "\\":
+                self._escape = ""
+            elif ch == '"':
+                return self._finish(_join(self._value))
+            else:
+                self._value.append(ch)
+        elif state == "nested_value":
+            self._value.append(ch)
+            if self._nested_in_string:
+                if self._escape is not None:
+                    self._escape = None
+                elif ch == "\\":
+                    self._escape = ""
+                elif ch == '"':
+                    self._nested_in_string = False
+            elif ch == '"':
+                self._nested_in_string = True
+            elif ch in "[{":
+                self._depth += 1
+            elif ch in "]}":
+                self._depth -= 1
+                if self._depth == 0:
+                    return self._finish(self._loads("".join(self._value)))
+        elif state == "scalar_value":
+            if ch in ",}":
+                finished = self._finish(self._loads("".join(self._value).strip()))
+                if ch == "}":
+                    self.done = True
+                return finished
+            self._value.append(ch)
+        return None
+
+    def _decode_escape(self, ch: str) -> Optional[str]:
+        # Returns the decoded character once the escape sequence is complete, else None
+        self._escape += ch
+        if self._escape[0] != "u":
+            decoded = _ESCAPES.get(self._escape, self._escape)
+            self._escape = None
+            return decoded
+        if len(self._escape) < 5:
+            return None
+        try:
+            decoded = chr(int(self._escape[1:], 16))
+        except ValueError:
+            decoded = ""
+        self._escape = None
+        return decoded
+
+    def _finish(self, value: Any) -> Tuple[str, Any]:
+        key = "".join(self._key)
+        self.result[key] = value
+        self._value = []
+        self._state = "expect_key"
+        return key, value
+
+    @staticmethod
+    def _loads(raw: str) -> Any:
+        # Tolerate the odd non-JSON literal from the model by keeping it as text
+        try:
+            return json.loads(raw)
+        except json.JSONDecodeError:
+            return raw
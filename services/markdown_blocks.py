@@ -0,0 +1,307 @@
+import re
+import json
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Union
+
+# Compiles the markdown the LLM writes into Notion blocks in a single pass over the lines,
+# yielding each top-level block as soon as it is complete, and keeps every block within
+# the API's limits.
+
+# Notion API limits
+MAX_TEXT_LENGTH = 2000          # characters per rich_text item
+MAX_RICH_TEXT_ITEMS = 100       # rich_text items per block
+MAX_CHILDREN = 100              # blocks per children array
+MAX_BLOCKS_PER_REQUEST = 1000   # blocks per request, nested ones included
+MAX_PAYLOAD_BYTES = 400_000     # requests are capped at 500 KB; leave room for the rest
+MAX_NESTING = 2                 # levels of children allowed in a single request
+
+_HEADING = re.compile(r"^(#{1,6})\s+(.*?)\s*#*\s*$")
+_DIVIDER = re.compile(r"^\s{0,3}([-*_])(\s*\1){2,}\s*$")
+_FENCE = re.compile(r"^\s*(`{3,}|~{3,})\s*([\w+#-]*)")
+_LIST_ITEM = re.compile(r"^(\s*)([-*+]|\d{1,9}[.)])\s+(.*)$")
+_TODO = re.compile(r"^\[([ xX])\]\s+(.*)$")
+_QUOTE = re.compile(r"^\s{0,3}>\s?(.*)$")
+_INLINE = re.compile(r"(`+)(.+?)\1|\[([^\]]+)\]\(([^)\s]+)\)|(\*\*|__|~~|\*|_)")
+_URL = re.compile(r"^(https?://|mailto:)", re.IGNORECASE)
+
+_DELIMITERS = {"**": "bold", "__": "bold", "*": "italic", "_": "italic", "~~": "strikethrough"}
+
+_LANGUAGES = {
+    "bash", "c", "c#", "c++", "css", "diff", "docker", "go", "graphql", "html", "java",
+    "javascript", "json", "kotlin", "latex", "makefile", "markdown", "php", "plain text",
+    "powershell", "python", "ruby", "rust", "scala", "shell", "sql", "swift", "typescript",
+    "xml", "yaml",
+}
+_LANGUAGE_ALIASES = {
+    "": "plain text", "text": "plain text", "txt": "plain text", "py": "python",
+    "js": "javascript", "ts": "typescript", "sh": "shell", "zsh": "shell", "yml": "yaml",
+    "md": "markdown", "cpp": "c++", "cs": "c#", "golang": "go", "rb": "ruby", "dockerfile": "docker",
+}
+
+
+def _split(text: str, limit: int = MAX_TEXT_LENGTH) -> List[str]:
+    return [text[i:i + limit] for i in range(0, len(text), limit)] or [""]
+
+
+def _segments(text: str) -> Iterator[tuple]:
+    """
+    Yields (text, annotations, url) runs for one block's inline markdown.
+    A delimiter only opens when its closer appears later, otherwise it is literal text.
+    """
+    open_marks: List[str] = []
+    pos = 0
+
+    def annotations(*extra: str) -> frozenset:
+        return frozenset([_DELIMITERS[mark] for mark in open_marks] + list(extra))
+
+    for match in _INLINE.finditer(text):
+        code, link_text, url, mark = match.group(2), match.group(3), match.group(4), match.group(5)
+        if match.start() > pos:
+            yield text[pos:match.start()], annotations(), None
+
+        if code is not None:
+            yield code, annotations("code"), None
+        elif link_text is not None:
+            yield link_text, annotations(), url if _URL.match(url) else None
+        elif mark in open_marks and not text[match.start() - 1].isspace():
+            open_marks.remove(mark)
+        elif (mark not in open_marks and match.end() < len(text) and not text[match.end()].isspace()
+              and not (mark[0] == "_" and _intraword(text, match.start(), match.end()))
+              and text.find(mark, match.end() + 1) > 0):
+            open_marks.append(mark)
+        else:
+            yield mark, annotations(), None
+        pos = match.end()
+
+    if pos < len(text):
+        yield text[pos:], annotations(), None
+
+
+def _intraword(text: str, start: int, end: int) -> bool:
+    # snake_case and 2_000 are not emphasis
+    return start > 0 and end < len(text) and text[start - 1].isalnum() and text[end].isalnum()
+
+
+def rich_text(text: str) -> List[Dict[str, Any]]:
+    """
+    Notion rich_text for inline markdown (bold, italic, strikethrough, code, links),
+    with over-long runs split into several items.
+    """
+    runs: List[list] = []
+    for content, marks, url in _segments(text):
+        if not content:
+            continue
+        if runs and runs[-1][1] == marks and runs[-1][2] == url:
+            runs[-1][0] += content
+        else:
+            runs.append([content, marks, url])
+
+    items = []
+    for content, marks, url in runs:
+        annotations = {name: True for name in sorted(marks)}
+        for chunk in _split(content):
+            item: Dict[str, Any] = {"type": "text", "text": {"content": chunk}}
+            if url:
+                item["text"]["link"] = {"url": url}
+            if annotations:
+                item["annotations"] = annotations
+            items.append(item)
+    return items
+
+
+def _plain_text(text: str) -> List[Dict[str, Any]]:
+    return [{"type": "text", "text": {"content": chunk}} for chunk in _split(text)] if text else []
+
+
+def _language(name: str) -> str:
+    name = name.lower()
+    name = _LANGUAGE_ALIASES.get(name, name)
+    return name if name in _LANGUAGES else "plain text"
+
+
+class _Node:
+    __slots__ = ("type", "lines", "checked", "language", "children")
+
+    def __init__(self, block_type: str, text: str = "", checked: bool = False, language: str = ""):
+        self.type = block_type
+        self.lines = [text]
+        self.checked = checked
+        self.language = language
+        self.children: List["_Node"] = []
+
+    def to_blocks(self) -> List[Dict[str, Any]]:
+        if self.type == "divider":
+            return [{"object": "block", "type": "divider", "divider": {}}]
+        text = "\n".join(self.lines)
+        items = _plain_text(text) if self.type == "code" else rich_text(text)
+        # A block holds at most 100 rich_text items; the rest continues in plain paragraphs
+        blocks = []
+        for i in range(0, max(len(items), 1), MAX_RICH_TEXT_ITEMS):
+            block_type = self.type if i == 0 else "paragraph"
+            value: Dict[str, Any] = {"rich_text": items[i:i + MAX_RICH_TEXT_ITEMS]}
+            if block_type == "to_do":
+                value["checked"] = self.checked
+            elif block_type == "code":
+                value["language"] = self.language
+            blocks.append({"object": "block", "type": block_type, block_type: value})
+        if self.children:
+            children = [block for child in self.children for block in child.to_blocks()]
+            blocks[0][self.type]["children"] = children
+        return blocks
+
+
+def iter_blocks(markdown: Union[str, Iterable[str]]) -> Iterator[Dict[str, Any]]:
+    """
+    Compiles markdown (a string or an iterable of lines) into top-level Notion blocks.
+
+    Supports headings, paragraphs, bulleted/numbered/to-do lists with nesting, quotes,
+    fenced code and dividers, plus inline annotations. Lists nested deeper than Notion
+    accepts in one request are flattened to the deepest allowed level.
+    """
+    lines = markdown.splitlines() if isinstance(markdown, str) else markdown
+
+    paragraph: Optional[_Node] = None
+    # The top-level list item being built, and the open items on its path as (indent, node)
+    tree: Optional[_Node] = None
+    stack: List[tuple] = []
+    last_item: Optional[_Node] = None
+    code: Optional[_Node] = None
+    fence = ""
+
+    def flush() -> Iterator[Dict[str, Any]]:
+        nonlocal paragraph, tree
+        if paragraph is not None:
+            yield from paragraph.to_blocks()
+            paragraph = None
+        if tree is not None:
+            yield from tree.to_blocks()
+            tree = None
+            stack.clear()
+
+    for raw in lines:
+        line = raw.rstrip("\r\n").expandtabs(4)
+
+        if code is not None:
+            if line.strip().startswith(fence) and not line.strip().strip(fence[0]):
+                yield from code.to_blocks()
+                code = None
+            else:
+                code.lines.append(line)
+            continue
+
+        stripped = line.strip()
+        if not stripped:
+            # A blank line ends a paragraph; lists may continue after one
+            if paragraph is not None:
+                yield from paragraph.to_blocks()
+                paragraph = None
+            continue
+
+        fence_match = _FENCE.match(line)
+        if fence_match:
+            yield from flush()
+            fence = fence_match.group(1)
+            code = _Node("code", language=_language(fence_match.group(2)))
+            code.lines = []
+            continue
+
+        heading = _HEADING.match(stripped)
+        if heading:
+            yield from flush()
+            yield from _Node(f"heading_{min(len(heading.group(1)), 3)}", heading.group(2)).to_blocks()
+            continue
+
+        if _DIVIDER.match(line):
+            yield from flush()
+            yield from _Node("divider").to_blocks()
+            continue
+
+        item = _LIST_ITEM.match(line)
+        if item:
+            if paragraph is not None:
+                yield from paragraph.to_blocks()
+                paragraph = None
+            indent, marker, text = len(item.group(1)), item.group(2), item.group(3)
+            todo = _TODO.match(text) if marker in "-*+" else None
+            if todo:
+                node = _Node("to_do", todo.group(2), checked=todo.group(1) != " ")
+            elif marker in "-*+":
+                node = _Node("bulleted_list_item", text)
+            else:
+                node = _Node("numbered_list_item", text)
+
+            last_item = node
+            while stack and stack[-1][0] >= indent:
+                stack.pop()
+            # Deeper lists than one request allows hang off the deepest allowed level, and a
+            # full children array passes the item up to the parent's level
+            parent_depth = min(len(stack), MAX_NESTING) - 1
+            while parent_depth >= 0 and len(stack[parent_depth][1].children) >= MAX_CHILDREN:
+                parent_depth -= 1
+            if parent_depth < 0:
+                # New top-level item: the previous list tree is complete
+                yield from flush()
+                tree = node
+                stack.append((indent, node))
+                continue
+            stack[parent_depth][1].children.append(node)
+            del stack[parent_depth + 1:]
+            if len(stack) <= MAX_NESTING:
+                stack.append((indent, node))
+            continue
+
+        quote = _QUOTE.match(line)
+        if quote:
+            if paragraph is None or paragraph.type != "quote":
+                yield from flush()
+                paragraph = _Node("quote", quote.group(1))
+            else:
+                paragraph.lines.append(quote.group(1))
+            continue
+
+        if tree is not None and line[0] == " ":
+            # Indented continuation of the last list item
+            last_item.lines.append(stripped)
+            continue
+
+        if paragraph is None or paragraph.type != "paragraph":
+            yield from flush()
+            paragraph = _Node("paragraph", stripped)
+        else:
+            paragraph.lines.append(stripped)
+
+    if code is not None:
+        # Unterminated fence: keep what was there
+        yield from code.to_blocks()
+    yield from flush()
+
+
+def markdown_to_blocks(markdown: Union[str, Iterable[str]]) -> List[Dict[str, Any]]:
+    return list(iter_blocks(markdown))
+
+
+def _count(block: Dict[str, Any]) -> int:
+    children = block[block["type"]].get("children", [])
+    return 1 + sum(_count(child) for child in children)
+
+
+def batch_blocks(blocks: Iterable[Dict[str, Any]]) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Groups top-level blocks into request-sized batches: at most 100 top-level blocks,
+    1000 blocks in total and MAX_PAYLOAD_BYTES of JSON each.
+    """
+    batch: List[Dict[str, Any]] = []
+    blocks_in_batch = 0
+    bytes_in_batch = 0
+    for block in blocks:
+        count = _count(block)
+        size = len(json.dumps(block, ensure_ascii=False).encode("utf-8"))
+        if batch and (len(batch) >= MAX_CHILDREN
+                      or blocks_in_batch + count > MAX_BLOCKS_PER_REQUEST
+                      or bytes_in_batch + size > MAX_PAYLOAD_BYTES):
+            yield batch
+            batch, blocks_in_batch, bytes_in_batch = [], 0, 0
+        batch.append(block)
+        blocks_in_batch += count
+        bytes_in_batch += size
+    if batch:
+        yield batch
@@ -0,0 +1,113 @@
+import time
+import bisect
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Latency histograms for each pipeline stage (upload, normalize, transcription, llm, parse,
+# notion, and fast_path with outcome hit/miss), exported in the Prometheus text format at
+# /metrics. Stages timed while serving a request are also collected per request for its
+# Server-Timing header.
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+class Histogram:
+    """
+    A Prometheus histogram with labels. Each series keeps cumulative-ready bucket counts,
+    a sum and a count.
+    """
+    def __init__(self, name: str, help_text: str, label_names: Tuple[str, ...], buckets=BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # One slot per bucket plus +Inf, then sum
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[bisect.bisect_left(self.buckets, value)] += 1
+            series[-1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = {labels: list(series) for labels, series in self._series.items()}
+        for labels, series in sorted(snapshot.items()):
+            label_text = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(self.label_names, labels))
+            prefix = label_text + "," if label_text else ""
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series[:-1]):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f'{self.name}_bucket{{{prefix}le="{le}"}} {cumulative}')
+            braces = f"{{{label_text}}}" if label_text else ""
+            lines.append(f"{self.name}_sum{braces} {series[-1]}")
+            lines.append(f"{self.name}_count{braces} {cumulative}")
+        return lines
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+stage_duration = Histogram(
+    "ai_logger_stage_duration_seconds", "Duration of each pipeline stage.", ("stage", "outcome")
+)
+request_duration = Histogram(
+    "ai_logger_request_duration_seconds", "HTTP request duration, until the response is complete.",
+    ("method", "route", "status"),
+)
+
+# (start time, [(stage, seconds), ...]) for the request being served, if any
+_request: contextvars.ContextVar[Optional[Tuple[float, List[Tuple[str, float]]]]] = contextvars.ContextVar(
+    "metrics_request", default=None
+)
+
+def observe(stage: str, seconds: float, outcome: str = "ok") -> None:
+    stage_duration.observe(seconds, stage, outcome)
+    current = _request.get()
+    if current is not None:
+        current[1].append((stage, seconds))
+
+@contextmanager
+def timer(stage: str) -> Iterator[None]:
+    """
+    Times the block as `stage`; an exception is recorded with outcome="error".
+    """
+    start = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    finally:
+        observe(stage, time.perf_counter() - start, outcome)
+
+def start_request() -> contextvars.Token:
+    return _request.set((time.perf_counter(), []))
+
+def end_request(token: contextvars.Token) -> None:
+    _request.reset(token)
+
+def request_elapsed() -> float:
+    """
+    Seconds since the current request started (0 outside a request).
+    """
+    current = _request.get()
+    return time.perf_counter() - current[0] if current is not None else 0.0
+
+def server_timing() -> str:
+    """
+    Server-Timing header value for the stages recorded so far in this request, plus the total.
+    """
+    current = _request.get()
+    if current is None:
+        return ""
+    entries = [f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in current[1]]
+    entries.append(f"total;dur={request_elapsed() * 1000:.1f}")
+    return ", ".join(entries)
+
+def render() -> str:
+    return "\n".join(stage_duration.render() + request_duration.render()) + "\n"
@@ -0,0 +1,148 @@
+import os
+import time
+import random
+import asyncio
+from typing import Any, Dict, Optional
+
+import httpx
+
+from services import http_client
+
+# Notion allows an average of ~3 requests per second per integration, with short bursts.
+NOTION_RATE_LIMIT = float(os.getenv("NOTION_RATE_LIMIT", "3"))
+NOTION_BURST = float(os.getenv("NOTION_BURST", "3"))
+NOTION_MAX_RETRIES = int(os.getenv("NOTION_MAX_RETRIES", "4"))
+NOTION_VERSION = "2022-06-28"
+
+class NotionAPIError(Exception):
+    """
+    Non-200 response from Notion. Keeps the status code and Retry-After (seconds)
+    so callers can tell rate limiting and outages from permanent failures.
+    """
+    def __init__(self, status_code: int, text: str, retry_after: Optional[float] = None):
+        super().__init__(f"Notion API Error: {text}")
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+    @property
+    def retryable(self) -> bool:
+        return self.status_code == 429 or self.status_code >= 500
+
+class TokenBucket:
+    """
+    Token-bucket limiter shared by the coroutines of one event loop.
+
+    Every caller reserves a token and sleeps until it is due, so waiters are served in order
+    without polling. The rate adapts AIMD-style: a 429 pauses the bucket for Retry-After and
+    cuts the rate, and each success creeps it back up towards the configured maximum.
+    """
+    def __init__(self, rate: float, capacity: float):
+        self.max_rate = rate
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+
+    def _reserve(self) -> float:
+        now = time.monotonic()
+        if now > self._updated:
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+        self._tokens -= 1
+        # _updated is in the future while the bucket is paused
+        return (self._updated - now) + max(0.0, -self._tokens) / self.rate
+
+    async def acquire(self) -> None:
+        delay = self._reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def on_success(self) -> None:
+        self.rate = min(self.max_rate, self.rate + self.max_rate * 0.05)
+
+    def on_rate_limited(self, retry_after: Optional[float]) -> None:
+        self.rate = max(self.max_rate * 0.2, self.rate * 0.85)
+        pause = retry_after if retry_after is not None else 1.0 / self.rate
+        # Nobody gets a token until the pause is over, and the burst allowance is spent
+        self._updated = max(self._updated, time.monotonic() + pause)
+        self._tokens = min(self._tokens, 0.0)
+
+# One limiter per process, shared by every Notion caller in it
+limiter = TokenBucket(NOTION_RATE_LIMIT, NOTION_BURST)
+
+def _headers(token: str) -> Dict[str, str]:
+    return {
+        "Authorization": f"Bearer {token}",
+        "Notion-Version": NOTION_VERSION,
+        "Content-Type": "application/json",
+    }
+
+def _retry_after(response: httpx.Response) -> Optional[float]:
+    try:
+        return float(response.headers["Retry-After"])
+    except (KeyError, ValueError):
+        return None
+
+def _backoff(attempt: int) -> float:
+    # Jittered exponential backoff for 5xx and network errors: 0.5s, 1s, 2s, ... +-50%
+    return min(30.0, 0.5 * 2 ** attempt) * random.uniform(0.5, 1.5)
+
+# Errors raised before the request was sent, so even a non-idempotent one can be repeated
+_NOT_SENT = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+def _check(response: httpx.Response) -> Dict[str, Any]:
+    if response.status_code != 200:
+        raise NotionAPIError(response.status_code, response.text, _retry_after(response))
+    return response.json()
+
+class NotionClient:
+    """
+    Async Notion client: every request goes through the shared limiter and is retried
+    on 429 (after Retry-After), 5xx and network errors. POST requests are taken to be
+    non-idempotent unless `idempotent=True` is passed (searches, database queries): after
+    a network error they're only retried if the request never went out.
+    """
+    def __init__(self, token: str, base_url: str = "https://api.notion.com/v1", timeout: float = 30,
+                 bucket: TokenBucket = limiter, max_retries: int = NOTION_MAX_RETRIES):
+        self.bucket = bucket
+        self.max_retries = max_retries
+        self.http = http_client.create_client(base_url, _headers(token), timeout)
+
+    def _retry_delay(self, error: Exception, attempt: int, idempotent: bool) -> Optional[float]:
+        # None means give up and re-raise
+        if attempt >= self.max_retries:
+            return None
+        if isinstance(error, httpx.TransportError) and not idempotent and not isinstance(error, _NOT_SENT):
+            # e.g. a read timeout on POST /pages: the page may well exist already, and
+            # repeating the request would create a second one. The save queue doesn't
+            # repeat it either (see save_queue._retryable).
+            return None
+        if isinstance(error, NotionAPIError):
+            if error.status_code == 429:
+                self.bucket.on_rate_limited(error.retry_after)
+                # The limiter already holds everyone back for Retry-After
+                return 0.0
+            if not error.retryable:
+                return None
+        return _backoff(attempt)
+
+    async def request(self, method: str, path: str, idempotent: Optional[bool] = None, **kwargs) -> Dict[str, Any]:
+        idempotent = method != "POST" if idempotent is None else idempotent
+        attempt = 0
+        while True:
+            await self.bucket.acquire()
+            try:
+                response = await self.http.request(method, path, **kwargs)
+                result = _check(response)
+            except (NotionAPIError, httpx.TransportError) as e:
+                delay = self._retry_delay(e, attempt, idempotent)
+                if delay is None:
+                    raise
+                attempt += 1
+                await asyncio.sleep(delay)
+                continue
+            self.bucket.on_success()
+            return result
+
+    async def aclose(self) -> None:
+        await self.http.aclose()
@@ -1,23 +1,47 @@
 import os
-import requests
-import json
-from typing import Dict, Any, List
+import time
+import asyncio
+import logging
+from typing import Dict, Any, Iterable, List, Optional
+
+from services.notion_client import NotionClient
+from services import agenda_mirror, markdown_blocks, metrics, related_ideas, search_index
+
+logger = logging.getLogger(__name__)
 
 NOTION_TOKEN = os.getenv("NOTION_TOKEN") or os.getenv("NOTION_API_KEY")
 AGENDA_DB_ID = os.getenv("AGENDA_DATABASE_ID")
 JOURNAL_DB_ID = os.getenv("JOURNAL_DATABASE_ID")
 
-BASE_URL = "https://api.notion.com/v1"
-HEADERS = {
-    "Authorization": f"Bearer {NOTION_TOKEN}",
-    "Notion-Version": "2022-06-28",
-    "Content-Type": "application/json"
-}
+BASE_URL = os.getenv("NOTION_BASE_URL", "https://api.notion.com/v1")
+TIMEOUT = float(os.getenv("NOTION_TIMEOUT", "30"))
 
 if not NOTION_TOKEN:
     raise ValueError("NOTION_API_KEY is not set")
 
-def create_event(data: Dict[str, Any]) -> Dict[str, Any]:
+class PartialPageError(Exception):
+    """
+    A page was created but writing its blocks failed. `archived` tells whether the partial
+    page was archived, i.e. whether saving the entry again leaves a single live page.
+    """
+    def __init__(self, error: Exception, page_id: str, archived: bool):
+        state = "archived" if archived else "could not be archived"
+        super().__init__(f"{error} (partial page {page_id} {state})")
+        self.error = error
+        self.archived = archived
+
+async def save_entry(mode: str, data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Creates an Agenda page for mode "event" or a Journal page for mode "idea".
+    """
+    if mode not in ("event", "idea"):
+        raise ValueError("Invalid mode")
+    with metrics.timer("notion"):
+        if mode == "event":
+            return await create_event(data)
+        return await create_journal(data)
+
+async def create_event(data: Dict[str, Any]) -> Dict[str, Any]:
     """
     Creates a page in the Agenda database.
     data expected keys: title, start_time, end_time (optional), description (optional)
@@ -45,32 +69,17 @@ def create_event(data: Dict[str, Any]) -> Dict[str, Any]:
     if data.get("end_time"):
         properties["Date"]["date"]["end"] = data.get("end_time")
         
-    children = []
-    if data.get("description"):
-        children.append({
-            "object": "block",
-            "type": "paragraph",
-            "paragraph": {
-                "rich_text": [
-                    {
-                        "type": "text",
-                        "text": {
-                            "content": data.get("description")
-                        }
-                    }
-                ]
-            }
-        })
-        
     payload = {
         "parent": {"database_id": AGENDA_DB_ID},
         "properties": properties,
-        "children": children
     }
     
-    return _create_page(payload)
+    page = await _create_page(payload, markdown_blocks.iter_blocks(data.get("description") or ""))
+    await _index_page(page, "event", data.get("title", "New Event"), data.get("description") or "")
+    await _mirror_event(page, data)
+    return page
 
-def create_journal(data: Dict[str, Any]) -> Dict[str, Any]:
+async def create_journal(data: Dict[str, Any]) -> Dict[str, Any]:
     """
     Creates a page in the Journal database.
     data expected keys: title, content (markdown string)
@@ -90,66 +99,115 @@ def create_journal(data: Dict[str, Any]) -> Dict[str, Any]:
         }
     }
     
-    # We need to convert the content string (which might be markdown-like) into blocks.
-    # For simplicity, we'll split by newlines and create paragraphs, 
-    # but a real implementation might want a markdown-to-blocks parser.
-    # Here we will just dump the content as one or more paragraphs.
-    
     content_text = data.get("content", "")
-    children = []
-    
-    # Simple markdown-ish parsing
-    lines = content_text.split('\n')
-    for line in lines:
-        line = line.strip()
-        if not line:
-            continue
-            
-        if line.startswith("- "):
-            children.append({
-                "object": "block",
-                "type": "bulleted_list_item",
-                "bulleted_list_item": {
-                    "rich_text": [{"type": "text", "text": {"content": line[2:]}}]
-                }
-            })
-        elif line.startswith("# "):
-             children.append({
-                "object": "block",
-                "type": "heading_1",
-                "heading_1": {
-                    "rich_text": [{"type": "text", "text": {"content": line[2:]}}]
-                }
-            })
-        elif line.startswith("## "):
-             children.append({
-                "object": "block",
-                "type": "heading_2",
-                "heading_2": {
-                    "rich_text": [{"type": "text", "text": {"content": line[3:]}}]
-                }
-            })
-        else:
-            children.append({
-                "object": "block",
-                "type": "paragraph",
-                "paragraph": {
-                    "rich_text": [{"type": "text", "text": {"content": line}}]
-                }
-            })
 
     payload = {
         "parent": {"database_id": JOURNAL_DB_ID},
         "properties": properties,
-        "children": children
     }
     
-    return _create_page(payload)
+    page = await _create_page(payload, markdown_blocks.iter_blocks(content_text))
+    await _index_page(page, "idea", data.get("title", "New Idea"), content_text)
+    return page
 
-def _create_page(payload: Dict[str, Any]) -> Dict[str, Any]:
-    response = requests.post(f"{BASE_URL}/pages", headers=HEADERS, json=payload)
-    
-    if response.status_code != 200:
-        raise Exception(f"Notion API Error: {response.text}")
-        
-    return response.json()
+async def sync_agenda(full: bool = False) -> int:
+    """
+    Copies Agenda pages edited since the last refresh into the local mirror (all of them
+    when `full`, which also drops pages no longer in the database). Returns the number
+    of pages fetched.
+    """
+    if not AGENDA_DB_ID:
+        return 0
+    client = _get_client()
+    mirror = agenda_mirror.get_mirror()
+    watermark = None if full else mirror.get_watermark()
+    body: Dict[str, Any] = {
+        "page_size": 100,
+        "sorts": [{"timestamp": "last_edited_time", "direction": "ascending"}],
+    }
+    if watermark:
+        # last_edited_time only has minute precision, so the watermark's own minute is
+        # fetched again; storing a page twice is harmless
+        body["filter"] = {"timestamp": "last_edited_time", "last_edited_time": {"on_or_after": watermark}}
+
+    seen: List[str] = []
+    newest = watermark
+    while True:
+        data = await client.request("POST", f"/databases/{AGENDA_DB_ID}/query", idempotent=True, json=body)
+        pages = data.get("results", [])
+        await asyncio.to_thread(mirror.upsert_pages, pages)
+        seen.extend(page["id"] for page in pages)
+        newest = max([newest or ""] + [page.get("last_edited_time") or "" for page in pages]) or None
+        if not data.get("has_more"):
+            break
+        body["start_cursor"] = data["next_cursor"]
+
+    if full:
+        removed = await asyncio.to_thread(mirror.retain, seen)
+        mirror.set_state("full_refresh_at", str(time.time()))
+        logger.info("agenda mirror: full refresh, %d pages, %d removed", len(seen), removed)
+    # Only advanced once every page up to it is stored, so an interrupted refresh is redone
+    if newest:
+        mirror.set_watermark(newest)
+    return len(seen)
+
+# Requests go through the process-wide Notion rate limiter and retry policy
+_client: Optional[NotionClient] = None
+
+def _get_client() -> NotionClient:
+    global _client
+    if _client is None:
+        _client = NotionClient(NOTION_TOKEN, BASE_URL, TIMEOUT)
+    return _client
+
+async def open_client() -> None:
+    _get_client()
+
+async def close_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+async def _create_page(payload: Dict[str, Any], children: Iterable[Dict[str, Any]] = ()) -> Dict[str, Any]:
+    """
+    Creates the page with the first batch of blocks and appends the rest in order,
+    each batch within Notion's per-request limits.
+    """
+    client = _get_client()
+    batches = markdown_blocks.batch_blocks(children)
+    page = await client.request("POST", "/pages", json={**payload, "children": next(batches, [])})
+    try:
+        for batch in batches:
+            # Appending twice would duplicate the blocks
+            await client.request("PATCH", f"/blocks/{page['id']}/children", idempotent=False, json={"children": batch})
+    except Exception as e:
+        # Don't leave a truncated page behind: a retried save would create a second one
+        try:
+            await client.request("PATCH", f"/pages/{page['id']}", json={"archived": True})
+        except Exception as archive_error:
+            logger.warning("failed to archive partial page %s: %s", page["id"], archive_error)
+            raise PartialPageError(e, page["id"], archived=False) from e
+        raise PartialPageError(e, page["id"], archived=True) from e
+    return page
+
+async def _index_page(page: Dict[str, Any], kind: str, title: str, content: str) -> None:
+    # The page already exists in Notion, so a local indexing problem must not fail the save.
+    # The FTS insert and the embedding write block, so they run in a thread.
+    try:
+        await asyncio.to_thread(search_index.get_index().add, page["id"], kind, title, content, page.get("url"))
+        if kind == "idea":
+            await asyncio.to_thread(related_ideas.get_index().add, page["id"], title, content, page.get("url"))
+    except Exception as e:
+        logger.warning("failed to index page %s: %s", page.get("id"), e)
+
+async def _mirror_event(page: Dict[str, Any], data: Dict[str, Any]) -> None:
+    # Same as _index_page: the event is saved, so a mirror problem only gets logged
+    try:
+        await asyncio.to_thread(
+            agenda_mirror.get_mirror().upsert_event,
+            page["id"], data.get("title", "New Event"), data.get("start_time"), data.get("end_time"),
+            page.get("url"), page.get("last_edited_time"),
+        )
+    except Exception as e:
+        logger.warning("failed to mirror event %s: %s", page.get("id"), e)
@@ -0,0 +1,107 @@
+import os
+import json
+import time
+import hashlib
+import sqlite3
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+# Local mirror of the exported Notion pages, used for incremental syncs: each page keeps
+# its last_edited_time and a hash of its blocks, so unchanged pages are never refetched.
+NOTION_INDEX_DB = os.getenv("NOTION_INDEX_DB", "notion_index.db")
+# Incremental syncs can't see deleted pages, so every so often (seconds) a sync lists every
+# page and drops the ones that are gone
+NOTION_FULL_SYNC_INTERVAL = float(os.getenv("NOTION_FULL_SYNC_INTERVAL", str(7 * 24 * 3600)))
+
+
+def blocks_hash(blocks: List[Dict[str, Any]]) -> str:
+    return hashlib.sha256(json.dumps(blocks, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+class PageIndex:
+    def __init__(self, path: str = NOTION_INDEX_DB):
+        self._conn = sqlite3.connect(path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS pages ("
+            " id TEXT PRIMARY KEY,"
+            " last_edited_time TEXT NOT NULL,"
+            " blocks_hash TEXT NOT NULL,"
+            " meta TEXT NOT NULL,"
+            " content TEXT NOT NULL,"
+            " synced_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE TABLE IF NOT EXISTS sync_state (key TEXT PRIMARY KEY, value TEXT)")
+        self._conn.commit()
+
+    def last_edited_time(self, page_id: str) -> Optional[str]:
+        row = self._conn.execute("SELECT last_edited_time FROM pages WHERE id = ?", (page_id,)).fetchone()
+        return row[0] if row else None
+
+    def upsert(self, page: Dict[str, Any], blocks: List[Dict[str, Any]]) -> bool:
+        """
+        Stores a fetched page. Returns False when its blocks are identical to the stored copy.
+        """
+        digest = blocks_hash(blocks)
+        row = self._conn.execute("SELECT blocks_hash FROM pages WHERE id = ?", (page["id"],)).fetchone()
+        changed = row is None or row[0] != digest
+        self._conn.execute(
+            "INSERT OR REPLACE INTO pages (id, last_edited_time, blocks_hash, meta, content, synced_at)"
+            " VALUES (?, ?, ?, ?, ?, ?)",
+            (page["id"], page["last_edited_time"], digest, json.dumps(page, ensure_ascii=False),
+             json.dumps(blocks, ensure_ascii=False), time.time()),
+        )
+        self._conn.commit()
+        return changed
+
+    def remove(self, page_ids: Iterable[str]) -> List[str]:
+        """
+        Drops the given pages (archived or deleted in Notion). Returns the ids that were stored.
+        """
+        removed = []
+        for page_id in page_ids:
+            if self._conn.execute("DELETE FROM pages WHERE id = ?", (page_id,)).rowcount:
+                removed.append(page_id)
+        self._conn.commit()
+        return removed
+
+    def retain(self, page_ids: Iterable[str]) -> List[str]:
+        """
+        Drops every page not in page_ids (after a full listing). Returns the removed ids.
+        """
+        keep = set(page_ids)
+        stale = [row[0] for row in self._conn.execute("SELECT id FROM pages") if row[0] not in keep]
+        return self.remove(stale)
+
+    def get_state(self, key: str) -> Optional[str]:
+        row = self._conn.execute("SELECT value FROM sync_state WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_state(self, key: str, value: str) -> None:
+        self._conn.execute("INSERT OR REPLACE INTO sync_state (key, value) VALUES (?, ?)", (key, value))
+        self._conn.commit()
+
+    def get_watermark(self) -> Optional[str]:
+        """
+        Newest last_edited_time covered by the last complete sync.
+        """
+        return self.get_state("watermark")
+
+    def set_watermark(self, value: str) -> None:
+        self.set_state("watermark", value)
+
+    def full_sync_due(self) -> bool:
+        last = self.get_state("full_sync_at")
+        return last is None or time.time() - float(last) >= NOTION_FULL_SYNC_INTERVAL
+
+    def __len__(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+
+    def iter_records(self) -> Iterator[Dict[str, Any]]:
+        """
+        Yields every stored page as an export record ({"meta", "content"}), one row at a time.
+        """
+        for meta, content in self._conn.execute("SELECT meta, content FROM pages ORDER BY last_edited_time DESC"):
+            yield {"meta": json.loads(meta), "content": json.loads(content)}
+
+    def close(self) -> None:
+        self._conn.close()
@@ -0,0 +1,198 @@
+import os
+import zlib
+import asyncio
+import logging
+import sqlite3
+import threading
+import unicodedata
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+# "Related past ideas" for the review modal: TF-IDF over character n-grams (which works for
+# Chinese as well as English without a tokenizer), hashed into a fixed number of dimensions
+# so new ideas can be appended without refitting a vocabulary. The vectors live in a
+# memory-mapped matrix on disk, so startup is just opening the file.
+logger = logging.getLogger(__name__)
+
+RELATED_IDEAS_PATH = os.getenv("RELATED_IDEAS_PATH", "related_ideas")
+# Scoring reads the whole matrix (ideas x dim float32) per lookup: 512 dims is 100 MB at 50k ideas
+RELATED_IDEAS_DIM = int(os.getenv("RELATED_IDEAS_DIM", "512"))
+RELATED_IDEAS_TOP_K = int(os.getenv("RELATED_IDEAS_TOP_K", "5"))
+RELATED_IDEAS_MIN_SCORE = float(os.getenv("RELATED_IDEAS_MIN_SCORE", "0.2"))
+
+_NGRAMS = (2, 3)
+# Document frequencies are counted per n-gram hash, in far more buckets than the vectors have
+_DF_BUCKETS = 1 << 20
+# Rows scored per matrix product, bounding the temporary score buffers
+_BATCH_ROWS = 16384
+_INITIAL_CAPACITY = 1024
+
+
+def _ngrams(text: str) -> Counter:
+    text = " ".join(unicodedata.normalize("NFKC", text).lower().split())
+    grams = Counter()
+    for n in _NGRAMS:
+        for i in range(len(text) - n + 1):
+            gram = text[i:i + n]
+            if not gram.isspace():
+                grams[gram] += 1
+    return grams
+
+
+class RelatedIdeas:
+    """
+    Files: <path>.db (row -> idea id/title/url), <path>.f32 (vectors, one row per idea)
+    and <path>.df (n-gram document frequencies).
+
+    IDF weights are taken when an idea is added, so older vectors use slightly older
+    statistics; rebuild from the search index if the collection changes a lot.
+    """
+    def __init__(self, path: str = RELATED_IDEAS_PATH, dim: int = RELATED_IDEAS_DIM):
+        self.path = path
+        self.dim = dim
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path + ".db", check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS ideas ("
+            " row INTEGER PRIMARY KEY,"
+            " id TEXT UNIQUE NOT NULL,"
+            " title TEXT NOT NULL,"
+            " url TEXT)"
+        )
+        self._conn.commit()
+        self._rows: List[Dict[str, Any]] = [
+            {"id": row[0], "title": row[1], "url": row[2]}
+            for row in self._conn.execute("SELECT id, title, url FROM ideas ORDER BY row")
+        ]
+        self._row_of = {idea["id"]: i for i, idea in enumerate(self._rows)}
+        self._df = self._memmap(".df", np.int32, (_DF_BUCKETS,))
+        self._matrix = self._memmap(".f32", np.float32, (max(_INITIAL_CAPACITY, len(self._rows)), dim))
+
+    def _memmap(self, suffix: str, dtype, shape) -> np.memmap:
+        filename = self.path + suffix
+        size = int(np.prod(shape)) * np.dtype(dtype).itemsize
+        # Grow (zero-filled) as needed, but never shrink: the file may hold more rows than shape
+        with open(filename, "ab") as f:
+            if f.tell() < size:
+                f.truncate(size)
+        rows = os.path.getsize(filename) // (size // shape[0])
+        return np.memmap(filename, dtype=dtype, mode="r+", shape=(rows,) + tuple(shape[1:]))
+
+    def _vectorize(self, text: str, update_df: bool = False) -> np.ndarray:
+        grams = _ngrams(text)
+        vector = np.zeros(self.dim, dtype=np.float32)
+        if not grams:
+            return vector
+        hashes = np.fromiter((zlib.crc32(g.encode("utf-8")) for g in grams), dtype=np.uint32, count=len(grams))
+        counts = np.fromiter(grams.values(), dtype=np.float32, count=len(grams))
+        df_keys = hashes & (_DF_BUCKETS - 1)
+        if update_df:
+            np.add.at(self._df, np.unique(df_keys), 1)
+        idf = np.log((1 + len(self._rows)) / (1 + self._df[df_keys].astype(np.float32))) + 1
+        # Signed hashing: collisions cancel out on average instead of piling up
+        signs = np.where(hashes >> 31, -1.0, 1.0).astype(np.float32)
+        np.add.at(vector, hashes % self.dim, signs * (1 + np.log(counts)) * idf)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def add(self, idea_id: str, title: str, content: str, url: Optional[str] = None) -> None:
+        """
+        Adds (or replaces) one idea's vector in place, without touching the others.
+        """
+        with self._lock:
+            row = self._row_of.get(idea_id)
+            vector = self._vectorize(f"{title}\n{content}", update_df=row is None)
+            if row is None:
+                row = len(self._rows)
+                if row >= self._matrix.shape[0]:
+                    self._matrix.flush()
+                    self._matrix = self._memmap(".f32", np.float32, (2 * self._matrix.shape[0], self.dim))
+                self._rows.append({"id": idea_id, "title": title, "url": url})
+                self._row_of[idea_id] = row
+            else:
+                self._rows[row] = {"id": idea_id, "title": title, "url": url}
+            # Written through the shared mapping: a crashed process loses nothing, and
+            # msync-ing the whole matrix on every add would cost more than the add itself
+            self._matrix[row] = vector
+            self._conn.execute(
+                "INSERT OR REPLACE INTO ideas (row, id, title, url) VALUES (?, ?, ?, ?)",
+                (row, idea_id, title, url),
+            )
+            self._conn.commit()
+
+    def lookup_many(self, texts: List[str], k: int = RELATED_IDEAS_TOP_K,
+                    min_score: float = RELATED_IDEAS_MIN_SCORE) -> List[List[Dict[str, Any]]]:
+        """
+        Top-k most similar saved ideas for each text, scored together in batched matrix products.
+        """
+        with self._lock:
+            count = len(self._rows)
+            if not texts or count == 0:
+                return [[] for _ in texts]
+            queries = np.stack([self._vectorize(text) for text in texts])
+            scores = np.empty((len(texts), count), dtype=np.float32)
+            for start in range(0, count, _BATCH_ROWS):
+                end = min(start + _BATCH_ROWS, count)
+                scores[:, start:end] = queries @ self._matrix[start:end].T
+            rows = self._rows[:count]
+
+        k = min(k, count)
+        results = []
+        for query_scores in scores:
+            top = np.argpartition(-query_scores, k - 1)[:k]
+            top = top[np.argsort(-query_scores[top])]
+            results.append([
+                {**rows[i], "score": round(float(query_scores[i]), 4)}
+                for i in top if query_scores[i] >= min_score
+            ])
+        return results
+
+    def lookup(self, text: str, k: int = RELATED_IDEAS_TOP_K,
+               min_score: float = RELATED_IDEAS_MIN_SCORE) -> List[Dict[str, Any]]:
+        return self.lookup_many([text], k, min_score)[0]
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def close(self) -> None:
+        with self._lock:
+            self._matrix.flush()
+            self._df.flush()
+            self._conn.close()
+
+_index: Optional[RelatedIdeas] = None
+
+def get_index() -> RelatedIdeas:
+    global _index
+    if _index is None:
+        _index = RelatedIdeas(RELATED_IDEAS_PATH)
+    return _index
+
+def close_index() -> None:
+    global _index
+    if _index is not None:
+        _index.close()
+        _index = None
+
+def related_to_draft(draft: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Saved ideas similar to an idea draft. Never raises: this only decorates the review modal.
+    """
+    text = f"{draft.get('title', '')}\n{draft.get('content', '')}"
+    if not text.strip():
+        return []
+    try:
+        return get_index().lookup(text)
+    except Exception as e:
+        logger.warning("related ideas lookup failed: %s", e)
+        return []
+
+async def find_related(mode: str, draft: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Related ideas for the review modal; empty for events. Scored off the event loop.
+    """
+    if mode != "idea" or not draft:
+        return []
+    return await asyncio.to_thread(related_to_draft, draft)
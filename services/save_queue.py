@@ -0,0 +1,287 @@
+import os
+import json
+import time
+import uuid
+import random
+import sqlite3
+import asyncio
+import logging
+import threading
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from services import notion_service
+from services.notion_client import _NOT_SENT, NotionAPIError
+
+logger = logging.getLogger(__name__)
+
+# Confirmed drafts are written to this SQLite file first and saved to Notion by a
+# background worker, so a slow or rate-limited Notion never blocks (or loses) a save.
+SAVE_QUEUE_DB = os.getenv("SAVE_QUEUE_DB", "save_queue.db")
+MAX_ATTEMPTS = int(os.getenv("SAVE_QUEUE_MAX_ATTEMPTS", "8"))
+BACKOFF_BASE = float(os.getenv("SAVE_QUEUE_BACKOFF_BASE", "1"))
+BACKOFF_MAX = float(os.getenv("SAVE_QUEUE_BACKOFF_MAX", "300"))
+# Jobs written to Notion at the same time. The shared Notion rate limiter sets the actual
+# pace; a few requests in flight keep it busy instead of waiting on each round trip.
+SAVE_QUEUE_CONCURRENCY = int(os.getenv("SAVE_QUEUE_CONCURRENCY", "4"))
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+class SaveQueue:
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # With WAL, NORMAL skips the fsync on every commit but still survives the process
+        # crashing; only an OS crash or power cut can lose the last few commits
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id TEXT PRIMARY KEY,"
+            " mode TEXT NOT NULL,"
+            " data TEXT NOT NULL,"
+            " status TEXT NOT NULL,"
+            " attempts INTEGER NOT NULL DEFAULT 0,"
+            " next_attempt_at REAL NOT NULL,"
+            " last_error TEXT,"
+            " result TEXT,"
+            " created_at REAL NOT NULL,"
+            " updated_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_due ON jobs (status, next_attempt_at)")
+        # Jobs that were mid-flight when the process died go back in the queue
+        self._conn.execute("UPDATE jobs SET status = ? WHERE status = ?", (QUEUED, RUNNING))
+        self._conn.commit()
+        self._wakeup: Optional[asyncio.Event] = None
+        # Replaced every time a job finishes, so wait() can sleep until something changes
+        self._finished: Optional[asyncio.Event] = None
+
+    async def enqueue(self, mode: str, data: Dict[str, Any], job_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Adds a save job. Re-enqueueing an existing job_id returns the existing job unchanged.
+        """
+        return (await self.enqueue_many([{"mode": mode, "data": data, "job_id": job_id}]))[0]
+
+    async def enqueue_many(self, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Adds several jobs ({"mode", "data", optional "job_id"}) in one transaction.
+        """
+        jobs = await asyncio.to_thread(self._insert, items)
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return jobs
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return (await asyncio.to_thread(self._select, [job_id]))[0]
+
+    # The methods below block on SQLite, so the async ones above and the worker run them
+    # in a thread rather than on the event loop
+
+    def _insert(self, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        job_ids = [item.get("job_id") or uuid.uuid4().hex for item in items]
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO jobs (id, mode, data, status, next_attempt_at, created_at, updated_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(job_id, item["mode"], json.dumps(item["data"], ensure_ascii=False), QUEUED, now, now, now)
+                 for job_id, item in zip(job_ids, items)],
+            )
+            self._conn.commit()
+        return self._select(job_ids)
+
+    def _select(self, job_ids: List[str]) -> List[Optional[Dict[str, Any]]]:
+        with self._lock:
+            rows = [self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+                    for job_id in job_ids]
+        return [_job(row) if row is not None else None for row in rows]
+
+    def _claim(self) -> Optional[sqlite3.Row]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM jobs WHERE status = ? AND next_attempt_at <= ? ORDER BY next_attempt_at LIMIT 1",
+                (QUEUED, now),
+            ).fetchone()
+            if row is not None:
+                self._conn.execute(
+                    "UPDATE jobs SET status = ?, attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                    (RUNNING, now, row["id"]),
+                )
+                self._conn.commit()
+        return row
+
+    def _next_due(self) -> Optional[float]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT MIN(next_attempt_at) FROM jobs WHERE status = ?", (QUEUED,)
+            ).fetchone()
+        return row[0]
+
+    def _update(self, job_id: str, status: str, result: Optional[Dict[str, Any]],
+                error: Optional[str], next_attempt_at: Optional[float]) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, last_error = ?, next_attempt_at = ?, updated_at = ?"
+                " WHERE id = ?",
+                (status, json.dumps(result, ensure_ascii=False) if result else None, error,
+                 next_attempt_at or now, now, job_id),
+            )
+            self._conn.commit()
+
+    async def _finish(self, job_id: str, status: str, result: Optional[Dict[str, Any]] = None,
+                      error: Optional[str] = None, next_attempt_at: Optional[float] = None) -> None:
+        await asyncio.to_thread(self._update, job_id, status, result, error, next_attempt_at)
+        # A rescheduled job may now be due before whatever the worker is waiting for
+        if self._wakeup is not None:
+            self._wakeup.set()
+        if self._finished is not None:
+            self._finished.set()
+            self._finished = asyncio.Event()
+
+    async def wait(self, job_ids: List[str], timeout: float) -> List[Dict[str, Any]]:
+        """
+        Waits up to timeout seconds for the jobs to succeed or fail, and returns their
+        current state either way.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            # Taken before checking, so a job finishing in between still wakes us
+            finished = self._finished
+            jobs = await asyncio.to_thread(self._select, job_ids)
+            remaining = deadline - time.monotonic()
+            if finished is None or remaining <= 0 or all(
+                job is None or job["status"] in (SUCCEEDED, FAILED) for job in jobs
+            ):
+                return jobs
+            try:
+                await asyncio.wait_for(finished.wait(), remaining)
+            except asyncio.TimeoutError:
+                pass
+
+    async def run_worker(self, concurrency: int = SAVE_QUEUE_CONCURRENCY) -> None:
+        """
+        Drains the queue until cancelled, with up to `concurrency` jobs in flight.
+        Retryable failures (429, 5xx, requests that never went out) are retried with jittered
+        exponential backoff, honouring Retry-After when Notion sends it.
+        """
+        self._wakeup = asyncio.Event()
+        self._finished = asyncio.Event()
+        slots = asyncio.Semaphore(concurrency)
+        running = set()
+
+        def done(task: asyncio.Task) -> None:
+            running.discard(task)
+            slots.release()
+
+        try:
+            while True:
+                await slots.acquire()
+                # Cleared before looking, so an enqueue that lands in between still wakes us
+                self._wakeup.clear()
+                row = await asyncio.to_thread(self._claim)
+                if row is None:
+                    slots.release()
+                    next_due = await asyncio.to_thread(self._next_due)
+                    timeout = None if next_due is None else max(0.0, next_due - time.time())
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), timeout)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                task = asyncio.create_task(self._process(row))
+                running.add(task)
+                task.add_done_callback(done)
+        finally:
+            # Interrupted jobs stay "running" in the database and are requeued on the next start
+            for task in running:
+                task.cancel()
+            await asyncio.gather(*running, return_exceptions=True)
+
+    async def _process(self, row: sqlite3.Row) -> None:
+        job_id, attempts = row["id"], row["attempts"] + 1
+        try:
+            page = await notion_service.save_entry(row["mode"], json.loads(row["data"]))
+        except (NotionAPIError, httpx.TransportError, notion_service.PartialPageError) as e:
+            if isinstance(e, httpx.TransportError) and not isinstance(e, _NOT_SENT):
+                # The page may have been created; saving again could make a second one
+                logger.warning("save job %s: outcome unknown after %r", job_id, e)
+                await self._finish(job_id, FAILED, error=f"Outcome unknown, check Notion before saving again: {e!r}")
+                return
+            if not _retryable(e) or attempts >= MAX_ATTEMPTS:
+                await self._finish(job_id, FAILED, error=str(e))
+                return
+            delay = getattr(getattr(e, "error", e), "retry_after", None) or _backoff(attempts)
+            logger.info("save job %s attempt %d failed, retrying in %.1fs: %s", job_id, attempts, delay, e)
+            await self._finish(job_id, QUEUED, error=str(e), next_attempt_at=time.time() + delay)
+        except Exception as e:
+            logger.exception("save job %s failed", job_id)
+            await self._finish(job_id, FAILED, error=str(e))
+        else:
+            await self._finish(job_id, SUCCEEDED, result={"id": page.get("id"), "url": page.get("url")})
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+def _job(row: sqlite3.Row) -> Dict[str, Any]:
+    return {
+        "id": row["id"],
+        "mode": row["mode"],
+        "status": row["status"],
+        "attempts": row["attempts"],
+        "next_attempt_at": row["next_attempt_at"] if row["status"] == QUEUED else None,
+        "last_error": row["last_error"],
+        "result": json.loads(row["result"]) if row["result"] else None,
+        "created_at": row["created_at"],
+        "updated_at": row["updated_at"],
+    }
+
+def _retryable(error: Exception) -> bool:
+    if isinstance(error, notion_service.PartialPageError):
+        # Only once the half-written page is archived, so a new attempt leaves one live page
+        inner = error.error
+        return error.archived and (isinstance(inner, httpx.TransportError) or _retryable(inner))
+    if isinstance(error, NotionAPIError):
+        return error.retryable
+    # Network errors only when the request never left: after e.g. a read timeout on
+    # POST /pages the page may exist already
+    return isinstance(error, _NOT_SENT)
+
+def _backoff(attempts: int) -> float:
+    # Exponential with "equal jitter": half the step is fixed, half is random
+    step = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempts)
+    return step / 2 + random.uniform(0, step / 2)
+
+_queue: Optional[SaveQueue] = None
+_worker: Optional[asyncio.Task] = None
+
+def get_queue() -> SaveQueue:
+    global _queue
+    if _queue is None:
+        _queue = SaveQueue(SAVE_QUEUE_DB)
+    return _queue
+
+async def start_worker() -> None:
+    global _worker
+    if _worker is None:
+        _worker = asyncio.create_task(get_queue().run_worker())
+
+async def stop_worker() -> None:
+    global _worker, _queue
+    if _worker is not None:
+        _worker.cancel()
+        try:
+            await _worker
+        except asyncio.CancelledError:
+            pass
+        _worker = None
+    if _queue is not None:
+        _queue.close()
+        _queue = None
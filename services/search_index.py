@@ -0,0 +1,281 @@
+import os
+import re
+import time
+import sqlite3
+import threading
+from typing import Any, Dict, Iterable, List, Optional
+
+# Local full-text index over captured ideas/events and exported Notion pages, so searching
+# never has to go through the rate-limited Notion API.
+SEARCH_INDEX_DB = os.getenv("SEARCH_INDEX_DB", "search_index.db")
+# BM25 has to score every match before sorting, which is what makes queries on very common
+# terms slow. Queries with more matches than this are ranked in windows of this many
+# matches, newest window first: each is a rowid range, which FTS5 can seek to directly.
+SEARCH_MAX_RANKED = int(os.getenv("SEARCH_MAX_RANKED", "500"))
+
+# FTS5's unicode61 tokenizer treats a run of CJK characters as one token, so "会议" would
+# never match inside "今天的会议记录". CJK text is therefore indexed twice: one token per
+# character (for single-character queries), and as overlapping bigrams in separate columns,
+# which longer queries match as a phrase. Bigrams are far rarer than single characters,
+# so those phrase queries stay fast. A bigram token can never equal a single character or
+# a non-CJK word, so queries need no column filters (which make FTS5 noticeably slower).
+_CJK = (
+    "\u3040-\u30ff"   # Hiragana, Katakana
+    "\u3400-\u4dbf"   # CJK Extension A
+    "\u4e00-\u9fff"   # CJK Unified Ideographs
+    "\uac00-\ud7af"   # Hangul syllables
+    "\uf900-\ufaff"   # CJK Compatibility Ideographs
+)
+_CJK_CHAR = re.compile(f"([{_CJK}])")
+_CJK_RUN = re.compile(f"[{_CJK}]+")
+_QUERY_TERM = re.compile(f"[{_CJK}]+|[^\\s{_CJK}]+")
+_PUNCTUATION = re.compile(r"[^\w]+")
+_SNIPPET_CHARS = 120
+
+
+def segment(text: str) -> str:
+    """
+    Splits CJK text into one token per character, leaving other scripts to the tokenizer.
+    """
+    return _CJK_CHAR.sub(r" \1 ", text)
+
+
+def bigrams(text: str) -> str:
+    """
+    Overlapping CJK bigrams of text, space separated. Everything else is dropped.
+    """
+    return " ".join(run[i:i + 2] for run in _CJK_RUN.findall(text) for i in range(len(run) - 1))
+
+
+def _query_terms(query: str) -> List[str]:
+    # CJK runs and words, the units the query matches (and the snippet highlights)
+    terms = []
+    for term in _QUERY_TERM.findall(query):
+        if _CJK_CHAR.match(term):
+            terms.append(term)
+        else:
+            terms.extend(w for w in _PUNCTUATION.split(term) if w)
+    return terms
+
+
+def build_query(query: str) -> str:
+    """
+    Turns free text into an FTS5 query matching all terms. Every term is quoted, so
+    user input can't inject FTS syntax.
+    """
+    terms = []
+    for term in _QUERY_TERM.findall(query):
+        if _CJK_CHAR.match(term):
+            if len(term) == 1:
+                terms.append('"' + term + '"')
+            else:
+                terms.append('"' + bigrams(term) + '"')
+        else:
+            # Match the tokenizer: punctuation splits words, so search the pieces as a phrase
+            words = [w for w in _PUNCTUATION.split(term) if w]
+            if words:
+                terms.append('"' + " ".join(words) + '"')
+    return " ".join(terms)
+
+
+def snippet(content: str, query: str) -> str:
+    """
+    A window of content around the first match, with matched terms in [brackets].
+    """
+    patterns = [
+        re.escape(term) if _CJK_CHAR.match(term) else r"\b" + re.escape(term) + r"\b"
+        for term in sorted(set(_query_terms(query)), key=len, reverse=True)
+    ]
+    found = re.search("|".join(patterns), content, re.IGNORECASE) if patterns else None
+    start = max(0, found.start() - _SNIPPET_CHARS // 4) if found else 0
+    window = content[start:start + _SNIPPET_CHARS]
+    if patterns:
+        window = re.sub("(" + "|".join(patterns) + ")", r"[\1]", window, flags=re.IGNORECASE)
+    return ("…" if start > 0 else "") + window + ("…" if start + _SNIPPET_CHARS < len(content) else "")
+
+
+def block_text(blocks: List[Dict[str, Any]]) -> str:
+    """
+    Plain text of exported Notion blocks, including nested children.
+    """
+    lines = []
+    for block in blocks:
+        value = block.get(block.get("type"), {})
+        rich_text = value.get("rich_text") if isinstance(value, dict) else None
+        if rich_text:
+            lines.append("".join(
+                part.get("plain_text") or part.get("text", {}).get("content", "") for part in rich_text
+            ))
+        if block.get("children"):
+            lines.append(block_text(block["children"]))
+    return "\n".join(line for line in lines if line)
+
+
+class SearchIndex:
+    def __init__(self, path: str = SEARCH_INDEX_DB):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS docs ("
+            " rowid INTEGER PRIMARY KEY,"
+            " id TEXT UNIQUE NOT NULL,"
+            " kind TEXT NOT NULL,"
+            " title TEXT NOT NULL,"
+            " content TEXT NOT NULL,"
+            " url TEXT,"
+            " updated_at REAL NOT NULL)"
+        )
+        # Holds the segmented text and CJK bigrams; rowids match docs
+        self._conn.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS docs_fts USING fts5(title, content, title_cjk, content_cjk)"
+        )
+        self._conn.commit()
+
+    def add(self, doc_id: str, kind: str, title: str, content: str, url: Optional[str] = None) -> None:
+        """
+        Indexes a document, replacing any earlier version with the same id.
+        """
+        with self._lock:
+            self._add(doc_id, kind, title, content, url)
+            self._conn.commit()
+
+    def add_many(self, docs: Iterable[Dict[str, Any]]) -> int:
+        """
+        Bulk version of add() in a single transaction. Each doc has id, kind, title, content, url.
+        """
+        count = 0
+        with self._lock:
+            for doc in docs:
+                self._add(doc["id"], doc["kind"], doc["title"], doc["content"], doc.get("url"))
+                count += 1
+            self._conn.commit()
+        return count
+
+    def remove(self, doc_ids: Iterable[str]) -> int:
+        """
+        Removes documents by id (pages deleted in Notion). Returns how many were indexed.
+        """
+        removed = 0
+        with self._lock:
+            for doc_id in doc_ids:
+                row = self._conn.execute("SELECT rowid FROM docs WHERE id = ?", (doc_id,)).fetchone()
+                if row is not None:
+                    self._conn.execute("DELETE FROM docs_fts WHERE rowid = ?", (row[0],))
+                    self._conn.execute("DELETE FROM docs WHERE rowid = ?", (row[0],))
+                    removed += 1
+            self._conn.commit()
+        return removed
+
+    def _add(self, doc_id: str, kind: str, title: str, content: str, url: Optional[str]) -> None:
+        row = self._conn.execute("SELECT rowid FROM docs WHERE id = ?", (doc_id,)).fetchone()
+        if row is not None:
+            self._conn.execute("DELETE FROM docs_fts WHERE rowid = ?", (row[0],))
+            self._conn.execute("DELETE FROM docs WHERE rowid = ?", (row[0],))
+        cursor = self._conn.execute(
+            "INSERT INTO docs (id, kind, title, content, url, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+            (doc_id, kind, title, content, url, time.time()),
+        )
+        self._conn.execute(
+            "INSERT INTO docs_fts (rowid, title, content, title_cjk, content_cjk) VALUES (?, ?, ?, ?, ?)",
+            (cursor.lastrowid, segment(title), segment(content), bigrams(title), bigrams(content)),
+        )
+
+    def search(self, query: str, limit: int = 20, offset: int = 0,
+               kind: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Paginated search, ranked by BM25 with titles weighted double. Broad queries
+        (more than SEARCH_MAX_RANKED matches) are ranked window by window: the newest
+        SEARCH_MAX_RANKED matches first, then the next older ones, with "complete": False.
+        """
+        match = build_query(query)
+        if not match:
+            return {"results": [], "has_more": False, "complete": True}
+        window = SEARCH_MAX_RANKED
+        tier, skip = divmod(offset, window)
+        rows: List[sqlite3.Row] = []
+        with self._lock:
+            # Walking matches by rowid is cheap, scoring all of them is not
+            newest = self._nth_match(match, kind, tier * window) if tier else None
+            complete = tier == 0
+            while tier == 0 or newest is not None:
+                oldest = self._nth_match(match, kind, (tier + 1) * window)
+                complete = complete and oldest is None
+                # One extra row tells whether there is a next page without counting every match
+                rows += self._ranked(match, kind, newest, oldest, limit + 1 - len(rows), skip)
+                if oldest is None or len(rows) > limit:
+                    break
+                tier, skip, newest = tier + 1, 0, oldest
+        results = [
+            {
+                "id": row["id"],
+                "kind": row["kind"],
+                "title": row["title"],
+                "url": row["url"],
+                "snippet": snippet(row["content"], query),
+                "score": -row["rank"],
+                "updated_at": row["updated_at"],
+            }
+            for row in rows[:limit]
+        ]
+        return {"results": results, "has_more": len(rows) > limit, "complete": complete}
+
+    def _nth_match(self, match: str, kind: Optional[str], n: int) -> Optional[int]:
+        """
+        Rowid of the n-th newest match (0-based), or None when there are no more.
+        """
+        sql = "SELECT docs_fts.rowid FROM docs_fts"
+        params: List[Any] = [match]
+        if kind:
+            sql += " CROSS JOIN docs ON docs.rowid = docs_fts.rowid"
+        sql += " WHERE docs_fts MATCH ?"
+        if kind:
+            sql += " AND docs.kind = ?"
+            params.append(kind)
+        row = self._conn.execute(sql + " ORDER BY docs_fts.rowid DESC LIMIT 1 OFFSET ?", params + [n]).fetchone()
+        return row[0] if row else None
+
+    def _ranked(self, match: str, kind: Optional[str], newest: Optional[int], oldest: Optional[int],
+                limit: int, offset: int) -> List[sqlite3.Row]:
+        """
+        Matches with rowids in (oldest, newest], best first. FTS5 seeks to a rowid range
+        directly, so only that window is scored.
+        """
+        sql = ("SELECT docs.id, docs.kind, docs.title, docs.content, docs.url, docs.updated_at, docs_fts.rank"
+               " FROM docs_fts CROSS JOIN docs ON docs.rowid = docs_fts.rowid"
+               " WHERE docs_fts MATCH ? AND docs_fts.rank MATCH 'bm25(2.0, 1.0, 2.0, 1.0)'")
+        params: List[Any] = [match]
+        if newest is not None:
+            sql += " AND docs_fts.rowid <= ?"
+            params.append(newest)
+        if oldest is not None:
+            sql += " AND docs_fts.rowid > ?"
+            params.append(oldest)
+        if kind:
+            sql += " AND docs.kind = ?"
+            params.append(kind)
+        return self._conn.execute(sql + " ORDER BY docs_fts.rank LIMIT ? OFFSET ?", params + [limit, offset]).fetchall()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+_index: Optional[SearchIndex] = None
+
+def get_index() -> SearchIndex:
+    global _index
+    if _index is None:
+        _index = SearchIndex(SEARCH_INDEX_DB)
+    return _index
+
+def close_index() -> None:
+    global _index
+    if _index is not None:
+        _index.close()
+        _index = None
@@ -1,8 +1,34 @@
 let mediaRecorder;
+let audioStream = null;
+let recorderOptions = {};
 let audioChunks = [];
 let isRecording = false;
 let currentMode = 'event';
 
+// Live mode: segments are streamed over a WebSocket and transcribed while recording.
+// Every SEGMENT_MS a new MediaRecorder takes over, so each segment is a standalone file.
+// It starts OVERLAP_MS before the previous one stops: no audio is lost at the boundary,
+// and a word cut there is whole in one of the two segments. The server transcribes the
+// overlap twice and keeps it once.
+const SEGMENT_MS = 5000;
+const OVERLAP_MS = 1000;
+let socket = null;
+let socketQueue = [];
+let liveMode = false;
+let segmentTimer = null;
+// The recorder taking over, and its chunks, held back until the previous segment is sent
+let nextRecorder = null;
+let nextChunks = [];
+// Whether the current segment's audio overlaps the previous segment
+let segmentOverlaps = false;
+// Finished segments of the current live recording, kept in case the socket drops
+let segmentBlobs = [];
+// Queued draft (from the offline queue) currently shown in the review modal
+let reviewingId = null;
+// Idempotency key (and job id) for saving the draft under review: one per draft, so a
+// double tap or a retry can't create a second Notion page
+let saveKey = null;
+
 const recordBtn = document.getElementById('record-btn');
 const statusText = document.getElementById('status');
 const modeOptions = document.querySelectorAll('.mode-option');
@@ -10,17 +36,23 @@ const reviewModal = document.getElementById('review-modal');
 const entryForm = document.getElementById('entry-form');
 const eventFields = document.getElementById('event-fields');
 const loadingIndicator = document.getElementById('loading-indicator');
+const relatedIdeas = document.getElementById('related-ideas');
+const relatedList = document.getElementById('related-list');
+const agendaDay = document.getElementById('agenda-day');
+const agendaList = document.getElementById('agenda-list');
+const queueStatus = document.getElementById('queue-status');
 
 // Mode Selection
 modeOptions.forEach(opt => {
-    opt.addEventListener('click', () => {
-        modeOptions.forEach(o => o.classList.remove('active'));
-        opt.classList.add('active');
-        currentMode = opt.dataset.mode;
-        statusText.textContent = `Hold to record ${currentMode}...`;
-    });
+    opt.addEventListener('click', () => setMode(opt.dataset.mode));
 });
 
+function setMode(mode) {
+    currentMode = mode;
+    modeOptions.forEach(o => o.classList.toggle('active', o.dataset.mode === mode));
+    statusText.textContent = `Hold to record ${currentMode}...`;
+}
+
 // Audio Recording
 async function initAudio() {
     try {
@@ -46,29 +78,66 @@ async function initAudio() {
         
         console.log(`DEBUG: Selected MIME type: ${selectedMimeType || 'default'}`);
         
-        const options = selectedMimeType ? { mimeType: selectedMimeType } : {};
-        mediaRecorder = new MediaRecorder(stream, options);
-        
-        mediaRecorder.ondataavailable = event => {
-            console.log(`DEBUG: Data available: ${event.data.size} bytes`);
-            if (event.data.size > 0) {
-                audioChunks.push(event.data);
-            }
-        };
-        
-        mediaRecorder.onstop = processAudio;
+        audioStream = stream;
+        recorderOptions = selectedMimeType ? { mimeType: selectedMimeType } : {};
+        mediaRecorder = createRecorder();
     } catch (err) {
         console.error("Error accessing microphone:", err);
         statusText.textContent = "Mic access denied.";
     }
 }
 
+function createRecorder() {
+    const recorder = new MediaRecorder(audioStream, recorderOptions);
+
+    recorder.ondataavailable = event => {
+        console.log(`DEBUG: Data available: ${event.data.size} bytes`);
+        if (event.data.size === 0) return;
+        if (recorder === mediaRecorder) {
+            audioChunks.push(event.data);
+            if (liveMode) sendToSocket(event.data);
+        } else {
+            // Still overlapping the previous segment, which has to be sent first
+            nextChunks.push(event.data);
+        }
+    };
+
+    recorder.onstop = () => {
+        if (nextRecorder) {
+            // Segment boundary: hand the finished segment to the server, the next recorder takes over
+            segmentBlobs.push({ blob: new Blob(audioChunks, { type: recorder.mimeType || 'audio/webm' }), overlaps: segmentOverlaps });
+            sendToSocket(JSON.stringify({ type: 'segment', overlaps: segmentOverlaps }));
+            mediaRecorder = nextRecorder;
+            audioChunks = nextChunks;
+            nextRecorder = null;
+            nextChunks = [];
+            segmentOverlaps = true;
+            if (liveMode) audioChunks.forEach(chunk => sendToSocket(chunk));
+            if (isRecording) return;
+            // Released while the two overlapped: the new recorder's stop finishes the recording
+            if (mediaRecorder.state !== 'inactive') {
+                mediaRecorder.stop();
+                return;
+            }
+        }
+        if (liveMode) finishLiveRecording();
+        else processAudio();
+    };
+    return recorder;
+}
+
 // Button Events (Hold to Record)
 function startRecording(e) {
     if (e.cancelable) e.preventDefault();
-    if (isRecording || !mediaRecorder) return;
+    if (isRecording || !audioStream) return;
     
     audioChunks = [];
+    segmentBlobs = [];
+    segmentOverlaps = false;
+    nextRecorder = null;
+    nextChunks = [];
+    mediaRecorder = createRecorder();
+    openSocket();
     mediaRecorder.start(100); // Collect 100ms chunks to ensure data availability
     isRecording = true;
     recordBtn.classList.add('recording');
@@ -79,12 +148,118 @@ function stopRecording(e) {
     if (e.cancelable) e.preventDefault();
     if (!isRecording) return;
     
-    mediaRecorder.stop();
+    clearInterval(segmentTimer);
     isRecording = false;
+    // If a segment boundary is in flight, its onstop finishes the recording instead
+    if (mediaRecorder.state !== 'inactive') {
+        mediaRecorder.stop();
+    }
     recordBtn.classList.remove('recording');
     statusText.textContent = "Processing...";
 }
 
+// Live transcription over WebSocket
+function getExtension(mimeType) {
+    // Simple heuristic to get extension
+    if (mimeType.includes('mp4')) return 'mp4';
+    if (mimeType.includes('ogg')) return 'ogg';
+    if (mimeType.includes('wav')) return 'wav';
+    return 'webm';
+}
+
+function openSocket() {
+    // Offline, the whole clip is recorded as one file and queued on release
+    liveMode = 'WebSocket' in window && navigator.onLine;
+    if (!liveMode) return;
+
+    socketQueue = [];
+    const protocol = location.protocol === 'https:' ? 'wss:' : 'ws:';
+    const format = getExtension(mediaRecorder.mimeType || 'audio/webm');
+    socket = new WebSocket(`${protocol}//${location.host}/ws/record?mode=${currentMode}&format=${format}`);
+
+    socket.onopen = () => {
+        socketQueue.forEach(msg => socket.send(msg));
+        socketQueue = [];
+    };
+
+    socket.onerror = () => {
+        // Could not connect: fall back to uploading the whole clip when the button is released.
+        // Segments are only rotated once the socket is open, so audioChunks is still one file.
+        if (socket.readyState !== WebSocket.OPEN && liveMode && !nextRecorder && segmentBlobs.length === 0) {
+            console.log('DEBUG: WebSocket unavailable, falling back to upload');
+            liveMode = false;
+            clearInterval(segmentTimer);
+        }
+    };
+
+    clearInterval(segmentTimer);
+    segmentTimer = setInterval(() => {
+        if (isRecording && liveMode && socket.readyState === WebSocket.OPEN && mediaRecorder.state === 'recording' && !nextRecorder) {
+            const previous = mediaRecorder;
+            nextRecorder = createRecorder();
+            nextChunks = [];
+            nextRecorder.start(100);
+            setTimeout(() => {
+                if (previous.state !== 'inactive') previous.stop();
+            }, OVERLAP_MS);
+        }
+    }, SEGMENT_MS);
+}
+
+function sendToSocket(msg) {
+    if (!socket) return;
+    if (socket.readyState === WebSocket.OPEN) socket.send(msg);
+    else if (socket.readyState === WebSocket.CONNECTING) socketQueue.push(msg);
+}
+
+function finishLiveRecording() {
+    showLoading();
+
+    // Every segment of the recording, should it have to be queued
+    const mimeType = mediaRecorder.mimeType || 'audio/webm';
+    const segments = [...segmentBlobs, { blob: new Blob(audioChunks, { type: mimeType }), overlaps: segmentOverlaps }]
+        .filter(segment => segment.blob.size > 0)
+        .map((segment, i) => ({ ...segment, name: `segment-${i}.${getExtension(mimeType)}` }));
+
+    if (socket.readyState === WebSocket.CLOSING || socket.readyState === WebSocket.CLOSED) {
+        queueRecording(segments);
+        return;
+    }
+
+    let settled = false;
+    socket.onmessage = (event) => {
+        const result = JSON.parse(event.data);
+        if (result.event === 'field') {
+            applyField(result.field, result.value, result.complete);
+            return;
+        }
+        settled = true;
+        if (result.error) {
+            alert("Error processing audio: " + result.error);
+            closeModal();
+            return;
+        }
+        populateForm(result.draft);
+        showRelated(result.related);
+    };
+    socket.onclose = () => {
+        // Lost the connection before the draft arrived: keep the recording for later
+        if (!settled) queueRecording(segments);
+    };
+
+    sendToSocket(JSON.stringify({ type: 'stop', overlaps: segmentOverlaps }));
+}
+
+function showLoading() {
+    saveKey = OfflineQueue.newId();
+    entryForm.reset();
+    showRelated([]);
+    refreshAgenda();
+    reviewModal.classList.add('visible');
+    entryForm.classList.add('hidden');
+    loadingIndicator.classList.remove('hidden');
+}
+
 // Mouse/Touch Events
 recordBtn.addEventListener('mousedown', startRecording);
 recordBtn.addEventListener('touchstart', startRecording);
@@ -97,11 +272,7 @@ async function processAudio() {
     const mimeType = mediaRecorder.mimeType || 'audio/webm';
     console.log(`DEBUG: Recorder MIME type: ${mimeType}`);
     
-    // Simple heuristic to get extension
-    let extension = 'webm';
-    if (mimeType.includes('mp4')) extension = 'mp4';
-    else if (mimeType.includes('ogg')) extension = 'ogg';
-    else if (mimeType.includes('wav')) extension = 'wav';
+    const extension = getExtension(mimeType);
     
     if (audioChunks.length === 0) {
         console.error("ERROR: No audio chunks recorded");
@@ -120,49 +291,173 @@ async function processAudio() {
          return;
     }
     
+    const segments = [{ blob: audioBlob, name: `recording.${extension}` }];
+    if (!navigator.onLine) {
+        queueRecording(segments);
+        return;
+    }
+
     const formData = new FormData();
     formData.append('audio', audioBlob, `recording.${extension}`);
     formData.append('mode', currentMode);
 
     // Show loading UI
-    reviewModal.classList.add('visible');
-    entryForm.classList.add('hidden');
-    loadingIndicator.classList.remove('hidden');
+    showLoading();
     
     try {
-        const response = await fetch('/api/process-audio', {
+        // Streamed: the review form fills in field by field as the draft is generated
+        const response = await fetch('/api/process-audio/stream', {
             method: 'POST',
             body: formData
         });
         
         if (!response.ok) throw new Error('Processing failed');
         
-        const result = await response.json();
-        populateForm(result.draft);
+        let finished = false;
+        await readEventStream(response, (event, data) => {
+            if (event === 'field') {
+                applyField(data.field, data.value, data.complete);
+            } else if (event === 'draft') {
+                finished = true;
+                populateForm(data.draft);
+                showRelated(data.related);
+            } else if (event === 'error') {
+                throw new Error(data.detail);
+            }
+        });
+        if (!finished) throw new Error('Stream ended early');
         
     } catch (err) {
         console.error(err);
+        // fetch rejects with a TypeError when the network is gone
+        if (err instanceof TypeError) {
+            queueRecording(segments);
+            return;
+        }
         alert("Error processing audio: " + err.message);
         closeModal();
     }
 }
 
-function populateForm(data) {
+// Parses a text/event-stream response body, calling onEvent(event, data) per frame
+async function readEventStream(response, onEvent) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+            const frame = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+            let event = 'message';
+            let data = '';
+            frame.split('\n').forEach(line => {
+                if (line.startsWith('event:')) event = line.slice(6).trim();
+                else if (line.startsWith('data:')) data += line.slice(5).trim();
+            });
+            if (data) onEvent(event, JSON.parse(data));
+        }
+    }
+}
+
+function showForm() {
     loadingIndicator.classList.add('hidden');
     entryForm.classList.remove('hidden');
+    eventFields.classList.toggle('hidden', currentMode !== 'event');
+}
+
+// Fills one draft field while it is still being generated
+function applyField(field, value, complete) {
+    showForm();
+    if (field === 'title') {
+        document.getElementById('title').value = value || '';
+    } else if (field === 'content' || field === 'description') {
+        document.getElementById('content').value = value || '';
+    } else if ((field === 'start_time' || field === 'end_time') && complete && value) {
+        // Partial timestamps aren't valid datetime-local values, so wait for the full one
+        document.getElementById(field).value = formatDateTime(value);
+    }
+}
+
+function populateForm(data) {
+    showForm();
     
     document.getElementById('title').value = data.title || '';
     document.getElementById('content').value = data.description || data.content || '';
     
     if (currentMode === 'event') {
-        eventFields.classList.remove('hidden');
         if (data.start_time) document.getElementById('start_time').value = formatDateTime(data.start_time);
         if (data.end_time) document.getElementById('end_time').value = formatDateTime(data.end_time);
-    } else {
-        eventFields.classList.add('hidden');
     }
+    refreshAgenda();
 }
 
+// Lists saved ideas similar to the draft, so duplicates are visible before saving
+function showRelated(related) {
+    relatedList.innerHTML = '';
+    (related || []).forEach(idea => {
+        const item = document.createElement('li');
+        const title = document.createElement(idea.url ? 'a' : 'span');
+        title.textContent = idea.title || 'Untitled';
+        if (idea.url) {
+            title.href = idea.url;
+            title.target = '_blank';
+        }
+        const score = document.createElement('span');
+        score.className = 'score';
+        score.textContent = ` ${Math.round(idea.score * 100)}%`;
+        item.append(title, score);
+        relatedList.appendChild(item);
+    });
+    relatedIdeas.classList.toggle('hidden', relatedList.children.length === 0);
+}
+
+// Lists what's already on the agenda that day (from the server's local mirror),
+// marking events that overlap the draft's time
+let agendaRequest = 0;
+async function refreshAgenda() {
+    const request = ++agendaRequest;
+    const startTime = document.getElementById('start_time').value;
+    const endTime = document.getElementById('end_time').value;
+    let events = [];
+    if (currentMode === 'event' && startTime) {
+        const params = new URLSearchParams({ start_time: startTime });
+        if (endTime) params.set('end_time', endTime);
+        try {
+            const response = await fetch(`/api/agenda?${params}`);
+            if (response.ok) events = (await response.json()).events;
+        } catch (e) {
+            // Offline: the agenda is only a hint, so just leave it out
+        }
+    }
+    // A newer lookup has started since
+    if (request !== agendaRequest) return;
+
+    agendaList.innerHTML = '';
+    events.forEach(event => {
+        const item = document.createElement('li');
+        item.classList.toggle('conflict', event.conflict);
+        const title = document.createElement(event.url ? 'a' : 'span');
+        title.textContent = event.title || 'Untitled';
+        if (event.url) {
+            title.href = event.url;
+            title.target = '_blank';
+        }
+        const time = document.createElement('span');
+        time.className = 'time';
+        time.textContent = event.all_day ? 'All day ' : `${event.start_key.substring(11, 16)} `;
+        item.append(time, title);
+        agendaList.appendChild(item);
+    });
+    agendaDay.classList.toggle('hidden', agendaList.children.length === 0);
+}
+
+document.getElementById('start_time').addEventListener('change', refreshAgenda);
+document.getElementById('end_time').addEventListener('change', refreshAgenda);
+
 function formatDateTime(isoString) {
     if (!isoString) return '';
     // Ensure format is YYYY-MM-DDTHH:MM
@@ -172,7 +467,8 @@ function formatDateTime(isoString) {
 // Modal Actions
 document.getElementById('cancel-btn').addEventListener('click', closeModal);
 
-document.getElementById('confirm-btn').addEventListener('click', async () => {
+const confirmBtn = document.getElementById('confirm-btn');
+confirmBtn.addEventListener('click', async () => {
     const formData = {
         title: document.getElementById('title').value,
         content: document.getElementById('content').value, // Acts as description for event or content for idea
@@ -184,32 +480,155 @@ document.getElementById('confirm-btn').addEventListener('click', async () => {
         formData.end_time = document.getElementById('end_time').value || null;
     }
     
+    const jobId = saveKey;
+    const draftId = reviewingId;
+    confirmBtn.disabled = true;
     try {
         const response = await fetch('/api/save-entry', {
             method: 'POST',
-            headers: { 'Content-Type': 'application/json' },
+            headers: { 'Content-Type': 'application/json', 'Idempotency-Key': jobId },
             body: JSON.stringify({
                 mode: currentMode,
-                data: formData
+                data: formData,
+                job_id: jobId
             })
         });
         
+        // Treated like a lost connection: the entry is kept and retried later
+        if (response.status === 429 || response.status >= 500) throw new TypeError('Server unavailable');
         if (!response.ok) throw new Error('Save failed');
         
-        alert('Saved successfully!');
+        // The entry is queued server-side; Notion is written in the background
+        const result = await response.json();
+        if (draftId) await OfflineQueue.remove(draftId);
         closeModal();
-        statusText.textContent = "Saved! Hold to record again.";
+        statusText.textContent = "Queued! Saving to Notion...";
+        watchJob(result.job_id);
         
     } catch (err) {
         console.error(err);
-        alert("Error saving: " + err.message);
+        if (!(err instanceof TypeError)) {
+            alert("Error saving: " + err.message);
+            return;
+        }
+        // No connection: keep the confirmed entry and send it when we're back online
+        await OfflineQueue.put({ id: jobId, kind: 'save', createdAt: Date.now(), mode: currentMode, data: formData });
+        if (draftId) await OfflineQueue.remove(draftId);
+        closeModal();
+        statusText.textContent = "Saved offline. Will sync when back online.";
+        queueChanged();
+    } finally {
+        confirmBtn.disabled = false;
     }
 });
 
+async function watchJob(jobId) {
+    while (true) {
+        await new Promise(resolve => setTimeout(resolve, 2000));
+        let job;
+        try {
+            const response = await fetch(`/api/jobs/${jobId}`);
+            if (!response.ok) return;
+            job = await response.json();
+        } catch (err) {
+            continue;
+        }
+        if (job.status === 'succeeded') {
+            if (!reviewModal.classList.contains('visible') && !isRecording) {
+                statusText.textContent = "Saved! Hold to record again.";
+            }
+            return;
+        }
+        if (job.status === 'failed') {
+            alert("Error saving to Notion: " + job.last_error);
+            return;
+        }
+    }
+}
+
 function closeModal() {
     reviewModal.classList.remove('visible');
+    reviewingId = null;
     statusText.textContent = `Hold to record ${currentMode}...`;
+    updateQueueStatus();
+}
+
+// Offline queue (see offline-queue.js): recordings and saves made without a connection
+async function queueRecording(segments) {
+    if (segments.length === 0) {
+        alert("Error: No audio recorded. Please hold the button longer.");
+        closeModal();
+        return;
+    }
+    await OfflineQueue.add('recording', { mode: currentMode, segments });
+    closeModal();
+    statusText.textContent = "Recorded offline. Will process when back online.";
+    queueChanged();
+}
+
+function queueChanged() {
+    updateQueueStatus();
+    // Lets the service worker send the queue even if this page is closed first
+    if ('serviceWorker' in navigator) {
+        navigator.serviceWorker.ready
+            .then(registration => registration.sync && registration.sync.register('offline-queue'))
+            .catch(() => {});
+    }
+    flushQueue();
+}
+
+async function flushQueue() {
+    if (!navigator.onLine) return;
+    try {
+        await OfflineQueue.flush();
+    } catch (err) {
+        console.log(`DEBUG: Offline queue not sent yet: ${err.message}`);
+    }
+    updateQueueStatus();
+}
+
+async function updateQueueStatus() {
+    const counts = await OfflineQueue.counts();
+    const parts = [];
+    if (counts.drafts) parts.push(`${counts.drafts} draft${counts.drafts > 1 ? 's' : ''} to review`);
+    const waiting = counts.recordings + counts.saves;
+    if (waiting) parts.push(`${waiting} waiting to upload`);
+    queueStatus.textContent = parts.join(' · ');
+    queueStatus.classList.toggle('hidden', parts.length === 0);
+    queueStatus.classList.toggle('actionable', counts.drafts > 0);
+}
+
+// Opens the oldest processed recording from the queue in the review modal
+async function reviewNextDraft() {
+    if (reviewModal.classList.contains('visible') || isRecording) return;
+    const drafts = await OfflineQueue.list('draft');
+    for (const item of drafts) {
+        if (!item.draft || Object.keys(item.draft).length === 0) {
+            // Nothing was said in that recording
+            await OfflineQueue.remove(item.id);
+            continue;
+        }
+        setMode(item.mode);
+        showLoading();
+        reviewingId = item.id;
+        populateForm(item.draft);
+        showRelated(item.related);
+        return;
+    }
+    updateQueueStatus();
+}
+
+queueStatus.addEventListener('click', reviewNextDraft);
+window.addEventListener('online', flushQueue);
+setInterval(flushQueue, 30000);
+
+if ('serviceWorker' in navigator) {
+    navigator.serviceWorker.register('/sw.js').catch(err => console.log(`DEBUG: Service worker not registered: ${err}`));
+    navigator.serviceWorker.addEventListener('message', event => {
+        if (event.data && event.data.type === 'queue-changed') updateQueueStatus();
+    });
 }
 
 // Initialize
 initAudio();
+flushQueue();
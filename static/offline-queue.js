@@ -0,0 +1,132 @@
+// Offline capture queue, kept in IndexedDB so nothing is lost while the server is unreachable.
+// Shared by the page and the service worker (no DOM access here). Item kinds:
+//   recording: audio segments waiting to be transcribed  {mode, segments: [{blob, name, overlaps}]}
+//   draft:     a processed recording waiting for review  {mode, transcription, draft, related}
+//   save:      a confirmed entry waiting to be sent      {mode, data}
+// Every item carries a client-generated id, sent as the Idempotency-Key (and job id), so
+// replaying an item that already reached the server doesn't process it twice.
+const OfflineQueue = (() => {
+    const DB_NAME = 'ai-logger';
+    const STORE = 'queue';
+    // Confirmed saves sent per /api/save-entries request
+    const SAVE_BATCH = 50;
+    let dbPromise = null;
+    let flushing = null;
+
+    function openDb() {
+        if (!dbPromise) {
+            dbPromise = new Promise((resolve, reject) => {
+                const request = indexedDB.open(DB_NAME, 1);
+                request.onupgradeneeded = () => {
+                    const store = request.result.createObjectStore(STORE, { keyPath: 'id' });
+                    store.createIndex('kind', 'kind');
+                };
+                request.onsuccess = () => resolve(request.result);
+                request.onerror = () => reject(request.error);
+            });
+        }
+        return dbPromise;
+    }
+
+    async function run(mode, fn) {
+        const db = await openDb();
+        return new Promise((resolve, reject) => {
+            const tx = db.transaction(STORE, mode);
+            const result = fn(tx.objectStore(STORE));
+            tx.oncomplete = () => resolve(result && 'result' in result ? result.result : undefined);
+            tx.onerror = () => reject(tx.error);
+        });
+    }
+
+    function newId() {
+        if (self.crypto && crypto.randomUUID) return crypto.randomUUID().replace(/-/g, '');
+        return Date.now().toString(36) + Math.random().toString(36).slice(2, 12);
+    }
+
+    function put(item) {
+        return run('readwrite', store => store.put(item)).then(() => item);
+    }
+
+    function add(kind, fields) {
+        return put({ id: newId(), kind, createdAt: Date.now(), ...fields });
+    }
+
+    function remove(id) {
+        return run('readwrite', store => store.delete(id));
+    }
+
+    async function list(kind) {
+        const items = await run('readonly', store => store.index('kind').getAll(kind));
+        return items.sort((a, b) => a.createdAt - b.createdAt);
+    }
+
+    async function counts() {
+        const [recordings, drafts, saves] = await Promise.all([list('recording'), list('draft'), list('save')]);
+        return { recordings: recordings.length, drafts: drafts.length, saves: saves.length };
+    }
+
+    // Server errors (and no connection at all) are worth retrying later; anything else isn't
+    function retryable(response) {
+        return response.status === 429 || response.status >= 500;
+    }
+
+    async function uploadRecording(item) {
+        const formData = new FormData();
+        item.segments.forEach(segment => formData.append('audio', segment.blob, segment.name));
+        formData.append('mode', item.mode);
+        // Live segments overlap the one before, so the server can drop the repeated words
+        formData.append('overlaps', item.segments.map(segment => segment.overlaps ? '1' : '0').join(','));
+        const response = await fetch('/api/process-audio', {
+            method: 'POST',
+            headers: { 'Idempotency-Key': item.id },
+            body: formData
+        });
+        if (!response.ok) {
+            if (retryable(response)) throw new Error(`Upload failed (${response.status})`);
+            console.error(`Dropping queued recording ${item.id}: ${response.status}`);
+            await remove(item.id);
+            return;
+        }
+        const result = await response.json();
+        // Replaces the recording: the audio isn't needed once it has a draft
+        await put({ id: item.id, kind: 'draft', createdAt: item.createdAt, mode: item.mode, ...result });
+    }
+
+    async function sendSaves(items) {
+        const response = await fetch('/api/save-entries', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({
+                items: items.map(item => ({ mode: item.mode, data: item.data, job_id: item.id })),
+                // The server queue takes over once it has the items
+                wait: 0
+            })
+        });
+        if (!response.ok) {
+            if (retryable(response)) throw new Error(`Save failed (${response.status})`);
+            console.error(`Dropping ${items.length} queued saves: ${response.status}`);
+            await Promise.all(items.map(item => remove(item.id)));
+            return;
+        }
+        const result = await response.json();
+        await Promise.all(result.results.map(outcome => {
+            if (outcome.status === 'rejected') console.error(`Queued save rejected: ${outcome.error}`);
+            return remove(items[outcome.index].id);
+        }));
+    }
+
+    // Sends everything that's queued, oldest first. Stops at the first network failure and
+    // leaves the rest for the next attempt. Concurrent calls share one run.
+    function flush() {
+        if (!flushing) {
+            flushing = (async () => {
+                for (const item of await list('recording')) await uploadRecording(item);
+                const saves = await list('save');
+                for (let i = 0; i < saves.length; i += SAVE_BATCH) await sendSaves(saves.slice(i, i + SAVE_BATCH));
+            })().finally(() => { flushing = null; });
+        }
+        return flushing;
+    }
+
+    return { add, put, remove, list, counts, flush, newId };
+})();
@@ -0,0 +1,49 @@
+// Service worker: keeps the app shell available offline and sends the offline queue
+// (see offline-queue.js) in the background once the connection is back.
+importScripts('offline-queue.js');
+
+const CACHE = 'ai-logger-v1';
+const ASSETS = ['/', '/index.html', '/style.css', '/app.js', '/offline-queue.js'];
+
+self.addEventListener('install', event => {
+    event.waitUntil(caches.open(CACHE).then(cache => cache.addAll(ASSETS)).then(() => self.skipWaiting()));
+});
+
+self.addEventListener('activate', event => {
+    event.waitUntil(
+        caches.keys()
+            .then(keys => Promise.all(keys.filter(key => key !== CACHE).map(key => caches.delete(key))))
+            .then(() => self.clients.claim())
+    );
+});
+
+// Static assets: network first, so updates show up as soon as the server is reachable,
+// falling back to the precached copy. API calls are never cached.
+self.addEventListener('fetch', event => {
+    const url = new URL(event.request.url);
+    if (event.request.method !== 'GET' || url.origin !== location.origin || url.pathname.startsWith('/api/')) {
+        return;
+    }
+    event.respondWith(
+        fetch(event.request)
+            .then(response => {
+                if (response.ok) {
+                    const copy = response.clone();
+                    caches.open(CACHE).then(cache => cache.put(event.request, copy));
+                }
+                return response;
+            })
+            .catch(() => caches.match(event.request, { ignoreSearch: true }))
+    );
+});
+
+// Background Sync (where supported) retries the queue even if the page was closed
+self.addEventListener('sync', event => {
+    if (event.tag !== 'offline-queue') return;
+    event.waitUntil(
+        OfflineQueue.flush().finally(async () => {
+            const clients = await self.clients.matchAll();
+            clients.forEach(client => client.postMessage({ type: 'queue-changed' }));
+        })
+    );
+});
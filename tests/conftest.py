@@ -0,0 +1,85 @@
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+import pytest
+
+# Services read their settings when imported, so these have to be set first. Every
+# on-disk store goes to a throwaway directory.
+_TMP = tempfile.mkdtemp(prefix="ai_logger_tests_")
+os.environ.update({
+    "SUPER_MIND_API_KEY": "test",
+    "NOTION_TOKEN": "test",
+    "AGENDA_DATABASE_ID": "agenda",
+    "JOURNAL_DATABASE_ID": "journal",
+    "SAVE_QUEUE_DB": os.path.join(_TMP, "save_queue.db"),
+    "SEARCH_INDEX_DB": os.path.join(_TMP, "search_index.db"),
+    "NOTION_INDEX_DB": os.path.join(_TMP, "notion_index.db"),
+    "AGENDA_MIRROR_DB": os.path.join(_TMP, "agenda_mirror.db"),
+    "RELATED_IDEAS_PATH": os.path.join(_TMP, "related_ideas"),
+    "AGENDA_REFRESH_INTERVAL": "0",
+    "LOG_LEVEL": "WARNING",
+})
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import uvicorn
+
+from benchmarks import stubs
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@contextmanager
+def run_stub(**options):
+    """
+    Serves benchmarks.stubs.create_app(**options) on a local port from a background thread.
+    Yields (stub app, base URL); the stub's counters are in app.state.stats.
+    """
+    app = stubs.create_app(**options)
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        if not thread.is_alive():
+            raise RuntimeError("stub server failed to start")
+        time.sleep(0.01)
+    try:
+        yield app, f"http://127.0.0.1:{port}"
+    finally:
+        server.should_exit = True
+        thread.join()
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    """
+    Starts a stub server and points the AI and Notion services at it:
+    `app = stub(latency=0.2, ...)`.
+    """
+    from services import ai_service, notion_service
+
+    servers = []
+
+    def start(**options):
+        context = run_stub(**options)
+        app, base_url = context.__enter__()
+        servers.append(context)
+        monkeypatch.setattr(ai_service, "BASE_URL", f"{base_url}/v1")
+        monkeypatch.setattr(notion_service, "BASE_URL", f"{base_url}/notion/v1")
+        # Clients are bound to the event loop that created them; every test runs its own
+        ai_service._client = None
+        notion_service._client = None
+        return app
+
+    yield start
+    for context in reversed(servers):
+        context.__exit__(None, None, None)
@@ -0,0 +1,117 @@
+import asyncio
+import os
+
+import httpx
+import pytest
+
+import main
+from services import agenda_mirror, notion_service
+from services.agenda_mirror import AgendaMirror, overlaps, parse_time
+
+
+@pytest.fixture
+def mirror(tmp_path):
+    mirror = AgendaMirror(os.path.join(tmp_path, "agenda.db"))
+    yield mirror
+    mirror.close()
+
+
+def ids(events):
+    return [event["id"] for event in events]
+
+
+def day(value):
+    return parse_time(value)[0], parse_time(value, end=True)[0]
+
+
+def test_parse_time():
+    assert parse_time("2026-03-05") == ("2026-03-05T00:00:00", True)
+    # A date-only end includes that day
+    assert parse_time("2026-03-05", end=True) == ("2026-03-06T00:00:00", True)
+    assert parse_time("2026-12-31", end=True) == ("2027-01-01T00:00:00", True)
+    # Wall-clock time, with the UTC offset dropped
+    assert parse_time("2026-03-05T09:30:00.000+08:00") == ("2026-03-05T09:30:00", False)
+    assert parse_time("2026-03-05 09:30", end=True) == ("2026-03-05T09:30:00", False)
+    for value in ["", "tomorrow", "2026-02-30", "2026-03-05T24:00", "2026-03-05T09:60"]:
+        with pytest.raises(ValueError):
+            parse_time(value)
+
+
+def test_overlaps_is_half_open():
+    nine, half_past, ten, eleven = (f"2026-03-05T{time}:00" for time in ("09:00", "09:30", "10:00", "11:00"))
+    assert overlaps(nine, ten, half_past, eleven)
+    # Back to back meetings don't clash
+    assert not overlaps(nine, ten, ten, eleven)
+    assert not overlaps(ten, eleven, nine, ten)
+    # Instants: inside an interval, at its start, or at the same time as another instant
+    assert overlaps(half_past, half_past, nine, ten)
+    assert overlaps(nine, ten, half_past, half_past)
+    assert overlaps(nine, nine, nine, ten)
+    assert overlaps(ten, ten, ten, ten)
+    assert not overlaps(ten, ten, nine, ten)
+
+
+def test_range(mirror):
+    mirror.upsert_event("meeting", "Meeting", "2026-03-05T09:00:00+08:00", "2026-03-05T10:00:00+08:00")
+    mirror.upsert_event("call", "Call", "2026-03-05T10:00:00")
+    mirror.upsert_event("trip", "Trip", "2026-03-05", "2026-03-07")
+    mirror.upsert_event("birthday", "Birthday", "2026-03-08")
+    mirror.upsert_event("late", "Late", "2026-03-05T23:30:00", "2026-03-06T01:00:00")
+    assert ids(mirror.range(*day("2026-03-05"))) == ["trip", "meeting", "call", "late"]
+    assert ids(mirror.range(*day("2026-03-06"))) == ["trip", "late"]
+    # The end date of an all-day event is inclusive, and the next day is clear
+    assert ids(mirror.range(*day("2026-03-07"))) == ["trip"]
+    assert ids(mirror.range(*day("2026-03-08"))) == ["birthday"]
+    # A meeting that ended as the range starts isn't in it; an instant at its start is
+    assert ids(mirror.range("2026-03-05T10:00:00", "2026-03-05T10:30:00")) == ["trip", "call"]
+    assert ids(mirror.range("2026-03-05T00:00:00", "2026-03-06T00:00:00", limit=2)) == ["trip", "meeting"]
+
+
+def test_range_looks_back_as_far_as_the_longest_event(mirror):
+    mirror.upsert_event("holiday", "Holiday", "2026-02-20", "2026-03-10")
+    mirror.upsert_event("past", "Past", "2026-02-21T09:00:00", "2026-02-21T10:00:00")
+    assert ids(mirror.range("2026-03-05T00:00:00", "2026-03-06T00:00:00")) == ["holiday"]
+    mirror.upsert_pages([{"id": "holiday", "archived": True, "properties": {}}])
+    assert mirror.range("2026-03-05T00:00:00", "2026-03-06T00:00:00") == []
+
+
+def drive_app(requests):
+    async def run():
+        async with main.app.router.lifespan_context(main.app):
+            transport = httpx.ASGITransport(app=main.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://app.test") as client:
+                return await requests(client)
+
+    return asyncio.run(run())
+
+
+def test_agenda_flags_conflicts_with_a_draft(stub, tmp_path, monkeypatch):
+    # Eight one-hour events a day from 08:00 on 2026-01-01, event 9 all-day on 2026-01-02
+    stub(agenda_events=16)
+    monkeypatch.setattr(agenda_mirror, "AGENDA_MIRROR_DB", os.path.join(tmp_path, "agenda.db"))
+    monkeypatch.setattr(agenda_mirror, "_mirror", None)
+
+    async def requests(client):
+        assert await notion_service.sync_agenda(full=True) == 16
+        agenda_mirror.get_mirror().upsert_event("reminder", "Reminder", "2026-01-02T17:00:00")
+        timed = await client.get("/api/agenda", params={
+            "start_time": "2026-01-01T08:30:00+08:00", "end_time": "2026-01-01T09:30:00+08:00"})
+        instant = await client.get("/api/agenda", params={"start_time": "2026-01-02T10:30:00"})
+        around_reminder = await client.get("/api/agenda", params={
+            "start_time": "2026-01-02T16:30:00", "end_time": "2026-01-02T17:30:00"})
+        invalid = await client.get("/api/agenda", params={"start_time": "2026-02-30T10:00:00"})
+        return timed, instant, around_reminder, invalid
+
+    timed, instant, around_reminder, invalid = drive_app(requests)
+    assert timed.status_code == 200
+    body = timed.json()
+    assert body["from"] == "2026-01-01T00:00:00" and body["to"] == "2026-01-02T00:00:00"
+    assert len(body["events"]) == 8
+    assert body["conflicts"] == ["event-000000", "event-000001"]
+    # The all-day event that day is listed but isn't a conflict
+    body = instant.json()
+    assert "event-000009" in ids(body["events"])
+    assert body["conflicts"] == ["event-000010"]
+    # A point-in-time event inside the draft's range, after the last meeting of the day
+    assert around_reminder.json()["conflicts"] == ["reminder"]
+    assert invalid.status_code == 400
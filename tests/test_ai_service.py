@@ -0,0 +1,130 @@
+import asyncio
+import time
+from collections import deque
+
+import pytest
+
+from services import ai_service
+from services.ai_service import RetryableAIError
+
+TEXT = "an idea about testing the draft step"
+
+
+@pytest.fixture(autouse=True)
+def llm_policy(monkeypatch):
+    monkeypatch.setattr(ai_service, "_backoff", lambda attempt: 0.0)
+    monkeypatch.setattr(ai_service, "LLM_ATTEMPT_TIMEOUT", 0.5)
+    monkeypatch.setattr(ai_service, "LLM_MAX_ATTEMPTS", 3)
+    monkeypatch.setattr(ai_service, "LLM_HEDGE", False)
+    monkeypatch.setattr(ai_service, "_llm_latencies", deque(maxlen=200))
+
+
+def run(coro_function, *args):
+    async def main():
+        try:
+            start = time.perf_counter()
+            result = await coro_function(*args)
+            return result, time.perf_counter() - start
+        finally:
+            await ai_service.close_client()
+
+    return asyncio.run(main())
+
+
+async def draft():
+    return await ai_service.process_idea_text(TEXT, use_cache=False)
+
+
+async def streamed_draft():
+    events = [event async for event in ai_service.stream_draft("idea", TEXT, use_cache=False)]
+    assert events[-1]["event"] == "draft"
+    return events
+
+
+def test_server_errors_are_retried(stub):
+    app = stub(fail_first={"chat": 2})
+    result, _ = run(draft)
+    assert result["title"] == "Stub"
+    assert app.state.stats["errors"] == 2
+    assert app.state.stats["chat"] == 1
+
+
+def test_gives_up_after_max_attempts(stub):
+    app = stub(fail_first={"chat": 10})
+    with pytest.raises(RetryableAIError):
+        run(draft)
+    assert app.state.stats["errors"] == 3
+
+
+def test_slow_attempts_time_out_and_are_retried(stub):
+    app = stub(chat_slow_first=1, chat_slow_latency=2)
+    result, elapsed = run(draft)
+    assert result["title"] == "Stub"
+    assert app.state.stats["chat"] == 2
+    assert 0.5 <= elapsed < 2
+
+
+def test_replies_that_are_not_json_are_retried(stub):
+    app = stub(chat_garbage_first=1)
+    result, _ = run(draft)
+    assert result["title"] == "Stub"
+    assert app.state.stats["chat_garbage"] == 1
+    assert app.state.stats["chat"] == 2
+
+
+def test_hedged_request_beats_a_slow_attempt(stub, monkeypatch):
+    monkeypatch.setattr(ai_service, "LLM_HEDGE", True)
+    monkeypatch.setattr(ai_service, "LLM_HEDGE_DELAY", 0.1)
+    monkeypatch.setattr(ai_service, "LLM_ATTEMPT_TIMEOUT", 10)
+    app = stub(chat_slow_first=1, chat_slow_latency=2)
+    result, elapsed = run(draft)
+    assert result["title"] == "Stub"
+    assert app.state.stats["chat"] == 2
+    # The hedge answered; nobody waited for the slow attempt or a timeout
+    assert elapsed < 1
+
+
+def test_cancelling_a_hedged_call_cancels_its_attempts(monkeypatch):
+    monkeypatch.setattr(ai_service, "LLM_HEDGE", True)
+    monkeypatch.setattr(ai_service, "LLM_HEDGE_DELAY", 10)
+
+    async def main():
+        started = asyncio.Event()
+        cancelled = asyncio.Event()
+
+        async def attempt(payload):
+            started.set()
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        monkeypatch.setattr(ai_service, "_completion_attempt", attempt)
+        # Cancelled while still waiting for the hedge delay
+        caller = asyncio.create_task(ai_service._hedged_attempt({}))
+        await started.wait()
+        caller.cancel()
+        await asyncio.wait_for(cancelled.wait(), 1)
+        with pytest.raises(asyncio.CancelledError):
+            await caller
+
+    asyncio.run(main())
+
+
+def test_stream_is_retried_before_the_first_token(stub):
+    app = stub(fail_first={"chat": 1}, chat_slow_first=1, chat_slow_latency=2)
+    events, elapsed = run(streamed_draft)
+    # 503, then a reply too slow to start, then a streamed draft
+    assert app.state.stats["errors"] == 1
+    assert app.state.stats["chat"] == 2
+    assert [event for event in events if event["event"] == "field"]
+    assert events[-1]["draft"]["title"] == "Stub"
+    assert elapsed < 2
+
+
+def test_stream_gives_up_after_max_attempts(stub):
+    app = stub(fail_first={"chat": 10})
+    with pytest.raises(RetryableAIError):
+        run(streamed_draft)
+    assert app.state.stats["errors"] == 3
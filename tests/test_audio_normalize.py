@@ -0,0 +1,140 @@
+import asyncio
+import io
+import wave
+
+import numpy as np
+import pytest
+
+from services import audio_normalize
+from services.audio_normalize import SAMPLE_RATE, decode_wav, split_segments, trim_silence
+
+PADDING = audio_normalize._PADDING
+OVERLAP = audio_normalize._OVERLAP
+
+
+def tone(seconds, amplitude=0.5, rate=SAMPLE_RATE, frequency=440.0):
+    t = np.arange(int(seconds * rate)) / rate
+    return (amplitude * np.sin(2 * np.pi * frequency * t)).astype(np.float32)
+
+
+def silence(seconds, rate=SAMPLE_RATE):
+    return np.zeros(int(seconds * rate), dtype=np.float32)
+
+
+def wav(channels, rate, width=2):
+    """
+    A WAV file of `channels` (float arrays of equal length), at the given rate and sample width.
+    """
+    frames = np.stack(channels, axis=1)
+    if width == 1:
+        raw = (frames * 127 + 128).astype(np.uint8).tobytes()
+    elif width == 3:
+        values = (frames * (2 ** 23 - 1)).astype("<i4")
+        raw = values.view(np.uint8).reshape(-1, 4)[:, :3].tobytes()
+    else:
+        raw = (frames * (2 ** (8 * width - 1) - 1)).astype(f"<i{width}").tobytes()
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as writer:
+        writer.setnchannels(len(channels))
+        writer.setsampwidth(width)
+        writer.setframerate(rate)
+        writer.writeframes(raw)
+    buffer.seek(0)
+    return buffer
+
+
+def rms(samples):
+    return float(np.sqrt(np.mean(np.square(samples))))
+
+
+@pytest.mark.parametrize("rate, width", [(16000, 2), (8000, 1), (22050, 2), (44100, 3), (48000, 4)])
+def test_decode_mono_wav(rate, width):
+    samples = decode_wav(wav([tone(1.0, rate=rate)], rate, width))
+    assert samples.dtype == np.float32
+    assert abs(len(samples) - SAMPLE_RATE) <= 1
+    # A 0.5 sine has an RMS of 0.5 / sqrt(2)
+    assert rms(samples) == pytest.approx(0.5 / np.sqrt(2), rel=0.02)
+
+
+def test_decode_stereo_wav_mixes_down():
+    left, right = tone(0.5, 0.6, rate=48000), tone(0.5, 0.2, rate=48000)
+    samples = decode_wav(wav([left, right], 48000))
+    assert len(samples) == SAMPLE_RATE // 2
+    assert rms(samples) == pytest.approx(0.4 / np.sqrt(2), rel=0.02)
+    # Opposite channels cancel out
+    assert rms(decode_wav(wav([left, -left], 48000))) < 1e-3
+
+
+def test_trim_silence_keeps_padding_around_speech():
+    samples = np.concatenate([silence(1.0), tone(1.0), silence(1.0)])
+    trimmed = trim_silence(samples)
+    assert len(trimmed) == SAMPLE_RATE + 2 * PADDING
+    assert np.array_equal(trimmed, samples[SAMPLE_RATE - PADDING:2 * SAMPLE_RATE + PADDING])
+
+
+def test_trim_silence_treats_quiet_noise_as_silence():
+    rng = np.random.default_rng(0)
+    noise = (rng.standard_normal(3 * SAMPLE_RATE) * 10 ** (-60 / 20)).astype(np.float32)
+    samples = noise.copy()
+    samples[SAMPLE_RATE:2 * SAMPLE_RATE] += tone(1.0)
+    assert len(trim_silence(samples)) == SAMPLE_RATE + 2 * PADDING
+    # Noise alone is silence
+    assert trim_silence(noise).size == 0
+    assert trim_silence(silence(1.0)).size == 0
+
+
+def test_trim_silence_is_relative_to_the_loudest_frame(monkeypatch):
+    monkeypatch.setattr(audio_normalize, "AUDIO_SILENCE_DB", -80)
+    # About 50 dB below the tone: background, even though it's above the absolute threshold
+    quiet = tone(1.0, 0.002)
+    samples = np.concatenate([quiet, tone(1.0), quiet])
+    assert len(trim_silence(samples)) == SAMPLE_RATE + 2 * PADDING
+    assert len(trim_silence(quiet)) == len(quiet)
+
+
+def test_short_clips_are_one_segment(monkeypatch):
+    monkeypatch.setattr(audio_normalize, "AUDIO_SEGMENT_SECONDS", 6)
+    assert split_segments(tone(6.0)) == [(0, 6 * SAMPLE_RATE, False)]
+
+
+def test_segments_are_cut_at_pauses(monkeypatch):
+    monkeypatch.setattr(audio_normalize, "AUDIO_SEGMENT_SECONDS", 6)
+    # Pauses 5 and 10 seconds in, where a segment can be cut
+    samples = np.concatenate([tone(5.0), silence(0.5), tone(4.5), silence(0.5), tone(3.0)])
+    bounds = split_segments(samples)
+    assert len(bounds) == 3
+    assert not any(overlaps for _, _, overlaps in bounds)
+    # Back to back, each cut inside a pause
+    assert bounds[0][0] == 0 and bounds[-1][1] == len(samples)
+    for (_, end, _), (start, _, _) in zip(bounds, bounds[1:]):
+        assert end == start
+    assert 5 * SAMPLE_RATE <= bounds[0][1] <= 5.5 * SAMPLE_RATE
+    assert 10 * SAMPLE_RATE <= bounds[1][1] <= 10.5 * SAMPLE_RATE
+
+
+def test_segments_without_pauses_overlap(monkeypatch):
+    monkeypatch.setattr(audio_normalize, "AUDIO_SEGMENT_SECONDS", 6)
+    limit = 6 * SAMPLE_RATE
+    samples = tone(15.0)
+    bounds = split_segments(samples)
+    assert len(bounds) >= 3
+    assert bounds[0] == (0, bounds[0][1], False)
+    assert all(overlaps for _, _, overlaps in bounds[1:])
+    assert all(end - start <= limit for start, end, _ in bounds)
+    for (_, end, _), (start, _, _) in zip(bounds, bounds[1:]):
+        assert end - start == OVERLAP
+    assert bounds[-1][1] == len(samples)
+
+
+def test_wav_is_normalized_without_ffmpeg(monkeypatch):
+    monkeypatch.setattr(audio_normalize, "ffmpeg_available", lambda: False)
+    audio = wav([np.concatenate([silence(2.0, 44100), tone(1.0, rate=44100), silence(2.0, 44100)])], 44100)
+    [(normalized, filename, content_type, overlaps)] = asyncio.run(
+        audio_normalize.normalize(audio, "memo.wav", "audio/wav"))
+    assert (filename, content_type, overlaps) == ("memo.wav", "audio/wav", False)
+    with wave.open(normalized, "rb") as reader:
+        assert (reader.getnchannels(), reader.getframerate()) == (1, SAMPLE_RATE)
+        assert abs(reader.getnframes() - (SAMPLE_RATE + 2 * PADDING)) <= audio_normalize._FRAME
+
+    # Silence throughout is nothing to transcribe
+    assert asyncio.run(audio_normalize.normalize(wav([silence(1.0)], 16000), "memo.wav", "audio/wav")) == []
@@ -0,0 +1,170 @@
+import asyncio
+import os
+
+import pytest
+
+from services import cache
+from services.cache import Cache, LRUCache, SQLiteCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache.time, "time", clock)
+    return clock
+
+
+def test_lru_evicts_least_recently_used():
+    lru = LRUCache(2)
+    lru.set("a", 1)
+    lru.set("b", 2)
+    assert lru.get("a") == 1
+    lru.set("c", 3)
+    assert lru.get("b") is None
+    assert lru.get("a") == 1
+    assert lru.get("c") == 3
+    assert len(lru) == 2
+
+
+def test_lru_entries_expire(clock):
+    lru = LRUCache(10, ttl=60)
+    lru.set("a", 1)
+    clock.now += 59
+    assert lru.get("a") == 1
+    clock.now += 2
+    assert lru.get("a") is None
+    assert len(lru) == 0
+
+
+def test_sqlite_expiry_and_byte_budget(tmp_path, clock):
+    disk = SQLiteCache(os.path.join(tmp_path, "cache.db"), ttl=60, max_bytes=250)
+    value = "x" * 98  # 100 bytes as JSON
+    disk.set("a", value)
+    clock.now += 1
+    disk.set("b", value)
+    clock.now += 1
+    # Reading "a" makes "b" the least recently read
+    assert disk.get("a") == value
+    clock.now += 1
+    disk.set("c", value)
+    assert disk.get("b") is None
+    assert disk.get("a") == value
+    assert disk.get("c") == value
+    assert disk.total_bytes() <= 250
+
+    clock.now += 61
+    assert disk.get("a") is None
+    disk.close()
+
+
+def test_disk_tier_survives_a_new_memory_tier(tmp_path):
+    path = os.path.join(tmp_path, "cache.db")
+
+    async def compute():
+        return {"text": "hello"}
+
+    first = Cache(10, disk=SQLiteCache(path))
+    assert asyncio.run(first.get_or_compute("k", compute)) == {"text": "hello"}
+    first.disk.close()
+
+    second = Cache(10, disk=SQLiteCache(path))
+
+    async def fail():
+        raise AssertionError("should have come from disk")
+
+    assert asyncio.run(second.get_or_compute("k", fail)) == {"text": "hello"}
+    assert second.stats()["disk_hits"] == 1
+    second.disk.close()
+
+
+def test_concurrent_lookups_compute_once():
+    store = Cache(10)
+    calls = 0
+
+    async def compute():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return "value"
+
+    async def run():
+        return await asyncio.gather(*[store.get_or_compute("k", compute) for _ in range(20)])
+
+    assert asyncio.run(run()) == ["value"] * 20
+    assert calls == 1
+    assert store.stats()["coalesced"] == 19
+    assert store.stats()["inflight"] == 0
+
+
+def test_cancelled_leader_does_not_cancel_followers():
+    store = Cache(10)
+    calls = 0
+
+    async def compute():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return "value"
+
+    async def run():
+        leader = asyncio.create_task(store.get_or_compute("k", compute))
+        await asyncio.sleep(0)
+        followers = [asyncio.create_task(store.get_or_compute("k", compute)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        results = await asyncio.gather(*followers)
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return results
+
+    assert asyncio.run(run()) == ["value"] * 3
+    assert calls == 1
+    assert store.get("k") == "value"
+
+
+def test_compute_is_cancelled_when_nobody_waits():
+    store = Cache(10)
+
+    async def run():
+        stopped = asyncio.Event()
+
+        async def compute():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                stopped.set()
+                raise
+
+        waiters = [asyncio.create_task(store.get_or_compute("k", compute)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        for waiter in waiters:
+            waiter.cancel()
+        await asyncio.wait_for(stopped.wait(), 1)
+        return store.stats()["inflight"]
+
+    assert asyncio.run(run()) == 0
+
+
+def test_failures_are_not_cached():
+    store = Cache(10)
+    attempts = 0
+
+    async def flaky():
+        nonlocal attempts
+        attempts += 1
+        if attempts == 1:
+            raise ValueError("upstream down")
+        return "value"
+
+    with pytest.raises(ValueError):
+        asyncio.run(store.get_or_compute("k", flaky))
+    assert asyncio.run(store.get_or_compute("k", flaky)) == "value"
+    assert attempts == 2
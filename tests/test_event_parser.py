@@ -0,0 +1,79 @@
+import datetime as dt
+
+import pytest
+
+from services.event_parser import parse_event
+
+# A Wednesday
+TODAY = dt.date(2026, 10, 14)
+
+
+def times(text):
+    draft = parse_event(text, TODAY)
+    assert draft is not None, text
+    return draft["title"], draft["start_time"], draft["end_time"]
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("dentist tomorrow at 3pm", ("Dentist", "2026-10-15T15:00:00", None)),
+    ("明天下午三点看牙医", ("看牙医", "2026-10-15T15:00:00", None)),
+    ("next Friday 10-11am standup", ("Standup", "2026-10-23T10:00:00", "2026-10-23T11:00:00")),
+    ("remind me to call mom on Sunday at 6:30 pm", ("Call mom", "2026-10-18T18:30:00", None)),
+    ("dinner May 5 at 7pm", ("Dinner", "2026-05-05T19:00:00", None)),
+    ("下周三上午十点半开会", ("开会", "2026-10-21T10:30:00", None)),
+])
+def test_simple_events(text, expected):
+    assert times(text) == expected
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("lunch 11-1pm", ("2026-10-14T11:00:00", "2026-10-14T13:00:00")),
+    ("review 11am-1pm", ("2026-10-14T11:00:00", "2026-10-14T13:00:00")),
+    ("workshop 10am-2", ("2026-10-14T10:00:00", "2026-10-14T14:00:00")),
+    ("明天上午十一点到下午一点开会", ("2026-10-15T11:00:00", "2026-10-15T13:00:00")),
+])
+def test_ranges_across_noon(text, expected):
+    assert times(text)[1:] == expected
+
+
+@pytest.mark.parametrize("text", [
+    "dentist at 5",
+    "dentist tomorrow 5",
+    "三点开会",
+    "明天三点开会",
+    "party tonight at 1",
+])
+def test_ambiguous_times_give_none(text):
+    assert parse_event(text, TODAY) is None
+
+
+@pytest.mark.parametrize("text", [
+    "dentist Feb 30 at 3pm",
+    "dentist 2026-13-01 at 3pm",
+    "二月三十号下午三点看牙医",
+    "dentist this Monday at 3pm",
+    "meeting 3pm-1pm",
+])
+def test_invalid_dates_and_times_give_none(text):
+    assert parse_event(text, TODAY) is None
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("meeting with Sun Li at 3pm", ("Meeting with Sun Li", "2026-10-14T15:00:00", None)),
+    ("coffee with Sat at 10am", ("Coffee with Sat", "2026-10-14T10:00:00", None)),
+    ("lunch with May at noon", ("Lunch with May", "2026-10-14T12:00:00", None)),
+    ("call Mar at 3pm", ("Call Mar", "2026-10-14T15:00:00", None)),
+    # Next to a time, or qualified, they are still days
+    ("coffee Sun 10am", ("Coffee", "2026-10-18T10:00:00", None)),
+    ("tennis at 3pm Sat", ("Tennis", "2026-10-17T15:00:00", None)),
+    ("tennis next Sat 3pm", ("Tennis", "2026-10-24T15:00:00", None)),
+])
+def test_names_are_not_dates(text, expected):
+    assert times(text) == expected
+
+
+def test_uncertain_or_incomplete_text_gives_none():
+    assert parse_event("I may go to the gym at 3pm", TODAY) is None
+    assert parse_event("dentist at 3pm or 4pm", TODAY) is None
+    assert parse_event("明天下午三点", TODAY) is None
+    assert parse_event("gym every Monday at 7am", TODAY) is None
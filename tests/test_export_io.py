@@ -0,0 +1,66 @@
+import os
+
+import pytest
+
+from services import export_io
+from services.export_io import ExportWriter, iter_export, recover
+
+RECORDS = [{"meta": {"id": f"page-{i}"}, "content": ["段落 " * i]} for i in range(5)]
+
+
+@pytest.mark.parametrize("suffix", [".jsonl", ".jsonl.gz"])
+def test_round_trip_and_append(tmp_path, suffix):
+    path = os.path.join(tmp_path, "export" + suffix)
+    with ExportWriter(path) as writer:
+        for record in RECORDS[:3]:
+            writer.write(record)
+    with ExportWriter(path, append=True) as writer:
+        for record in RECORDS[3:]:
+            writer.write(record)
+    assert list(iter_export(path)) == RECORDS
+
+
+@pytest.mark.parametrize("chunk", [4, 64 * 1024])
+def test_recover_drops_a_partial_record(tmp_path, monkeypatch, chunk):
+    # A 4-byte chunk makes it walk back over several reads
+    monkeypatch.setattr(export_io, "_TAIL_CHUNK", chunk)
+    path = os.path.join(tmp_path, "export.jsonl")
+    with ExportWriter(path) as writer:
+        for record in RECORDS:
+            writer.write(record)
+    complete = os.path.getsize(path)
+    with open(path, "ab") as f:
+        f.write(b'{"meta": {"id": "page-5"}, "content": ["cut off')
+
+    recover(path)
+    assert os.path.getsize(path) == complete
+    assert list(iter_export(path)) == RECORDS
+    # Nothing to do the second time
+    recover(path)
+    assert os.path.getsize(path) == complete
+
+
+def test_recover_without_a_complete_record(tmp_path, monkeypatch):
+    monkeypatch.setattr(export_io, "_TAIL_CHUNK", 4)
+    path = os.path.join(tmp_path, "export.jsonl")
+    with open(path, "wb") as f:
+        f.write(b'{"meta": {"id": "page-0"')
+    recover(path)
+    assert os.path.getsize(path) == 0
+
+
+def test_recover_compressed_export(tmp_path):
+    path = os.path.join(tmp_path, "export.jsonl.gz")
+    with ExportWriter(path) as writer:
+        for record in RECORDS:
+            writer.write(record)
+    size = os.path.getsize(path)
+    with open(path, "rb+") as f:
+        f.truncate(size - 10)
+
+    recover(path)
+    kept = list(iter_export(path))
+    assert kept == RECORDS[:len(kept)]
+    with ExportWriter(path, append=True) as writer:
+        writer.write({"meta": {"id": "page-new"}})
+    assert list(iter_export(path))[-1] == {"meta": {"id": "page-new"}}
@@ -0,0 +1,35 @@
+import asyncio
+import io
+import time
+
+from services import ai_service, http_client
+
+LATENCY = 0.3
+REQUESTS = 10
+
+
+def test_requests_share_the_pool_and_run_in_parallel(stub):
+    app = stub(latency=LATENCY)
+    assert REQUESTS <= http_client.MAX_CONNECTIONS
+
+    async def run():
+        try:
+            client = ai_service._get_client()
+            start = time.perf_counter()
+            texts = await asyncio.gather(*[
+                ai_service.transcribe_audio(io.BytesIO(b"x" * (i + 1)), f"clip-{i}.webm", "audio/webm")
+                for i in range(REQUESTS)
+            ])
+            elapsed = time.perf_counter() - start
+            # Every call went through the one long-lived client
+            assert ai_service._get_client() is client
+            return texts, elapsed
+        finally:
+            await ai_service.close_client()
+
+    texts, elapsed = asyncio.run(run())
+    assert len(set(texts)) == REQUESTS
+    assert app.state.stats["transcriptions"] == REQUESTS
+    # About one upstream latency in total, not one per request
+    assert elapsed < LATENCY * 2.5
+
@@ -0,0 +1,86 @@
+import asyncio
+import os
+import uuid
+
+import httpx
+
+import main
+from services import idempotency
+
+N = 10
+
+
+def drive_app(requests):
+    """
+    Runs the app in-process (lifespan included) and awaits requests(client).
+    """
+    async def run():
+        async with main.app.router.lifespan_context(main.app):
+            transport = httpx.ASGITransport(app=main.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://app.test") as client:
+                return await requests(client)
+
+    return asyncio.run(run())
+
+
+def test_concurrent_process_audio_runs_once(stub):
+    app = stub(latency=0.2)
+    key = str(uuid.uuid4())
+    audio = os.urandom(4096)
+    coalesced = idempotency.store.stats()["coalesced"]
+
+    def post(client, body=audio):
+        return client.post(
+            "/api/process-audio",
+            data={"mode": "idea"},
+            files={"audio": ("memo.webm", body, "audio/webm")},
+            # No draft cache, so only the Idempotency-Key can save the chat call
+            headers={"Idempotency-Key": key, "Cache-Control": "no-cache"},
+        )
+
+    async def requests(client):
+        responses = await asyncio.gather(*[post(client) for _ in range(N)])
+        reused = await post(client, os.urandom(1024))
+        return responses, reused
+
+    responses, reused = drive_app(requests)
+    assert [response.status_code for response in responses] == [200] * N
+    assert all(response.json() == responses[0].json() for response in responses)
+    assert responses[0].json()["draft"]["title"] == "Stub"
+    assert app.state.stats["transcriptions"] == 1
+    assert app.state.stats["chat"] == 1
+    assert idempotency.store.stats()["coalesced"] - coalesced == N - 1
+    # Same key, different recording
+    assert reused.status_code == 422
+    assert app.state.stats["transcriptions"] == 1
+
+
+def test_concurrent_save_entry_queues_once(stub):
+    stub(latency=0.05)
+    key = str(uuid.uuid4())
+    body = {"mode": "idea", "data": {"title": "Idempotent idea", "content": "- once"}}
+
+    async def requests(client):
+        headers = {"Idempotency-Key": key}
+        responses = await asyncio.gather(*[
+            client.post("/api/save-entry", json=body, headers=headers) for _ in range(N)
+        ])
+        changed = dict(body, data={"title": "Another idea"})
+        reused = await client.post("/api/save-entry", json=changed, headers=headers)
+        return responses, reused
+
+    responses, reused = drive_app(requests)
+    assert [response.status_code for response in responses] == [202] * N
+    assert len({response.json()["job_id"] for response in responses}) == 1
+    assert all(response.json() == responses[0].json() for response in responses)
+    assert reused.status_code == 422
+
+
+def test_invalid_key_is_rejected(stub):
+    stub()
+
+    async def requests(client):
+        return await client.post("/api/save-entry", json={"mode": "idea", "data": {}},
+                                 headers={"Idempotency-Key": "x" * 300})
+
+    assert drive_app(requests).status_code == 400
@@ -0,0 +1,82 @@
+import json
+
+import pytest
+
+from services.json_stream import PartialJSONParser
+
+DRAFT = {
+    "title": 'Tab\there, "quoted" \\ and a newline\n',
+    "content": "Emoji 😀 and 中文, escaped",
+    "tags": ["a]b", {"nested": "}{", "list": [1, [2, "]"]]}],
+    "priority": 3,
+    "done": False,
+}
+
+
+def feed_all(chunks):
+    """
+    Feeds the chunks in order; returns the parser and every update it reported.
+    """
+    parser = PartialJSONParser()
+    updates = []
+    for chunk in chunks:
+        updates += parser.feed(chunk)
+    return parser, updates
+
+
+def split(text, size):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 1000])
+def test_any_chunking_gives_the_same_result(size):
+    # ensure_ascii writes the emoji as a surrogate pair of \u escapes
+    text = json.dumps(DRAFT)
+    assert "\\ud83d\\ude00" in text
+    parser, updates = feed_all(split(text, size))
+    assert parser.done
+    assert parser.result == DRAFT
+    complete = {key: value for key, value, done in updates if done}
+    assert complete == DRAFT
+
+
+def test_partial_strings_grow_towards_the_final_value():
+    text = json.dumps(DRAFT)
+    _, updates = feed_all(text)
+    partials = [(key, value) for key, value, done in updates if not done]
+    assert {key for key, _ in partials} == {"title", "content"}
+    # Half an escape or half a surrogate pair is never shown
+    for key, value in partials:
+        assert DRAFT[key].startswith(value)
+
+
+def test_escape_split_across_chunks():
+    parser, updates = feed_all(['{"title": "a\\', 'nb\\u00', 'e9"}'])
+    assert updates == [("title", "a", False), ("title", "a\nb", False), ("title", "a\nbé", True)]
+    assert parser.done
+
+
+def test_nested_values_are_reported_once_complete():
+    parser = PartialJSONParser()
+    assert parser.feed('{"tags": ["x", "]", {"a": [') == []
+    assert parser.feed(']}], "n": 1}') == [("tags", ["x", "]", {"a": []}], True), ("n", 1, True)]
+
+
+def test_leading_fence_is_skipped():
+    parser, updates = feed_all(["```json\n", '{"title": "x", ', '"ok": true}\n```'])
+    assert parser.result == {"title": "x", "ok": True}
+    assert parser.done
+    assert ("ok", True, True) in updates
+
+
+@pytest.mark.parametrize("text", ["Sorry, I can't help with that.", "42", '"just text"', "[1, 2]"])
+def test_output_that_is_not_an_object_gives_nothing(text):
+    parser, updates = feed_all(split(text, 3))
+    assert updates == []
+    assert parser.result == {}
+    assert not parser.done
+
+
+def test_non_json_literals_are_kept_as_text():
+    parser, _ = feed_all(['{"priority": high, "n": 2}'])
+    assert parser.result == {"priority": "high", "n": 2}
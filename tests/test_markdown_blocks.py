@@ -0,0 +1,55 @@
+import json
+import os
+
+import pytest
+
+from services import markdown_blocks
+from services.markdown_blocks import batch_blocks, iter_blocks, markdown_to_blocks, rich_text
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "markdown")
+
+
+def paragraph(text):
+    return {"object": "block", "type": "paragraph", "paragraph": {"rich_text": rich_text(text)}}
+
+
+@pytest.mark.parametrize("name", ["inline", "lists", "long_text", "many_children"])
+def test_golden_output(name):
+    with open(os.path.join(FIXTURES, f"{name}.md"), encoding="utf-8") as f:
+        markdown = f.read()
+    with open(os.path.join(FIXTURES, f"{name}.json"), encoding="utf-8") as f:
+        expected = json.load(f)
+    assert markdown_to_blocks(markdown) == expected
+    # Streaming the lines gives the same blocks
+    assert list(iter_blocks(iter(markdown.splitlines()))) == expected
+
+
+def test_rich_text_items_are_split_within_limits():
+    blocks = markdown_to_blocks("x" * 4500)
+    assert [len(item["text"]["content"]) for item in blocks[0]["paragraph"]["rich_text"]] == [2000, 2000, 500]
+    # More than 100 rich_text items continue in another paragraph
+    blocks = markdown_to_blocks(" ".join(f"**{i}** and" for i in range(80)))
+    assert [len(block["paragraph"]["rich_text"]) for block in blocks] == [100, 60]
+
+
+def test_batches_hold_at_most_100_top_level_blocks():
+    batches = list(batch_blocks(paragraph(f"Line {i}") for i in range(250)))
+    assert [len(batch) for batch in batches] == [100, 100, 50]
+
+
+def test_batches_hold_at_most_1000_blocks_in_total():
+    # Each list item carries 99 children, so ten of them fill a request
+    markdown = "\n".join(f"- Item {i}\n" + "\n".join(f"  - Child {j}" for j in range(99)) for i in range(12))
+    batches = list(batch_blocks(iter_blocks(markdown)))
+    assert [len(batch) for batch in batches] == [10, 2]
+    assert all(sum(markdown_blocks._count(block) for block in batch) <= 1000 for batch in batches)
+
+
+def test_batches_stay_under_the_payload_limit(monkeypatch):
+    monkeypatch.setattr(markdown_blocks, "MAX_PAYLOAD_BYTES", 10_000)
+    blocks = [paragraph("長" * 1500) for _ in range(10)]
+    batches = list(batch_blocks(blocks))
+    assert len(batches) > 1
+    assert [block for batch in batches for block in batch] == blocks
+    for batch in batches:
+        assert sum(len(json.dumps(block, ensure_ascii=False).encode("utf-8")) for block in batch) <= 10_000
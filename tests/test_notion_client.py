@@ -0,0 +1,130 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from services import notion_client, notion_service
+from services.notion_client import NotionAPIError, NotionClient, TokenBucket
+
+
+def test_token_bucket_paces_requests():
+    bucket = TokenBucket(rate=10, capacity=2)
+
+    async def run():
+        start = time.perf_counter()
+        await asyncio.gather(*[bucket.acquire() for _ in range(12)])
+        return time.perf_counter() - start
+
+    # Two tokens up front, then one every 0.1 s
+    assert 0.9 <= asyncio.run(run()) < 1.3
+
+
+def test_429_pauses_the_bucket_for_retry_after(stub):
+    app = stub(fail_first={"notion": 1}, retry_after=0.3)
+    bucket = TokenBucket(rate=10, capacity=10)
+
+    async def run():
+        client = NotionClient("test", notion_service.BASE_URL, 5, bucket=bucket)
+        try:
+            start = time.perf_counter()
+            result = await client.request("GET", "/blocks/page-000001/children")
+            return result, time.perf_counter() - start
+        finally:
+            await client.aclose()
+
+    result, elapsed = asyncio.run(run())
+    assert result["results"]
+    assert elapsed >= 0.3
+    assert bucket.rate < bucket.max_rate
+    assert app.state.stats["errors"] == 1
+
+
+def test_limiter_keeps_up_with_a_rate_limited_upstream(stub):
+    # The client starts four times faster than the stub allows and has to back off
+    app = stub(notion_rate=5)
+    bucket = TokenBucket(rate=20, capacity=20)
+
+    async def run():
+        client = NotionClient("test", notion_service.BASE_URL, 5, bucket=bucket, max_retries=10)
+        try:
+            return await asyncio.gather(*[
+                client.request("GET", f"/blocks/page-{i:06d}/children") for i in range(20)
+            ])
+        finally:
+            await client.aclose()
+
+    assert all(result["results"] for result in asyncio.run(run()))
+    assert app.state.stats["notion_ok"] == 20
+    # Backed off after the first 429s instead of hammering the upstream
+    assert 0 < app.state.stats["notion_429"] < 20
+
+
+class FlakyTransport(httpx.AsyncBaseTransport):
+    """
+    Raises `error` for the first `failures` requests, then answers 200.
+    """
+    def __init__(self, error: Exception, failures: int):
+        self.error = error
+        self.failures = failures
+        self.calls = 0
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise self.error
+        return httpx.Response(200, json={"object": "page", "id": "page-1"})
+
+
+def request_with(transport: FlakyTransport, method: str, path: str, **kwargs):
+    async def run():
+        client = NotionClient("test", "http://notion.test/v1", bucket=TokenBucket(100, 100), max_retries=3)
+        await client.http.aclose()
+        client.http = httpx.AsyncClient(base_url="http://notion.test/v1", transport=transport)
+        try:
+            return await client.request(method, path, **kwargs)
+        finally:
+            await client.aclose()
+
+    return asyncio.run(run())
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(notion_client, "_backoff", lambda attempt: 0.0)
+
+
+def test_post_is_not_repeated_after_a_read_timeout():
+    transport = FlakyTransport(httpx.ReadTimeout("timed out"), failures=1)
+    with pytest.raises(httpx.ReadTimeout):
+        request_with(transport, "POST", "/pages", json={})
+    # The page may exist already; the save queue decides what to do
+    assert transport.calls == 1
+
+
+def test_post_is_retried_when_it_never_went_out():
+    transport = FlakyTransport(httpx.ConnectError("refused"), failures=2)
+    assert request_with(transport, "POST", "/pages", json={})["id"] == "page-1"
+    assert transport.calls == 3
+
+
+def test_idempotent_requests_are_retried_after_a_read_timeout():
+    transport = FlakyTransport(httpx.ReadTimeout("timed out"), failures=2)
+    assert request_with(transport, "GET", "/pages/page-1")["id"] == "page-1"
+    assert transport.calls == 3
+    transport = FlakyTransport(httpx.ReadTimeout("timed out"), failures=1)
+    assert request_with(transport, "POST", "/search", idempotent=True, json={})["id"] == "page-1"
+    assert transport.calls == 2
+
+
+def test_client_errors_are_not_retried():
+    class BadRequest(FlakyTransport):
+        async def handle_async_request(self, request):
+            self.calls += 1
+            return httpx.Response(400, json={"code": "validation_error"})
+
+    transport = BadRequest(None, 0)
+    with pytest.raises(NotionAPIError) as error:
+        request_with(transport, "GET", "/pages/page-1")
+    assert error.value.status_code == 400
+    assert transport.calls == 1
@@ -0,0 +1,78 @@
+import asyncio
+import os
+
+import pytest
+
+import extract_notion_api
+from services import notion_service, page_index
+from services.page_index import PageIndex
+from services.search_index import SearchIndex
+
+
+def page(i, edited="2026-01-01T00:00:00.000Z"):
+    return {"id": f"page-{i:06d}", "last_edited_time": edited}
+
+
+def test_remove_and_retain(tmp_path):
+    index = PageIndex(os.path.join(tmp_path, "index.db"))
+    for i in range(4):
+        index.upsert(page(i), [])
+    assert index.remove(["page-000000", "page-unknown"]) == ["page-000000"]
+    assert sorted(index.retain(["page-000001", "page-000003"])) == ["page-000002"]
+    assert sorted(record["meta"]["id"] for record in index.iter_records()) == ["page-000001", "page-000003"]
+    index.close()
+
+
+def test_full_sync_is_due_after_the_interval(tmp_path, monkeypatch):
+    index = PageIndex(os.path.join(tmp_path, "index.db"))
+    assert index.full_sync_due()
+    index.set_state("full_sync_at", str(page_index.time.time()))
+    assert not index.full_sync_due()
+    monkeypatch.setattr(page_index, "NOTION_FULL_SYNC_INTERVAL", 0)
+    assert index.full_sync_due()
+    index.close()
+
+
+@pytest.fixture
+def sync(stub, tmp_path, monkeypatch):
+    app = stub(workspace_pages=6, blocks_per_page=2)
+    monkeypatch.setattr(extract_notion_api, "NOTION_BASE_URL", notion_service.BASE_URL)
+    monkeypatch.setattr(extract_notion_api, "NOTION_TOKEN", "test")
+    monkeypatch.setattr(extract_notion_api, "SEARCH_INDEX_DB", os.path.join(tmp_path, "search.db"))
+    path = os.path.join(tmp_path, "index.db")
+
+    def run(full=False):
+        asyncio.run(extract_notion_api.sync_pages(4, path, full=full))
+        index = PageIndex(path)
+        try:
+            return sorted(record["meta"]["id"] for record in index.iter_records())
+        finally:
+            index.close()
+
+    return app, run
+
+
+def test_archived_pages_are_dropped_by_an_incremental_sync(sync):
+    app, run = sync
+    assert len(run()) == 6
+    search = SearchIndex(extract_notion_api.SEARCH_INDEX_DB)
+    search.add_many([{"id": "page-000002", "kind": "page", "title": "Page 2", "content": "text", "url": None}])
+    search.close()
+
+    # Archiving edits the page, so it shows up above the watermark flagged as archived
+    app.state.archived.add(2)
+    app.state.edited[2] = "2026-02-01T00:00:00.000Z"
+    assert "page-000002" not in run()
+
+    search = SearchIndex(extract_notion_api.SEARCH_INDEX_DB)
+    assert search.search("text")["results"] == []
+    search.close()
+
+
+def test_deleted_pages_are_dropped_by_a_full_sync(sync):
+    app, run = sync
+    assert len(run()) == 6
+    app.state.deleted.update({0, 5})
+    # Nothing changed above the watermark, so an incremental sync can't tell
+    assert len(run()) == 6
+    assert run(full=True) == [f"page-{i:06d}" for i in range(1, 5)]
@@ -0,0 +1,48 @@
+import os
+
+from fastapi.testclient import TestClient
+
+import main
+from services import ai_service
+
+
+def test_overlapping_transcripts_are_stitched():
+    parts = ["we should meet on Friday at", "Friday at ten to plan the trip."]
+    assert ai_service.stitch_transcripts(parts, [False, True]) == "we should meet on Friday at ten to plan the trip."
+    # Without the overlap flag the text is kept as is
+    assert ai_service.stitch_transcripts(parts, [False, False]) == " ".join(parts)
+    assert ai_service.stitch_transcripts(["明天下午三点", "三点开会。"], [False, True]) == "明天下午三点 开会。"
+
+
+def test_live_segments_survive_upstream_errors(stub):
+    # The first two transcription calls fail with 503 and are retried per segment
+    app = stub(fail_first={"transcription": 2})
+
+    with TestClient(main.app) as client:
+        with client.websocket_connect("/ws/record?mode=idea&format=webm") as ws:
+            for overlaps in (False, True):
+                ws.send_bytes(os.urandom(2048))
+                ws.send_json({"type": "segment", "overlaps": overlaps})
+            ws.send_bytes(os.urandom(1024))
+            ws.send_json({"type": "stop", "overlaps": True})
+            while True:
+                reply = ws.receive_json()
+                if reply.get("event") != "field":
+                    break
+
+    assert "error" not in reply
+    assert reply["transcription"].count("stub transcription of") == 3
+    assert reply["draft"]["title"] == "Stub"
+    assert app.state.stats["errors"] == 2
+    assert app.state.stats["transcriptions"] == 3
+
+
+def test_process_audio_checks_overlap_flags(stub):
+    stub()
+    files = [("audio", (f"segment-{i}.webm", os.urandom(512), "audio/webm")) for i in range(2)]
+    with TestClient(main.app) as client:
+        bad = client.post("/api/process-audio", data={"mode": "idea", "overlaps": "0"}, files=files)
+        good = client.post("/api/process-audio", data={"mode": "idea", "overlaps": "0,1"}, files=files)
+    assert bad.status_code == 400
+    assert good.status_code == 200
+    assert good.json()["transcription"].count("stub transcription of") == 2
@@ -0,0 +1,88 @@
+import os
+
+import numpy as np
+import pytest
+
+from services import related_ideas
+from services.related_ideas import RelatedIdeas
+
+IDEAS = [
+    ("garden", "Garden plans", "plant apple trees along the fence and a vegetable bed"),
+    ("recipe", "Dumpling recipe", "pork and cabbage filling, fold the wrappers tightly"),
+    ("trip", "去杭州旅行", "周末去西湖骑自行车，顺便喝龙井茶"),
+]
+
+
+@pytest.fixture
+def path(tmp_path):
+    return os.path.join(tmp_path, "related")
+
+
+def open_index(path):
+    index = RelatedIdeas(path, dim=256)
+    for idea_id, title, content in IDEAS:
+        index.add(idea_id, title, content, url=f"https://notion.so/{idea_id}")
+    return index
+
+
+def top(index, text):
+    results = index.lookup(text, min_score=0.0)
+    return results[0]["id"] if results else None
+
+
+def test_ideas_are_added_incrementally(path):
+    index = open_index(path)
+    assert len(index) == 3
+    assert top(index, "apple trees for the garden") == "garden"
+    assert top(index, "西湖骑车") == "trip"
+    before = np.array(index._matrix[:3])
+    index.add("bike", "Bike repair", "fix the bicycle chain and pump the tyres")
+    # Earlier vectors are left as they were
+    assert np.array_equal(index._matrix[:3], before)
+    assert top(index, "bicycle chain") == "bike"
+    assert index.lookup("something else entirely") == []
+    index.close()
+
+
+def test_adding_an_existing_idea_replaces_it(path):
+    index = open_index(path)
+    df = int(index._df.sum())
+    index.add("garden", "Balcony plans", "tomatoes and herbs in pots on the balcony")
+    assert len(index) == 3
+    assert top(index, "tomatoes on the balcony") == "garden"
+    assert "garden" not in [result["id"] for result in index.lookup("apple trees along the fence")]
+    result = index.lookup("tomatoes on the balcony")[0]
+    assert result["title"] == "Balcony plans" and result["url"] is None
+    # Document frequencies count each idea once
+    assert int(index._df.sum()) == df
+    index.close()
+
+
+def test_the_matrix_grows_past_its_capacity(path, monkeypatch):
+    monkeypatch.setattr(related_ideas, "_INITIAL_CAPACITY", 2)
+    index = open_index(path)
+    for i in range(10):
+        index.add(f"note-{i}", f"Note {i}", f"note number {i} about topic {'xyz' * (i + 1)}")
+    assert len(index) == 13
+    assert index._matrix.shape[0] >= 13
+    assert top(index, "plant apple trees along the fence") == "garden"
+    assert top(index, "dumpling wrappers") == "recipe"
+    index.close()
+
+
+def test_reopening_reads_the_saved_vectors(path, monkeypatch):
+    monkeypatch.setattr(related_ideas, "_INITIAL_CAPACITY", 2)
+    index = open_index(path)
+    vectors = np.array(index._matrix[:3])
+    expected = index.lookup("apple trees for the garden", min_score=0.0)
+    index.close()
+
+    # Nothing is vectorized again on startup
+    monkeypatch.setattr(RelatedIdeas, "_vectorize", lambda *args, **kwargs: pytest.fail("rebuilt"))
+    index = RelatedIdeas(path, dim=256)
+    assert len(index) == 3
+    assert np.array_equal(index._matrix[:3], vectors)
+    assert [row["id"] for row in index._rows] == [idea_id for idea_id, _, _ in IDEAS]
+    monkeypatch.undo()
+    assert index.lookup("apple trees for the garden", min_score=0.0) == expected
+    index.close()
@@ -0,0 +1,136 @@
+import asyncio
+import os
+import time
+
+import pytest
+
+from services import notion_service, save_queue
+from services.notion_client import NotionClient, TokenBucket
+from services.save_queue import FAILED, QUEUED, RUNNING, SUCCEEDED, SaveQueue
+
+IDEA = {"title": "Test idea", "content": "- point"}
+
+
+@pytest.fixture
+def queue(tmp_path, monkeypatch):
+    monkeypatch.setattr(save_queue, "BACKOFF_BASE", 0.01)
+    queue = SaveQueue(os.path.join(tmp_path, "save_queue.db"))
+    yield queue
+    queue.close()
+
+
+def run_jobs(queue, items, timeout=10.0, client_timeout=5.0):
+    """
+    Runs the worker until the jobs finish, against whatever the stub fixture set up.
+    The Notion client doesn't retry by itself here, so every failure reaches the queue.
+    """
+    async def run():
+        notion_service._client = NotionClient("test", notion_service.BASE_URL, client_timeout,
+                                              bucket=TokenBucket(100, 100), max_retries=0)
+        worker = asyncio.create_task(queue.run_worker())
+        await asyncio.sleep(0)
+        try:
+            jobs = await queue.enqueue_many(items)
+            return await queue.wait([job["id"] for job in jobs], timeout)
+        finally:
+            worker.cancel()
+            await asyncio.gather(worker, return_exceptions=True)
+            await notion_service.close_client()
+
+    return asyncio.run(run())
+
+
+def test_retryable_errors_are_retried(stub, queue):
+    app = stub(fail_first={"notion": 2})
+    [job] = run_jobs(queue, [{"mode": "idea", "data": IDEA}])
+    assert job["status"] == SUCCEEDED
+    assert job["attempts"] == 3
+    assert job["result"]["id"]
+    assert app.state.stats["errors"] == 2
+
+
+def test_retry_after_reschedules_the_job(stub, queue):
+    stub(fail_first={"notion": 1}, retry_after=0.5)
+    original = queue._finish
+    rescheduled = []
+
+    async def finish(job_id, status, **kwargs):
+        if status == QUEUED:
+            rescheduled.append(kwargs["next_attempt_at"] - time.time())
+        await original(job_id, status, **kwargs)
+
+    queue._finish = finish
+    start = time.monotonic()
+    [job] = run_jobs(queue, [{"mode": "idea", "data": IDEA}])
+    assert job["status"] == SUCCEEDED
+    assert job["attempts"] == 2
+    # Honoured Retry-After rather than the (much shorter) backoff
+    assert rescheduled and 0.4 < rescheduled[0] <= 0.5
+    assert time.monotonic() - start >= 0.45
+
+
+def test_job_fails_after_max_attempts(stub, queue, monkeypatch):
+    monkeypatch.setattr(save_queue, "MAX_ATTEMPTS", 3)
+    app = stub(fail_first={"notion": 100})
+    [job] = run_jobs(queue, [{"mode": "idea", "data": IDEA}])
+    assert job["status"] == FAILED
+    assert job["attempts"] == 3
+    assert "service_unavailable" in job["last_error"]
+    assert app.state.stats["errors"] == 3
+
+
+def test_a_timed_out_page_write_is_not_repeated(stub, queue):
+    # Notion creates the page but answers after the client has given up
+    app = stub(page_reply_delay=1.0)
+    [job] = run_jobs(queue, [{"mode": "idea", "data": IDEA}], client_timeout=0.3)
+    assert job["status"] == FAILED
+    assert job["attempts"] == 1
+    assert "Outcome unknown" in job["last_error"]
+    assert app.state.stats["pages_created"] == 1
+
+
+def test_a_partly_written_page_leaves_one_live_page(stub, queue):
+    # More blocks than one request takes, and the first append fails
+    app = stub(fail_first={"append": 1})
+    idea = {"title": "Long idea", "content": "\n".join(f"- point {i}" for i in range(150))}
+    [job] = run_jobs(queue, [{"mode": "idea", "data": idea}])
+    assert job["status"] == SUCCEEDED
+    assert job["attempts"] == 2
+    assert app.state.stats["pages_created"] == 2
+    live = [page_id for page_id, archived in app.state.pages.items() if not archived]
+    assert live == [job["result"]["id"]]
+
+
+def test_running_jobs_are_requeued_after_a_restart(tmp_path):
+    path = os.path.join(tmp_path, "save_queue.db")
+    queue = SaveQueue(path)
+    job = asyncio.run(queue.enqueue("idea", IDEA))
+    claimed = queue._claim()
+    assert claimed["id"] == job["id"]
+    assert asyncio.run(queue.get(job["id"]))["status"] == RUNNING
+    # The process dies mid-save
+    queue.close()
+
+    queue = SaveQueue(path)
+    job = asyncio.run(queue.get(job["id"]))
+    assert job["status"] == QUEUED
+    assert job["attempts"] == 1
+    queue.close()
+
+
+def test_enqueueing_a_job_id_again_keeps_the_first(queue):
+    async def enqueue():
+        first = await queue.enqueue("idea", IDEA, job_id="client-job-1")
+        again = await queue.enqueue("event", {"title": "Something else"}, job_id="client-job-1")
+        jobs = await queue.enqueue_many([
+            {"mode": "idea", "data": IDEA, "job_id": "client-job-2"},
+            {"mode": "idea", "data": {"title": "Other"}, "job_id": "client-job-2"},
+        ])
+        return first, again, jobs
+
+    first, again, jobs = asyncio.run(enqueue())
+    assert again == first
+    assert jobs[0] == jobs[1]
+    with queue._lock:
+        count = queue._conn.execute("SELECT COUNT(*) FROM jobs").fetchone()[0]
+    assert count == 2
@@ -0,0 +1,87 @@
+import os
+
+import pytest
+
+from services import search_index
+from services.search_index import SearchIndex
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = SearchIndex(os.path.join(tmp_path, "search.db"))
+    yield index
+    index.close()
+
+
+def add(index, i, title, content, kind="idea"):
+    index.add(f"doc-{i}", kind, title, content)
+
+
+def test_results_are_ranked_and_paginated(index):
+    add(index, 0, "Garden plans", "apple apple apple trees by the fence")
+    for i in range(1, 10):
+        add(index, i, f"Note {i}", f"bought an apple and {i} other things for the week")
+    first = index.search("apple", limit=4)
+    assert first["results"][0]["id"] == "doc-0"
+    assert first["has_more"] and first["complete"]
+    scores = [result["score"] for result in first["results"]]
+    assert scores == sorted(scores, reverse=True)
+
+    pages = [index.search("apple", limit=4, offset=offset)["results"] for offset in (0, 4, 8)]
+    ids = [result["id"] for page in pages for result in page]
+    assert sorted(ids) == sorted(f"doc-{i}" for i in range(10))
+
+
+def test_broad_queries_stay_ranked(index, monkeypatch):
+    monkeypatch.setattr(search_index, "SEARCH_MAX_RANKED", 5)
+    for i in range(8):
+        add(index, i, f"Note {i}", f"meeting notes number {i} about nothing much")
+    # Newer than most, but not the newest: only ranking puts it first
+    add(index, 8, "Meeting", "meeting meeting agenda for the meeting")
+    add(index, 9, "Note 9", "short meeting")
+
+    result = index.search("meeting", limit=3)
+    assert not result["complete"]
+    assert result["results"][0]["id"] == "doc-8"
+    scores = [item["score"] for item in result["results"]]
+    assert scores == sorted(scores, reverse=True)
+
+    # Paging past the window still reaches every match exactly once
+    ids = [item["id"] for offset in range(0, 10, 3) for item in index.search("meeting", limit=3, offset=offset)["results"]]
+    assert sorted(ids) == sorted(f"doc-{i}" for i in range(10))
+
+
+def test_cjk_substrings_and_kind_filter(index):
+    add(index, 0, "周会", "今天的会议记录：讨论了下周的计划", kind="idea")
+    add(index, 1, "安排", "下午三点开会议", kind="event")
+    assert {item["id"] for item in index.search("会议")["results"]} == {"doc-0", "doc-1"}
+    assert [item["id"] for item in index.search("会议", kind="event")["results"]] == ["doc-1"]
+
+
+def test_remove(index):
+    add(index, 0, "Garden plans", "apple trees")
+    add(index, 1, "Shopping", "apples")
+    assert index.remove(["doc-0", "doc-missing"]) == 1
+    assert index.search("apple")["results"] == []
+    assert len(index) == 1
+
+
+def test_broad_queries_rank_the_newest_window_first(index, monkeypatch):
+    monkeypatch.setattr(search_index, "SEARCH_MAX_RANKED", 4)
+    # The best match overall is the oldest one
+    add(index, 0, "Meeting", "meeting meeting meeting agenda for the meeting")
+    for i in range(1, 9):
+        add(index, i, f"Note {i}", f"a long note that mentions one meeting among {i} other things")
+
+    first = index.search("meeting", limit=4)
+    assert not first["complete"] and first["has_more"]
+    # Only the newest four matches were ranked
+    assert sorted(item["id"] for item in first["results"]) == [f"doc-{i}" for i in range(5, 9)]
+    ids = [item["id"] for offset in (0, 4, 8) for item in index.search("meeting", limit=4, offset=offset)["results"]]
+    assert ids[-1] == "doc-0"
+
+    # With every match in one window the ranking is exact
+    monkeypatch.setattr(search_index, "SEARCH_MAX_RANKED", 500)
+    result = index.search("meeting", limit=4)
+    assert result["complete"]
+    assert result["results"][0]["id"] == "doc-0"